@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import SALES_COLUMNS, freeze_frame
+from indexes import FilterIndex
+from tracing import span
+
+
+CUBE_DIMENSIONS = ['Year', 'Platform', 'Genre', 'Publisher']
+CUBE_MEASURES = SALES_COLUMNS + ['Count']
+
+# Sales are recorded in hundredths of a million
+SALES_DECIMALS = 2
+
+# Dimensions with running totals over the years. A selection that only
+# filters the years and the dimensions of one of these is answered from them.
+YEAR_SUM_KEYS = [('Platform', 'Genre'), ('Publisher',)]
+
+# Aggregates each chart needs from the sales cube: chart id -> (dimensions, measures).
+# Charts that need the same dimensions share a single rollup.
+CHART_AGGREGATES = {
+    'sales_trend': (['Year'], ['Global_Sales']),
+    'platform_comparison': (['Platform'], ['Global_Sales']),
+    'publisher_totals': (['Publisher'], ['Global_Sales']),
+    'publisher_performance': (['Year', 'Publisher'], ['Global_Sales']),
+    'genres_by_region': (['Genre'], ['NA_Sales', 'EU_Sales', 'JP_Sales']),
+    'regional_trend': (['Year'], ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales']),
+    'genre_sales': (['Genre'], ['Global_Sales']),
+    'genre_counts': (['Genre'], ['Count']),
+    'genre_trend': (['Year', 'Genre'], ['Global_Sales']),
+    'platform_evolution': (['Year', 'Platform'], ['Global_Sales']),
+    'genre_evolution': (['Year', 'Genre'], ['Global_Sales']),
+    'publishers_battle': (['Year', 'Publisher'], ['Global_Sales']),
+    'fun_fact_years': (['Year'], ['Count']),
+    'fun_fact_genres': (['Genre'], ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Count']),
+    'fun_fact_platforms': (['Platform'], ['Global_Sales', 'Count']),
+    'fun_fact_publishers': (['Publisher'], ['Count']),
+}
+
+
+def aggregate_rows(df, dimensions=CUBE_DIMENSIONS):
+    """Sum the sales columns and count games for every combination of dimensions
+
+    Sums are rounded to the precision of the data, which removes the error of
+    adding up float32 values, so rollups of the cells are exact to the cent.
+    """
+    grouped = df.groupby(dimensions, observed=True, dropna=False, sort=True)
+    cells = grouped[SALES_COLUMNS].sum().astype('float64').round(SALES_DECIMALS)
+    cells['Count'] = grouped.size().astype('int64')
+    return cells.reset_index()
+
+
+class SalesCube:
+    """Pre-aggregated sales keyed on the four sidebar filter dimensions
+
+    Each cell holds the summed regional and global sales and the number of
+    games for one (Year, Platform, Genre, Publisher) combination. Charts slice
+    the cube with the same selection as the rows and roll it up, so their cost
+    depends on the number of cells rather than the number of games.
+    """
+
+    def __init__(self, cells, index=None):
+        self.cells = cells
+        self.index = FilterIndex(cells) if index is None else index
+        self._year_sums = None
+
+    @classmethod
+    def from_rows(cls, df):
+        return cls(aggregate_rows(df))
+
+    def extended(self, rows):
+        """New cube with the sales of some additional rows added in
+
+        Only the new rows are aggregated; their cells are then merged with
+        the existing ones, so the cost depends on the number of cells.
+        """
+        cells = self.cells
+        delta = aggregate_rows(rows)
+        for col in CUBE_DIMENSIONS:
+            # New rows may bring new categories, the cells need the same ones to concatenate
+            if isinstance(delta[col].dtype, pd.CategoricalDtype) and cells[col].dtype != delta[col].dtype:
+                cells = cells.assign(**{col: cells[col].cat.set_categories(delta[col].cat.categories)})
+        combined = pd.concat([cells, delta], ignore_index=True)
+        grouped = combined.groupby(CUBE_DIMENSIONS, observed=True, dropna=False, sort=True)
+        # The cube is shared like the one it extends, so its cells are read-only too
+        return SalesCube(freeze_frame(grouped[CUBE_MEASURES].sum().reset_index()))
+
+    def year_sums(self):
+        """Running totals over the years for each of YEAR_SUM_KEYS, built on first use"""
+        if self._year_sums is None:
+            self._year_sums = [YearPrefixSums(self.cells, keys) for keys in YEAR_SUM_KEYS]
+        return self._year_sums
+
+    def slice(self, selection):
+        """Cells matching a selection of {column: values}
+
+        A selection of a year range within some values of the dimensions of
+        one of the running totals is answered from those instead of the cells.
+        """
+        for sums in self.year_sums():
+            plan = sums.plan(selection)
+            if plan is not None:
+                return YearRangeSlice(sums, plan, lambda: self.cells[self.index.mask(selection)])
+        mask = self.index.mask(selection)
+        return CubeSlice(self.cells[mask])
+
+
+class CubeSlice:
+    """A filtered set of cube cells that can be rolled up to any dimensions"""
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    def rollup(self, by, measures=CUBE_MEASURES):
+        """Measures summed by the given dimensions, indexed by them
+
+        Missing years are dropped, like a groupby over the raw rows.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        return self.cells.groupby(by, observed=True, sort=True)[list(measures)].sum()
+
+    def totals(self, measures=CUBE_MEASURES):
+        """Measures summed over every cell in the slice"""
+        return self.cells[list(measures)].sum()
+
+    def nunique(self, dimension):
+        """Number of distinct values of a dimension present in the slice"""
+        return self.cells[dimension].nunique()
+
+    def top(self, dimension, measure='Global_Sales', n=5):
+        """Values of a dimension with the highest totals of a measure"""
+        totals = self.rollup(dimension, [measure])[measure]
+        return totals.sort_values(ascending=False).head(n).index.tolist()
+
+
+class YearPrefixSums:
+    """Running totals of the cube measures over the years, per combination of some dimensions
+
+    prefix[k1, ..., y] holds the measures summed over every year before
+    first_year + y for one combination of key values; the last slot of each
+    key axis stands for a missing value. The totals of a year range are the
+    difference of two year rows, so the cost depends on the number of key
+    values but not on the number of games or cells. Sales are summed in
+    integer cents, which keeps the differences exact.
+    """
+
+    def __init__(self, cells, keys):
+        self.keys = list(keys)
+        self.year_dtype = cells['Year'].dtype
+        dated = cells[cells['Year'].notna()]
+        years = dated['Year'].to_numpy(dtype=np.int64)
+        self.first_year = int(years.min()) if len(years) else 0
+        self.n_years = int(years.max()) - self.first_year + 1 if len(years) else 0
+
+        self.values = []
+        self.dtypes = []
+        codes = []
+        for key in self.keys:
+            column = dated[key]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                values = column.cat.categories
+                key_codes = column.cat.codes.to_numpy()
+            else:
+                values = pd.Index(sorted(column.dropna().unique()))
+                key_codes = values.get_indexer(column)
+            self.values.append(values)
+            self.dtypes.append(column.dtype)
+            codes.append(np.where(key_codes < 0, len(values), key_codes))
+
+        measures = [np.rint(dated[m].to_numpy(dtype=np.float64) * 10 ** SALES_DECIMALS) for m in SALES_COLUMNS]
+        measures.append(dated['Count'].to_numpy())
+        yearly = np.zeros([len(values) + 1 for values in self.values] + [self.n_years + 1, len(CUBE_MEASURES)],
+                          dtype=np.int64)
+        np.add.at(yearly, tuple(codes) + (years - self.first_year + 1,), np.column_stack(measures).astype(np.int64))
+        self.prefix = np.cumsum(yearly, axis=-2)
+
+    def plan(self, selection):
+        """Positions on each key axis and the year bounds of a selection
+
+        None when the selection is not a year range, or filters a dimension
+        that is not a key.
+        """
+        years = selection.get('Year')
+        if not isinstance(years, range) or not years or years.step != 1:
+            return None
+        if any(values for column, values in selection.items() if column != 'Year' and column not in self.keys):
+            return None
+        positions = []
+        for key, values in zip(self.keys, self.values):
+            wanted = selection.get(key)
+            if wanted:
+                found = values.get_indexer(list(wanted))
+                positions.append(np.unique(found[found >= 0]))
+            else:
+                # Unfiltered, so the missing values count too, like in the cells
+                positions.append(np.arange(len(values) + 1))
+        start = min(max(years.start - self.first_year, 0), self.n_years)
+        stop = min(max(years.stop - self.first_year, 0), self.n_years)
+        return positions, start, max(start, stop)
+
+    def covers(self, by):
+        return set(by) <= set(self.keys) | {'Year'}
+
+    def totals(self, plan, measures=CUBE_MEASURES):
+        positions, start, stop = plan
+        prefix = self.prefix[np.ix_(*positions)]
+        window = (prefix[..., stop, :] - prefix[..., start, :]).reshape(-1, len(CUBE_MEASURES)).sum(axis=0)
+        return pd.Series([column[0] for column in self._measures(window[np.newaxis], measures)],
+                         index=measures, dtype='float64')
+
+    def rollup(self, plan, by, measures=CUBE_MEASURES):
+        """Measures summed by some of the keys and Year, like CubeSlice.rollup"""
+        positions, start, stop = plan
+        prefix = self.prefix[np.ix_(*positions)]
+        if 'Year' in by:
+            sums = np.diff(prefix[..., start:stop + 1, :], axis=-2)
+        else:
+            sums = (prefix[..., stop, :] - prefix[..., start, :])[..., np.newaxis, :]
+        axes = self.keys + ['Year']
+        # Sum out the axes that are not grouped on, then put the rest in the order of by
+        sums = sums.sum(axis=tuple(i for i, axis in enumerate(axes) if axis not in by))
+        kept = [axis for axis in axes if axis in by]
+        sums = np.moveaxis(sums, [kept.index(col) for col in by], range(len(by)))
+
+        labels = []
+        for col in by:
+            if col == 'Year':
+                labels.append(pd.array(np.arange(self.first_year + start, self.first_year + stop), dtype=self.year_dtype))
+                continue
+            values = self.values[self.keys.index(col)]
+            codes = positions[self.keys.index(col)]
+            # Groups of missing values are dropped, like in a groupby
+            sums = np.compress(codes < len(values), sums, axis=by.index(col))
+            codes = codes[codes < len(values)]
+            dtype = self.dtypes[self.keys.index(col)]
+            if isinstance(dtype, pd.CategoricalDtype):
+                labels.append(pd.Categorical.from_codes(codes, dtype=dtype))
+            else:
+                labels.append(values[codes])
+
+        flat = sums.reshape(-1, len(CUBE_MEASURES))
+        grid = np.meshgrid(*[np.arange(len(label)) for label in labels], indexing='ij')
+        present = flat[:, -1] > 0
+        arrays = [label.take(g.ravel()[present]) for label, g in zip(labels, grid)]
+        index = (pd.MultiIndex.from_arrays(arrays, names=by) if len(by) > 1
+                 else pd.Index(arrays[0], name=by[0]))
+        return pd.DataFrame(dict(zip(measures, self._measures(flat[present], measures))), index=index)
+
+    @staticmethod
+    def _measures(sums, measures):
+        """Columns of the measures from rows of summed cents and counts"""
+        return [sums[:, CUBE_MEASURES.index(m)] if m == 'Count'
+                else sums[:, CUBE_MEASURES.index(m)] / 10 ** SALES_DECIMALS for m in measures]
+
+
+class YearRangeSlice(CubeSlice):
+    """A year range of the cube answered from running totals, like a CubeSlice
+
+    Rollups by dimensions that the running totals do not have use the
+    matching cube cells, which are only selected if that happens.
+    """
+
+    def __init__(self, sums, plan, select_cells):
+        self.sums = sums
+        self.plan = plan
+        self._select_cells = select_cells
+        self._cells = None
+
+    @property
+    def cells(self):
+        if self._cells is None:
+            self._cells = self._select_cells()
+        return self._cells
+
+    def rollup(self, by, measures=CUBE_MEASURES):
+        by = [by] if isinstance(by, str) else list(by)
+        if self.sums.covers(by):
+            return self.sums.rollup(self.plan, by, list(measures))
+        return super().rollup(by, measures)
+
+    def totals(self, measures=CUBE_MEASURES):
+        return self.sums.totals(self.plan, list(measures))
+
+    def nunique(self, dimension):
+        if self.sums.covers([dimension]):
+            return len(self.sums.rollup(self.plan, [dimension], ['Count']))
+        return super().nunique(dimension)
+
+
+class AggregationRegistry:
+    """Shared aggregates for one filter state
+
+    Charts declare the dimensions and measures they need under a chart id.
+    Declarations with the same dimensions are merged, so every distinct
+    rollup is computed once, in a single groupby covering all of the
+    measures requested for it, and the results are shared by the charts.
+    """
+
+    def __init__(self, source, cache=None, cache_key=()):
+        self.source = source
+        self.charts = {}
+        self.requests = {}
+        self.results = {}
+        # Results can be shared with later registries for the same filter state
+        # through a cache, under cache_key + (dimensions,)
+        self.cache = cache
+        self.cache_key = tuple(cache_key)
+
+    def declare(self, chart, by, measures):
+        by = (by,) if isinstance(by, str) else tuple(by)
+        self.charts[chart] = (by, list(measures))
+        self.requests.setdefault(by, set()).update(measures)
+
+    def _ensure(self, by):
+        """Compute the rollup for a set of dimensions unless it is already known"""
+        measures = self.requests[by]
+        computed = self.results.get(by)
+        if computed is None and self.cache is not None:
+            computed = self.cache.get(self.cache_key + (by,))
+        if computed is None or not measures.issubset(computed.columns):
+            ordered = [m for m in CUBE_MEASURES if m in measures]
+            with span('aggregate', by=','.join(by)):
+                computed = self.source.rollup(list(by), ordered)
+            if self.cache is not None:
+                self.cache.put(self.cache_key + (by,), computed)
+        self.results[by] = computed
+        return computed
+
+    def compute(self):
+        """Compute every declared rollup up front"""
+        for by in self.requests:
+            self._ensure(by)
+
+    def result(self, chart):
+        """Aggregate declared by a chart, indexed by its dimensions
+
+        Rollups are computed on first use, so charts that are never rendered
+        cost nothing.
+        """
+        by, measures = self.charts[chart]
+        return self._ensure(by)[measures]
+
+    def top(self, chart, measure='Global_Sales', n=5):
+        """Values with the highest totals of a measure in a chart's aggregate"""
+        values = self.result(chart)[measure]
+        return values.sort_values(ascending=False).head(n).index.tolist()
+
+
+def chart_aggregates(source, cache, signature):
+    """Registry with every chart's aggregate declared, cached for one filter state"""
+    registry = AggregationRegistry(source, cache=cache, cache_key=('aggregates', signature))
+    for chart, (by, measures) in CHART_AGGREGATES.items():
+        registry.declare(chart, by, measures)
+    return registry
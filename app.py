@@ -1,42 +1,103 @@
+from startup import lazy_import, startup_profile
+
+# Time the imports of the first run in this process
+startup_profile.track_imports()
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
-import seaborn as sns
-from plotly.subplots import make_subplots
-import random
-from io import BytesIO
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-import json
+import functools
 import os
-
-
-# Helper function to safely render Plotly charts
-def safe_plotly_chart(fig, use_container_width=True):
-    """Safely render a plotly figure by converting to and from JSON"""
-    try:
-        # Try the normal way first
-        st.plotly_chart(fig, use_container_width=use_container_width)
-    except AttributeError as e:
-        # If orjson error occurs, fallback to manual JSON conversion
-        if "orjson" in str(e):
-            # Convert to JSON and back to avoid orjson issues
-            fig_json = json.dumps(fig.to_dict())
-            fig_dict = json.loads(fig_json)
-            # Create a new figure from the dictionary
-            if isinstance(fig, go.Figure):
-                new_fig = go.Figure(fig_dict)
-            else:
-                # Handle Plotly Express figures
-                new_fig = go.Figure(fig_dict)
-            # Try again with the new figure
-            st.plotly_chart(new_fig, use_container_width=use_container_width)
-        else:
-            # If it's a different error, raise it
-            raise e
+import threading
+import uuid
+
+from aggregates import CubeSlice, SalesCube, aggregate_rows, chart_aggregates
+from cache import BoundedCache
+from charts import DEFAULT_THEME, cached_spec, render_spec, to_plot_frame
+from data_loader import (SALES_COLUMNS, freeze_frame, load_sales_data, memory_report, source_digest,
+                         source_version)
+from export import EXPORT_FORMATS, export_bytes
+from filter_state import (FILTER_KEYS, QUICK_PRESETS, FilterState, default_filters, filter_options,
+                          view_selection, view_signature)
+from fun_facts import random_fact
+from duckdb_backend import DUCKDB_BACKEND, DuckDBSales
+from indexes import FilterIndex, FranchiseIndex, RankIndex, TitleIndex, unpack_mask
+from ingest import DeltaIngester, delta_dir
+from sales_figures import (DEFAULT_TOP_REGION, TOP_N_REGIONS, platform_figure, platform_theme_layout,
+                           pub_animated_figure, top10_chart_id, top10_figure, trend_figure)
+from shared_store import SHARED_STORE, load_shared_dataset, publish_dataset
+from tracing import end_run, publish_run, span, span_metrics, start_run
+from warmup import warm_views
+
+# Only needed once a chart has to be built rather than served from the cache
+px = lazy_import('plotly.express')
+
+startup_profile.imports_done()
+
+
+# Helper function to render Plotly charts from the figure cache
+def cached_chart(chart_id, build_figure, theme_layout=None, use_container_width=True):
+    """Render a chart, re-using its finished spec for the same filters and theme
+
+    build_figure returns a theme-neutral figure and is only called once per
+    filter state, so a cached chart skips both its aggregation and the figure
+    construction. The theme is a presentation layer on top: its template and
+    any per-theme layout in theme_layout are applied to the cached figure data.
+    The spec size is recorded per chart for the debug panel.
+    """
+    with span('chart', chart=chart_id):
+        spec = cached_spec(dashboard_cache, chart_id, filter_signature, st.session_state['theme'],
+                           build_figure, theme_layout)
+        chart_payloads[chart_id] = len(spec)
+        with span('render', chart=chart_id):
+            render_spec(spec, use_container_width=use_container_width)
+
+# Payload bytes sent for each chart in this script run
+chart_payloads = {}
+
+def packed_selection():
+    """Packed bitmap of the rows matching the filters, None when every row matches"""
+    packed = filter_index.packed_mask(filter_selection)
+    if selected_franchises:
+        franchise_rows = franchise_index.packed_mask(selected_franchises)
+        packed = franchise_rows if packed is None else packed & franchise_rows
+    if selected_titles:
+        title_rows = title_index.packed_mask(selected_titles)
+        packed = title_rows if packed is None else packed & title_rows
+    return packed
+
+def title_rows(title):
+    """Every version of a title, one row per platform it was released on"""
+    if DUCKDB_BACKEND:
+        return sales_db.slice({'Name': [title]}).rows()
+    return df.iloc[title_index.rows(title)]
+
+def filtered_rows():
+    """Rows matching the filters, selected once per filter state
+
+    Only row-level views such as the export need them, the charts use the
+    cube. The bitmap indexes select them, or a query on the DuckDB backend.
+    """
+    def select_rows():
+        if DUCKDB_BACKEND:
+            return freeze_frame(cube_slice.rows())
+        packed = packed_selection()
+        return freeze_frame(df if packed is None else df[unpack_mask(packed, len(df))])
+
+    with span('filter_rows'):
+        return dashboard_cache.get_or_compute(('filtered_rows', filter_signature), select_rows)
+
+def top_games(n, by='Global_Sales'):
+    """The n games matching the filters with the highest sales in a column, ties in dataset order"""
+    if DUCKDB_BACKEND:
+        return cube_slice.rows(order_by=by, limit=n)
+    # Walks the pre-sorted rank index instead of sorting the matching rows
+    return df.iloc[rank_index.top(by, n, packed_selection())]
+
+def top_franchises(n):
+    """Global sales of the n best-selling franchises matching the filters"""
+    if DUCKDB_BACKEND:
+        return cube_slice.franchise_sales(n)
+    return franchise_index.top(n, packed_selection())
 
 # Set page configuration
 st.set_page_config(
@@ -112,31 +173,159 @@ st.markdown("""
 
 # Initialize session state variables
 if 'theme' not in st.session_state:
-    st.session_state['theme'] = "dark"
-
-if 'preset_publisher' not in st.session_state:
-    st.session_state['preset_publisher'] = None
-
-if 'preset_platform' not in st.session_state:
-    st.session_state['preset_platform'] = None
+    st.session_state['theme'] = DEFAULT_THEME
 
-if 'preset_years' not in st.session_state:
-    st.session_state['preset_years'] = None
-
-if 'preset_genre' not in st.session_state:
-    st.session_state['preset_genre'] = None
+# Timing spans for this run, shown in the Performance panel. Tracing is off
+# unless VGSALES_TRACING=1 is set, or a session opens the app with ?perf=1
+if st.query_params.get('perf') == '1':
+    st.session_state['tracing'] = True
+if 'trace_session' not in st.session_state:
+    st.session_state['trace_session'] = uuid.uuid4().hex[:8]
+start_run(os.environ.get('VGSALES_TRACING', '0') == '1' or st.session_state.get('tracing', False),
+          session=st.session_state['trace_session'])
 
 # Functions for data loading and processing
-@st.cache_data
-def load_data():
-    df = pd.read_csv('vgsales.csv')
-    # Handle missing values
-    df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
-    df['Publisher'] = df['Publisher'].fillna('Unknown')
-    return df
+# Set VGSALES_DATA_FILE to load another CSV with the vgsales columns
+DATA_FILE = os.environ.get('VGSALES_DATA_FILE', 'vgsales.csv')
+
+# Matches listed for a title search
+TITLE_SEARCH_LIMIT = 20
+
+# In lazy mode only the selected section is computed and rendered on each rerun.
+# Set VGSALES_LAZY_SECTIONS=0 to render every section in tabs instead.
+LAZY_SECTIONS = os.environ.get('VGSALES_LAZY_SECTIONS', '1') != '0'
+
+# Dataset versions kept by the resources keyed on one: the current version and
+# the one before, which sessions may still be rendering when a new one arrives
+DATASET_VERSIONS_KEPT = 2
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_data(version):
+    # Reads the Parquet snapshot next to the CSV, rebuilding it when the CSV changes.
+    # One read-only frame is shared by every session instead of a copy per run.
+    return freeze_frame(load_sales_data(DATA_FILE))
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_filter_index(_df, version):
+    # Built once per dataset version and shared by every session
+    return FilterIndex(_df)
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def dataset_filter_options(_df, _franchise_index, _title_index, version):
+    # Scans every row, so worked out once per dataset version like DuckDBSales.filter_options
+    return filter_options(_df, _franchise_index.series, _title_index.titles)
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def dataset_memory_report(_df, version):
+    # memory_usage(deep=True) walks every string, so measure once per dataset version
+    return freeze_frame(memory_report(_df))
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_sales_cube(_df, version):
+    # Year x Platform x Genre x Publisher aggregates that the charts roll up
+    cube = SalesCube.from_rows(_df)
+    freeze_frame(cube.cells)
+    return cube
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_rank_index(_df, version):
+    # Row order by each sales column for the Top-N charts, by global sales up front
+    rank_index = RankIndex(_df, SALES_COLUMNS)
+    rank_index.ranked('Global_Sales')
+    return rank_index
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_franchise_index(_df, version):
+    # Franchise of every row, computed once per base version and extended with the deltas
+    return FranchiseIndex(_df['Name'], _df['Global_Sales'])
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_title_index(_df, version):
+    # Trigram index over the titles for the sidebar search
+    return TitleIndex(_df['Name'], _df['Global_Sales'])
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_shared_store(version):
+    # With VGSALES_SHARED_STORE=1 the dataset, cube and indexes are written once
+    # per host and memory-mapped by every worker process
+    return load_shared_dataset(DATA_FILE, version)
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def load_duckdb_sales(version):
+    # With VGSALES_BACKEND=duckdb the rows stay in the Parquet snapshot and are
+    # filtered and aggregated by DuckDB, only the distinct titles come into pandas
+    return DuckDBSales.from_csv(DATA_FILE)
+
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def get_delta_ingester(_df, _indexes, version):
+    # Applies the delta files from the drop directory on top of one base version.
+    # With the shared store, every extended dataset is published to it and mapped
+    # back, so the delta rows are not held by each worker
+    publish = functools.partial(publish_dataset, DATA_FILE) if SHARED_STORE else None
+    return DeltaIngester(delta_dir(DATA_FILE), _df, _indexes, version, base_digest=source_digest(DATA_FILE),
+                         publish=publish)
+
+@st.cache_resource
+def get_dashboard_cache():
+    # One cache per server process, shared by every session
+    return BoundedCache(
+        max_bytes=int(os.environ.get('VGSALES_CACHE_MB', '256')) * 1024 ** 2,
+        max_entries=int(os.environ.get('VGSALES_CACHE_ENTRIES', '512')),
+        ttl=float(os.environ.get('VGSALES_CACHE_TTL', '3600')),
+    )
 
-# Load data
-df = load_data()
+@st.cache_resource(max_entries=DATASET_VERSIONS_KEPT)
+def start_warmup(_df, _filter_index, _sales_cube, _rank_index, _cache, version):
+    # Once per server process and dataset version, precompute the default view
+    # and every quick preset in the background so first clicks are served hot
+    thread = threading.Thread(target=warm_views, name='vgsales-warmup', daemon=True,
+                              args=(_df, _filter_index, _sales_cube, _rank_index, _cache, version))
+    thread.start()
+    return thread
+
+# Load data (the source version keys the cache so edits to the CSV are picked up)
+dataset_version = source_version(DATA_FILE)
+if DUCKDB_BACKEND:
+    with span('load_duckdb'):
+        sales_db = load_duckdb_sales(dataset_version)
+    startup_profile.mark('DuckDB')
+else:
+    if SHARED_STORE:
+        with span('load_shared_store'):
+            df, filter_index, sales_cube, rank_index, franchise_index, title_index = load_shared_store(
+                dataset_version)
+        startup_profile.mark('Shared store')
+    else:
+        with span('load_data'):
+            df = load_data(dataset_version)
+        startup_profile.mark('Dataset')
+        with span('load_filter_index'):
+            filter_index = load_filter_index(df, dataset_version)
+        startup_profile.mark('Filter index')
+        with span('load_sales_cube'):
+            sales_cube = load_sales_cube(df, dataset_version)
+        startup_profile.mark('Sales cube')
+        with span('load_rank_index'):
+            rank_index = load_rank_index(df, dataset_version)
+        startup_profile.mark('Rank index')
+        with span('load_franchise_index'):
+            franchise_index = load_franchise_index(df, dataset_version)
+        startup_profile.mark('Franchise index')
+        with span('load_title_index'):
+            title_index = load_title_index(df, dataset_version)
+        startup_profile.mark('Title index')
+    # New delta files are appended to the dataset and give it a new version,
+    # the cube and every index are extended with just their rows
+    with span('ingest_deltas'):
+        df, indexes, dataset_version = get_delta_ingester(
+            df, (filter_index, sales_cube, rank_index, franchise_index, title_index), dataset_version).refresh()
+    filter_index, sales_cube, rank_index, franchise_index, title_index = indexes
+dashboard_cache = get_dashboard_cache()
+# Set VGSALES_WARMUP=0 to skip warming the presets
+if not DUCKDB_BACKEND and os.environ.get('VGSALES_WARMUP', '1') != '0':
+    start_warmup(df, filter_index, sales_cube, rank_index, dashboard_cache, dataset_version)
+
+startup_profile.mark('Warm-up start')
 
 # Page styling
 def apply_theme(theme):
@@ -164,9 +353,6 @@ def apply_theme(theme):
 # Apply the current theme
 apply_theme(st.session_state['theme'])
 
-# Initialize filtered_df to the full dataset at the start
-filtered_df = df.copy()
-
 # Sidebar
 with st.sidebar:
     # Logo and title section
@@ -193,162 +379,134 @@ with st.sidebar:
         If you have any questions, click the "❓" icons next to each filter!
         """)
 
+    # Filter options offered by the dataset
+    if DUCKDB_BACKEND:
+        filter_choices = sales_db.filter_options()
+        title_index = sales_db.title_index
+    else:
+        filter_choices = dataset_filter_options(df, franchise_index, title_index, dataset_version)
+    year_min, year_max = filter_choices['years']
+    platforms = filter_choices['platforms']
+    genres = filter_choices['genres']
+    top_publishers = filter_choices['publisher']
+
+    # Presets, defaults and user selections are reconciled in session state by
+    # widget callbacks before each run, and mirrored into the URL
+    filter_state = FilterState(defaults=default_filters(filter_choices), options=filter_choices)
+    filter_state.initialize()
+
     # Quick filter presets
     st.subheader("🚀 Quick Filter Presets")
-    preset_cols = st.columns(2)
-    with preset_cols[0]:
-        if st.button("Nintendo Games"):
-            st.session_state['preset_publisher'] = 'Nintendo'
-            st.rerun()
-    with preset_cols[1]:
-        if st.button("PlayStation Games"):
-            st.session_state['preset_platform'] = 'PS3'
-            st.rerun()
-
-    preset_cols2 = st.columns(2)
-    with preset_cols2[0]:
-        if st.button("2010-2015 Games"):
-            st.session_state['preset_years'] = (2010, 2015)
-            st.rerun()
-    with preset_cols2[1]:
-        if st.button("Action Games"):
-            st.session_state['preset_genre'] = 'Action'
-            st.rerun()
+    preset_names = list(QUICK_PRESETS)
+    for row_start in range(0, len(preset_names), 2):
+        preset_cols = st.columns(2)
+        for preset_col, preset in zip(preset_cols, preset_names[row_start:row_start + 2]):
+            with preset_col:
+                st.button(preset, on_click=filter_state.apply_preset, args=(preset,))
 
     # Clear filters button
-    if st.button("🔄 Clear All Filters", use_container_width=True):
-        st.session_state['preset_publisher'] = None
-        st.session_state['preset_platform'] = None
-        st.session_state['preset_years'] = None
-        st.session_state['preset_genre'] = None
-        # Clear any session state for platforms and genres
-        if 'selected_platforms' in st.session_state:
-            del st.session_state['selected_platforms']
-        if 'selected_genres' in st.session_state:
-            del st.session_state['selected_genres']
-        st.rerun()
+    st.button("🔄 Clear All Filters", use_container_width=True, on_click=filter_state.reset)
 
     st.markdown("---")
 
     # Theme switcher
     st.subheader("🎨 Appearance")
-    theme_option = st.radio("Select theme", ["Dark Mode", "Light Mode"], index=0 if st.session_state['theme'] == "dark" else 1)
-    if theme_option == "Dark Mode" and st.session_state['theme'] != "dark":
-        st.session_state['theme'] = "dark"
-        apply_theme("dark")
-        st.rerun()
-    elif theme_option == "Light Mode" and st.session_state['theme'] != "light":
-        st.session_state['theme'] = "light"
-        apply_theme("light")
-        st.rerun()
+    # The callback runs before the script, so a theme change costs a single run
+    # in which only the CSS and chart templates change
+    def switch_theme():
+        st.session_state['theme'] = "dark" if st.session_state['theme_option'] == "Dark Mode" else "light"
+
+    st.radio("Select theme", ["Dark Mode", "Light Mode"],
+             index=0 if st.session_state['theme'] == "dark" else 1,
+             key='theme_option', on_change=switch_theme)
 
     st.markdown("---")
 
     # Filters
     st.markdown('<div class="filter-title">📊 Data Filters</div>', unsafe_allow_html=True)
 
-    # Year range slider with preset handling
-    year_min = int(df['Year'].min())
-    year_max = int(df['Year'].max())
+    # Year range slider
     year_help = "Filter games by their release year. Drag both ends to set a range."
+    years = st.slider('📅 Year Range', year_min, year_max,
+                      key=FILTER_KEYS['years'],
+                      help=year_help)
 
-    # Handle year preset if set
-    if st.session_state['preset_years'] is not None:
-        preset_year_min, preset_year_max = st.session_state['preset_years']
-        years = st.slider('📅 Year Range', year_min, year_max,
-                          (preset_year_min, preset_year_max),
-                          help=year_help)
-    else:
-        years = st.slider('📅 Year Range', year_min, year_max,
-                         (year_min, year_max),
-                         help=year_help)
-
-    # Platform multiselect with preset handling
-    platforms = sorted(df['Platform'].unique())
+    # Platform multiselect
     platform_help = "Select one or more gaming platforms to filter the data."
-
-    # Handle platform preset if set
-    if st.session_state['preset_platform'] is not None:
-        selected_platforms = st.multiselect('🎮 Platform',
-                                           options=platforms,
-                                           default=[st.session_state['preset_platform']],
-                                           help=platform_help)
-    elif 'selected_platforms' in st.session_state:
-        selected_platforms = st.multiselect('🎮 Platform',
-                                           options=platforms,
-                                           default=st.session_state['selected_platforms'],
-                                           help=platform_help)
-    else:
-        selected_platforms = st.multiselect('🎮 Platform',
-                                           options=platforms,
-                                           default=platforms[:5],
-                                           help=platform_help)
+    selected_platforms = st.multiselect('🎮 Platform',
+                                        options=platforms,
+                                        key=FILTER_KEYS['platforms'],
+                                        help=platform_help)
 
     st.markdown('<div class="help-tooltip">Tip: You can search for platforms by typing</div>', unsafe_allow_html=True)
 
-    # Genre multiselect with preset handling
-    genres = sorted(df['Genre'].unique())
+    # Genre multiselect
     genre_help = "Select one or more game genres to filter the data."
+    selected_genres = st.multiselect('🏆 Genre',
+                                     options=genres,
+                                     key=FILTER_KEYS['genres'],
+                                     help=genre_help)
 
-    # Handle genre preset if set
-    if st.session_state['preset_genre'] is not None:
-        selected_genres = st.multiselect('🏆 Genre',
-                                        options=genres,
-                                        default=[st.session_state['preset_genre']],
-                                        help=genre_help)
-    elif 'selected_genres' in st.session_state:
-        selected_genres = st.multiselect('🏆 Genre',
-                                        options=genres,
-                                        default=st.session_state['selected_genres'],
-                                        help=genre_help)
-    else:
-        selected_genres = st.multiselect('🏆 Genre',
-                                        options=genres,
-                                        default=genres[:5],
-                                        help=genre_help)
-
-    # All button to select all publishers and genres - moved here after platforms and genres are defined
-    if st.button("All Games", use_container_width=True):
-        st.session_state['preset_publisher'] = None
-        st.session_state['preset_platform'] = None
-        st.session_state['preset_years'] = None
-        st.session_state['preset_genre'] = None
-        # Set selected_platforms to all platforms
-        st.session_state['selected_platforms'] = platforms
-        # Set selected_genres to all genres
-        st.session_state['selected_genres'] = genres
-        st.rerun()
-
-    # Publisher dropdown with preset handling
-    top_publishers = ['All'] + sorted(df['Publisher'].value_counts().head(20).index.tolist())
-    publisher_help = "Select a publisher to view only their games."
+    # All button to select all platforms and genres
+    st.button("All Games", use_container_width=True, on_click=filter_state.select_all)
 
-    # Handle publisher preset if set
-    if st.session_state['preset_publisher'] is not None:
-        publisher_index = top_publishers.index(st.session_state['preset_publisher']) if st.session_state['preset_publisher'] in top_publishers else 0
-        selected_publisher = st.selectbox('🏢 Publisher',
-                                         options=top_publishers,
-                                         index=publisher_index,
-                                         help=publisher_help)
-    else:
-        selected_publisher = st.selectbox('🏢 Publisher',
-                                         options=top_publishers,
-                                         help=publisher_help)
-
-    # Apply filters to the dataframe
-    filtered_df = df.copy()
-
-    # Apply filters
-    filtered_df = filtered_df[(filtered_df['Year'] >= years[0]) & (filtered_df['Year'] <= years[1])]
-
-    if selected_platforms:
-        filtered_df = filtered_df[filtered_df['Platform'].isin(selected_platforms)]
-
-    if selected_genres:
-        filtered_df = filtered_df[filtered_df['Genre'].isin(selected_genres)]
-
-    if selected_publisher != 'All':
-        filtered_df = filtered_df[filtered_df['Publisher'] == selected_publisher]
+    # Publisher dropdown
+    publisher_help = "Select a publisher to view only their games."
+    selected_publisher = st.selectbox('🏢 Publisher',
+                                      options=top_publishers,
+                                      key=FILTER_KEYS['publisher'],
+                                      help=publisher_help)
+
+    # Franchise multiselect
+    franchise_help = "Select one or more game series to view only their titles, sequels and spin-offs included."
+    selected_franchises = st.multiselect('🎬 Franchise',
+                                         options=filter_choices['franchises'],
+                                         key=FILTER_KEYS['franchises'],
+                                         help=franchise_help)
+
+    # Title search, matched on the title index as the query is typed
+    search_help = "Type part of a game's title to find it, then pick it below to filter to it and see its details."
+    title_query = st.text_input('🔎 Search Games', key='title_query',
+                                placeholder="e.g. Zelda, Grand Theft Auto", help=search_help)
+    with span('search_titles'):
+        title_matches = title_index.search(title_query, limit=TITLE_SEARCH_LIMIT)
+    if title_query.strip():
+        st.markdown(f'<div class="help-tooltip">{len(title_matches)} best matches, by global sales</div>',
+                    unsafe_allow_html=True)
+    # Picked titles stay available while the query changes
+    selected_before = st.session_state[FILTER_KEYS['titles']]
+    title_options = selected_before + [name for name in title_matches['Name'] if name not in selected_before]
+    selected_titles = st.multiselect('🎯 Games',
+                                     options=title_options,
+                                     key=FILTER_KEYS['titles'],
+                                     help="Games picked from the search results. Only these games are shown.")
+
+    # Keep the URL in step with the filters so the view can be shared
+    filter_state.sync_query_params()
+
+    # Compact signature of the current filter state, used as the cache key for
+    # everything derived from it
+    filter_signature = view_signature(dataset_version, filter_state.values)
+
+    # Charts roll up the matching cells of the sales cube instead of the rows,
+    # computing each distinct aggregate once for all of the charts that use it.
+    # Rollups are computed when a chart first asks for them and cached for this
+    # filter state, so switching back to a section re-uses them. On the DuckDB
+    # backend the slice filters and rolls up the rows in SQL instead.
+    # Franchises and titles are not cube dimensions, so their filters roll up
+    # the matching rows into cells of their own, once per filter state.
+    filter_selection = view_selection(filter_state.values)
+    with span('slice_cube'):
+        if DUCKDB_BACKEND:
+            cube_slice = sales_db.slice(dict(filter_selection, Name=selected_titles), selected_franchises)
+        elif selected_franchises or selected_titles:
+            cube_slice = CubeSlice(dashboard_cache.get_or_compute(
+                ('selection_cells', filter_signature),
+                lambda: freeze_frame(aggregate_rows(filtered_rows()))))
+        else:
+            cube_slice = sales_cube.slice(filter_selection)
+        selection_totals = cube_slice.totals()
+    aggregates = chart_aggregates(cube_slice, dashboard_cache, filter_signature)
 
     # Data summary
     st.markdown("---")
@@ -356,7 +514,7 @@ with st.sidebar:
     # Display a summary of current filters
     st.subheader("📋 Current Selection")
     st.info(f"""
-    Showing **{len(filtered_df):,}** games from **{years[0]}** to **{years[1]}**
+    Showing **{int(selection_totals['Count']):,}** games from **{years[0]}** to **{years[1]}**
 
     Platforms: **{len(selected_platforms)}** selected
 
@@ -368,17 +526,45 @@ with st.sidebar:
     # Download button
     st.subheader("💾 Export Data")
 
-    @st.cache_data
-    def convert_df_to_csv(df):
-        return df.to_csv(index=False).encode('utf-8')
+    # The export file is only generated once it is requested for the current selection
+    export_format = st.selectbox('Export format', options=list(EXPORT_FORMATS), key='export_format')
+    export_key = ('export', filter_signature, export_format)
+    if st.button("📦 Prepare download", use_container_width=True):
+        st.session_state['prepared_export'] = export_key
+
+    if st.session_state.get('prepared_export') == export_key:
+        export_extension, export_mime = EXPORT_FORMATS[export_format]
+        with span('export', format=export_format):
+            export_data = dashboard_cache.get_or_compute(
+                export_key,
+                lambda: export_bytes(filtered_rows(), export_format))
+        st.download_button(
+            label=f"📥 Download filtered data as {export_format}",
+            data=export_data,
+            file_name=f'vgsales_filtered.{export_extension}',
+            mime=export_mime,
+        )
 
-    csv = convert_df_to_csv(filtered_df)
-    st.download_button(
-        label="📥 Download filtered data as CSV",
-        data=csv,
-        file_name='vgsales_filtered.csv',
-        mime='text/csv',
-    )
+    # Memory footprint of the loaded dataset
+    with st.expander("🧠 Dataset Memory Usage", expanded=False):
+        if DUCKDB_BACKEND:
+            st.caption(f"Queried in place from {', '.join(sales_db.parquet_paths)} by DuckDB, "
+                       "only filtered and aggregated results are loaded")
+        else:
+            mem_report = dataset_memory_report(df, dataset_version)
+            st.dataframe(mem_report, hide_index=True, use_container_width=True)
+            if SHARED_STORE:
+                st.caption(f"Total: {mem_report['Bytes'].sum() / 1024 ** 2:.2f} MB, memory-mapped and shared by every worker")
+            else:
+                st.caption(f"Total: {mem_report['Bytes'].sum() / 1024 ** 2:.2f} MB in memory")
+
+    # Shared cache statistics for debugging
+    with st.expander("🛠️ Cache Statistics", expanded=False):
+        st.dataframe(dashboard_cache.stats(), hide_index=True, use_container_width=True)
+        st.caption(f"{dashboard_cache.total_bytes / 1024 ** 2:.2f} MB of "
+                   f"{dashboard_cache.max_bytes / 1024 ** 2:.0f} MB budget in use")
+
+startup_profile.mark('Sidebar')
 
 # Main page
 # Dashboard title with styled markdown
@@ -394,7 +580,7 @@ metric_cols = st.columns(4)
 with metric_cols[0]:
     st.markdown(f"""
     <div class="metric-card">
-        <div class="metric-value">{len(filtered_df):,}</div>
+        <div class="metric-value">{int(selection_totals['Count']):,}</div>
         <div class="metric-label">Total Games</div>
     </div>
     """, unsafe_allow_html=True)
@@ -402,7 +588,7 @@ with metric_cols[0]:
 with metric_cols[1]:
     st.markdown(f"""
     <div class="metric-card">
-        <div class="metric-value">${filtered_df['Global_Sales'].sum():.2f}M</div>
+        <div class="metric-value">${selection_totals['Global_Sales']:.2f}M</div>
         <div class="metric-label">Global Sales</div>
     </div>
     """, unsafe_allow_html=True)
@@ -410,7 +596,7 @@ with metric_cols[1]:
 with metric_cols[2]:
     st.markdown(f"""
     <div class="metric-card">
-        <div class="metric-value">{filtered_df['Platform'].nunique()}</div>
+        <div class="metric-value">{cube_slice.nunique('Platform')}</div>
         <div class="metric-label">Platforms</div>
     </div>
     """, unsafe_allow_html=True)
@@ -418,7 +604,7 @@ with metric_cols[2]:
 with metric_cols[3]:
     st.markdown(f"""
     <div class="metric-card">
-        <div class="metric-value">{filtered_df['Publisher'].nunique()}</div>
+        <div class="metric-value">{cube_slice.nunique('Publisher')}</div>
         <div class="metric-label">Publishers</div>
     </div>
     """, unsafe_allow_html=True)
@@ -446,11 +632,33 @@ if selected_publisher != 'All' or len(selected_platforms) < len(platforms) or le
 
     st.info(f"📊 Current filters: {' | '.join(filter_message)}")
 
-# Create tabs for different sections
-tab1, tab2, tab3,  tab5 = st.tabs(["📊 Sales Analysis", "🌍 Geographic Sales", "🎲 Genre Insights",  "📖 Data Storytelling"])
-
-# Tab 1: Sales Analysis
-with tab1:
+# Detail card of every game picked in the title search
+if selected_titles:
+    st.markdown("## 🔎 Selected Games")
+    for title in selected_titles:
+        versions = title_rows(title)
+        title_sales = versions[SALES_COLUMNS].sum()
+        with st.container(border=True):
+            st.subheader(title)
+            st.caption(f"Best rank **#{int(versions['Rank'].min())}** · "
+                       f"{len(versions)} version(s): {', '.join(versions['Platform'].astype(str))}")
+            card_cols = st.columns(5)
+            for col, (label, column) in zip(card_cols, [('Global Sales', 'Global_Sales'), ('North America', 'NA_Sales'),
+                                                        ('Europe', 'EU_Sales'), ('Japan', 'JP_Sales'),
+                                                        ('Rest of World', 'Other_Sales')]):
+                with col:
+                    st.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">${title_sales[column]:.2f}M</div>
+                        <div class="metric-label">{label}</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+            st.dataframe(versions[['Rank', 'Platform', 'Year', 'Genre', 'Publisher'] + SALES_COLUMNS],
+                         hide_index=True, use_container_width=True)
+
+# Sections of the dashboard, each rendered by its own function
+# Section 1: Sales Analysis
+def render_sales_analysis():
     st.header("📊 Sales Analysis")
 
     # Add helper text for new users
@@ -463,89 +671,25 @@ with tab1:
     # Sales trend over time
     st.subheader("Sales Trend Over Time")
 
-    # Group by Year and calculate sales
-    yearly_sales = filtered_df.groupby('Year')['Global_Sales'].sum().reset_index()
-    yearly_sales = yearly_sales.dropna()  # Remove rows with NaN years
-
-    # Create interactive line chart with Plotly
-    fig_trend = px.line(
-        yearly_sales,
-        x='Year',
-        y='Global_Sales',
-        title='Global Game Sales Trend Over Time (in millions)',
-        labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year'},
-        template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-    )
-
-    fig_trend.update_layout(
-        xaxis=dict(tickmode='linear', dtick=5),
-        hovermode='x unified',
-        height=350,
-        margin=dict(l=20, r=20, t=40, b=20)
-    )
-
-    fig_trend.update_traces(
-        line=dict(width=3),
-        mode='lines+markers'
-    )
-
-    safe_plotly_chart(fig_trend, use_container_width=True)
+    cached_chart('trend', lambda: trend_figure(aggregates))
 
     # Create two columns for the next charts
     col1, col2 = st.columns(2)
 
     with col1:
-        # Top 10 bestselling games
+        # Top 10 bestselling games, globally or in one region
         st.subheader("Top 10 Bestselling Games")
+        top_region = st.radio("Rank by sales in", list(TOP_N_REGIONS), horizontal=True, key='top_region',
+                              index=list(TOP_N_REGIONS).index(DEFAULT_TOP_REGION))
+        top_column = TOP_N_REGIONS[top_region]
 
-        top10_games = filtered_df.sort_values('Global_Sales', ascending=False).head(10)
-
-        fig_top10 = px.bar(
-            top10_games,
-            x='Global_Sales',
-            y='Name',
-            orientation='h',
-            color='Publisher',
-            hover_data=['Platform', 'Year', 'Genre'],
-            title='Top 10 Best-Selling Games (Global Sales in millions)',
-            labels={'Global_Sales': 'Global Sales (millions)', 'Name': 'Game Title', 'Publisher': 'Publisher'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        fig_top10.update_layout(
-            yaxis={'categoryorder': 'total ascending'},
-            height=500,
-            margin=dict(l=20, r=20, t=40, b=20)
-        )
-
-        safe_plotly_chart(fig_top10, use_container_width=True)
+        cached_chart(top10_chart_id(top_column), lambda: top10_figure(top_games(10, by=top_column), top_region))
 
     with col2:
         # Platform comparison - switched to Plotly for consistency
         st.subheader("Platform Comparison")
 
-        # Group by Platform
-        platform_sales = filtered_df.groupby('Platform')['Global_Sales'].sum().sort_values(ascending=False).head(10).reset_index()
-
-        fig_platform = px.bar(
-            platform_sales,
-            x='Global_Sales',
-            y='Platform',
-            orientation='h',
-            color='Global_Sales',
-            color_continuous_scale='blues' if st.session_state['theme'] == 'light' else 'Plasma',
-            title='Top 10 Platforms by Global Sales',
-            labels={'Global_Sales': 'Global Sales (millions)', 'Platform': 'Platform'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        fig_platform.update_layout(
-            yaxis={'categoryorder': 'total ascending'},
-            height=500,
-            margin=dict(l=20, r=20, t=40, b=20)
-        )
-
-        safe_plotly_chart(fig_platform, use_container_width=True)
+        cached_chart('platform', lambda: platform_figure(aggregates), theme_layout=platform_theme_layout())
 
     # Publisher analysis with animated bar chart
     st.subheader("Publisher Performance Over Time")
@@ -557,65 +701,39 @@ with tab1:
     </div>
     """, unsafe_allow_html=True)
 
-    # Get top 5 publishers by global sales
-    top_publishers = filtered_df.groupby('Publisher')['Global_Sales'].sum().sort_values(ascending=False).head(5).index.tolist()
-
-    # Filter data for top publishers and create a DataFrame grouped by Year and Publisher
-    top_pub_df = filtered_df[filtered_df['Publisher'].isin(top_publishers)]
-    pub_yearly = top_pub_df.groupby(['Year', 'Publisher'])['Global_Sales'].sum().reset_index()
-    pub_yearly = pub_yearly.dropna()  # Remove rows with NaN years
-
-    # Create an animated bar chart
-    fig_pub_animated = px.bar(
-        pub_yearly,
-        x='Publisher',
-        y='Global_Sales',
-        color='Publisher',
-        animation_frame='Year',
-        range_y=[0, pub_yearly['Global_Sales'].max() * 1.1],
-        title='Sales by Top Publishers Over Time',
-        labels={'Global_Sales': 'Global Sales (millions)', 'Publisher': 'Publisher', 'Year': 'Year'},
-        template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-    )
+    cached_chart('pub_animated', lambda: pub_animated_figure(aggregates))
 
-    fig_pub_animated.update_layout(
-        xaxis={'categoryorder': 'total descending'},
-        height=450,
-        margin=dict(l=20, r=20, t=40, b=20)
-    )
-
-    safe_plotly_chart(fig_pub_animated, use_container_width=True)
-
-# Tab 2: Geographic Sales
-with tab2:
+# Section 2: Geographic Sales
+def render_geographic_sales():
     st.header("🌍 Geographic Sales")
 
     # Regional sales comparison
     st.subheader("Regional Sales Comparison")
 
     # Calculate total sales by region
-    total_na = filtered_df['NA_Sales'].sum()
-    total_eu = filtered_df['EU_Sales'].sum()
-    total_jp = filtered_df['JP_Sales'].sum()
-    total_other = filtered_df['Other_Sales'].sum()
-
-    # Create a DataFrame for the regional data
-    regions_df = pd.DataFrame({
-        'Region': ['North America', 'Europe', 'Japan', 'Rest of World'],
-        'Sales': [total_na, total_eu, total_jp, total_other]
-    })
-
-    # Create a pie chart for regional distribution
-    fig_regions = px.pie(
-        regions_df,
-        values='Sales',
-        names='Region',
-        hole=0.4,
-        title='Global Sales Distribution by Region',
-        template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-    )
+    total_na = selection_totals['NA_Sales']
+    total_eu = selection_totals['EU_Sales']
+    total_jp = selection_totals['JP_Sales']
+    total_other = selection_totals['Other_Sales']
+
+    def build_regions():
+        # Create a DataFrame for the regional data
+        regions_df = pd.DataFrame({
+            'Region': ['North America', 'Europe', 'Japan', 'Rest of World'],
+            'Sales': [total_na, total_eu, total_jp, total_other]
+        })
+
+        # Create a pie chart for regional distribution
+        fig_regions = px.pie(
+            to_plot_frame(regions_df),
+            values='Sales',
+            names='Region',
+            hole=0.4,
+            title='Global Sales Distribution by Region'
+        )
+        return fig_regions
 
-    safe_plotly_chart(fig_regions, use_container_width=True)
+    cached_chart('regions', build_regions)
 
     # Regional preferences analysis
     st.subheader("Regional Gaming Preferences")
@@ -626,101 +744,106 @@ with tab2:
         # Top genres by region
         st.markdown("#### Top Genres by Region")
 
-        # Create a long-format DataFrame for genres by region
-        genres_by_region = pd.DataFrame({
-            'North America': filtered_df.groupby('Genre')['NA_Sales'].sum().sort_values(ascending=False).head(5),
-            'Europe': filtered_df.groupby('Genre')['EU_Sales'].sum().sort_values(ascending=False).head(5),
-            'Japan': filtered_df.groupby('Genre')['JP_Sales'].sum().sort_values(ascending=False).head(5)
-        }).reset_index()
-
-        genres_long = pd.melt(genres_by_region, id_vars=['Genre'], value_vars=['North America', 'Europe', 'Japan'],
-                              var_name='Region', value_name='Sales')
-
-        # Create a grouped bar chart
-        fig_genres_region = px.bar(
-            genres_long,
-            x='Genre',
-            y='Sales',
-            color='Region',
-            barmode='group',
-            title='Top Genres by Region',
-            labels={'Sales': 'Sales (millions)', 'Genre': 'Genre'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        safe_plotly_chart(fig_genres_region, use_container_width=True)
+        def build_genres_region():
+            # Create a long-format DataFrame for genres by region
+            genre_regional = aggregates.result('genres_by_region')
+            genres_by_region = pd.DataFrame({
+                'North America': genre_regional['NA_Sales'].sort_values(ascending=False).head(5),
+                'Europe': genre_regional['EU_Sales'].sort_values(ascending=False).head(5),
+                'Japan': genre_regional['JP_Sales'].sort_values(ascending=False).head(5)
+            }).reset_index()
+
+            genres_long = pd.melt(genres_by_region, id_vars=['Genre'], value_vars=['North America', 'Europe', 'Japan'],
+                                  var_name='Region', value_name='Sales')
+
+            # Create a grouped bar chart
+            fig_genres_region = px.bar(
+                to_plot_frame(genres_long),
+                x='Genre',
+                y='Sales',
+                color='Region',
+                barmode='group',
+                title='Top Genres by Region',
+                labels={'Sales': 'Sales (millions)', 'Genre': 'Genre'}
+            )
+            return fig_genres_region
+
+        cached_chart('genres_region', build_genres_region)
 
     with col2:
         # Regional performance over time
         st.markdown("#### Regional Sales Over Time")
 
-        # Group by Year and calculate sales by region
-        yearly_regional = filtered_df.groupby('Year')[['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales']].sum().reset_index()
-        yearly_regional = yearly_regional.dropna()  # Remove rows with NaN years
-
-        # Convert to long format for Plotly
-        yearly_regional_long = pd.melt(
-            yearly_regional,
-            id_vars=['Year'],
-            value_vars=['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales'],
-            var_name='Region',
-            value_name='Sales'
-        )
-
-        # Clean region names
-        yearly_regional_long['Region'] = yearly_regional_long['Region'].map({
-            'NA_Sales': 'North America',
-            'EU_Sales': 'Europe',
-            'JP_Sales': 'Japan',
-            'Other_Sales': 'Rest of World'
-        })
-
-        # Create the line chart
-        fig_region_time = px.line(
-            yearly_regional_long,
-            x='Year',
-            y='Sales',
-            color='Region',
-            title='Regional Sales Over Time',
-            labels={'Sales': 'Sales (millions)', 'Year': 'Year'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        fig_region_time.update_layout(xaxis=dict(tickmode='linear', dtick=5))
-        safe_plotly_chart(fig_region_time, use_container_width=True)
+        def build_region_time():
+            # Group by Year and calculate sales by region
+            yearly_regional = aggregates.result('regional_trend').reset_index()
+            yearly_regional = yearly_regional.dropna()  # Remove rows with NaN years
+
+            # Convert to long format for Plotly
+            yearly_regional_long = pd.melt(
+                yearly_regional,
+                id_vars=['Year'],
+                value_vars=['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales'],
+                var_name='Region',
+                value_name='Sales'
+            )
+
+            # Clean region names
+            yearly_regional_long['Region'] = yearly_regional_long['Region'].map({
+                'NA_Sales': 'North America',
+                'EU_Sales': 'Europe',
+                'JP_Sales': 'Japan',
+                'Other_Sales': 'Rest of World'
+            })
+
+            # Create the line chart
+            fig_region_time = px.line(
+                to_plot_frame(yearly_regional_long),
+                x='Year',
+                y='Sales',
+                color='Region',
+                title='Regional Sales Over Time',
+                labels={'Sales': 'Sales (millions)', 'Year': 'Year'}
+            )
+
+            fig_region_time.update_layout(xaxis=dict(tickmode='linear', dtick=5))
+            return fig_region_time
+
+        cached_chart('region_time', build_region_time)
 
     # World map visualization
     st.subheader("Global Sales Distribution")
 
-    # Create a world map data
-    map_data = pd.DataFrame({
-        'Country': ['United States', 'Canada', 'United Kingdom', 'France', 'Germany', 'Italy', 'Spain',
-                   'Japan', 'Australia', 'Brazil', 'Mexico', 'China', 'Russia', 'South Korea'],
-        'Sales': [total_na * 0.9, total_na * 0.1, total_eu * 0.3, total_eu * 0.2, total_eu * 0.25,
-                 total_eu * 0.15, total_eu * 0.1, total_jp, total_other * 0.15, total_other * 0.15,
-                 total_other * 0.1, total_other * 0.3, total_other * 0.15, total_other * 0.15],
-        'iso_alpha': ['USA', 'CAN', 'GBR', 'FRA', 'DEU', 'ITA', 'ESP', 'JPN', 'AUS', 'BRA', 'MEX', 'CHN', 'RUS', 'KOR']
-    })
-
-    # Create choropleth map
-    fig_map = px.choropleth(
-        map_data,
-        locations='iso_alpha',
-        color='Sales',
-        hover_name='Country',
-        projection='natural earth',
-        title='Estimated Video Game Sales Distribution Worldwide (millions)',
-        color_continuous_scale=px.colors.sequential.Plasma,
-        template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-    )
+    def build_map():
+        # Create a world map data
+        map_data = pd.DataFrame({
+            'Country': ['United States', 'Canada', 'United Kingdom', 'France', 'Germany', 'Italy', 'Spain',
+                       'Japan', 'Australia', 'Brazil', 'Mexico', 'China', 'Russia', 'South Korea'],
+            'Sales': [total_na * 0.9, total_na * 0.1, total_eu * 0.3, total_eu * 0.2, total_eu * 0.25,
+                     total_eu * 0.15, total_eu * 0.1, total_jp, total_other * 0.15, total_other * 0.15,
+                     total_other * 0.1, total_other * 0.3, total_other * 0.15, total_other * 0.15],
+            'iso_alpha': ['USA', 'CAN', 'GBR', 'FRA', 'DEU', 'ITA', 'ESP', 'JPN', 'AUS', 'BRA', 'MEX', 'CHN', 'RUS', 'KOR']
+        })
 
-    safe_plotly_chart(fig_map, use_container_width=True)
+        # Create choropleth map
+        fig_map = px.choropleth(
+            to_plot_frame(map_data),
+            locations='iso_alpha',
+            color='Sales',
+            hover_name='Country',
+            projection='natural earth',
+            title='Estimated Video Game Sales Distribution Worldwide (millions)',
+            color_continuous_scale=px.colors.sequential.Plasma
+        )
+        return fig_map
+
+    cached_chart('map', build_map)
 
     # Add a note about the map data
     st.info("⚠️ Note: This map shows an approximate distribution based on the regional data. Individual country data is estimated for visualization purposes.")
 
-# Tab 3: Genre Insights
-with tab3:
+# Section 3: Genre Insights
+def render_genre_insights():
     st.header("🎲 Genre Insights")
 
     # Genre performance analysis
@@ -729,69 +852,73 @@ with tab3:
     col1, col2 = st.columns(2)
 
     with col1:
-        # Get sales by genre
-        genre_sales = filtered_df.groupby('Genre')['Global_Sales'].sum().sort_values(ascending=False).reset_index()
-
-        # Create a bar chart for genre sales
-        fig_genre_sales = px.bar(
-            genre_sales,
-            x='Genre',
-            y='Global_Sales',
-            color='Genre',
-            title='Global Sales by Genre',
-            labels={'Global_Sales': 'Global Sales (millions)', 'Genre': 'Genre'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        safe_plotly_chart(fig_genre_sales, use_container_width=True)
+        def build_genre_sales():
+            # Get sales by genre
+            genre_sales = aggregates.result('genre_sales')['Global_Sales'].sort_values(ascending=False).reset_index()
+
+            # Create a bar chart for genre sales
+            fig_genre_sales = px.bar(
+                to_plot_frame(genre_sales),
+                x='Genre',
+                y='Global_Sales',
+                color='Genre',
+                title='Global Sales by Genre',
+                labels={'Global_Sales': 'Global Sales (millions)', 'Genre': 'Genre'}
+            )
+            return fig_genre_sales
+
+        cached_chart('genre_sales', build_genre_sales)
 
     with col2:
-        # Get number of games by genre
-        genre_counts = filtered_df['Genre'].value_counts().reset_index()
-        genre_counts.columns = ['Genre', 'Count']
-
-        # Create a bar chart for game counts by genre
-        fig_genre_counts = px.bar(
-            genre_counts,
-            x='Genre',
-            y='Count',
-            color='Genre',
-            title='Number of Games by Genre',
-            labels={'Count': 'Number of Games', 'Genre': 'Genre'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        safe_plotly_chart(fig_genre_counts, use_container_width=True)
+        def build_genre_counts():
+            # Get number of games by genre
+            genre_counts = aggregates.result('genre_counts')['Count'].sort_values(ascending=False).reset_index()
+            genre_counts.columns = ['Genre', 'Count']
+
+            # Create a bar chart for game counts by genre
+            fig_genre_counts = px.bar(
+                to_plot_frame(genre_counts),
+                x='Genre',
+                y='Count',
+                color='Genre',
+                title='Number of Games by Genre',
+                labels={'Count': 'Number of Games', 'Genre': 'Genre'}
+            )
+            return fig_genre_counts
+
+        cached_chart('genre_counts', build_genre_counts)
 
     # Genre popularity over time
     st.subheader("Genre Popularity Over Time")
 
-    # Group data by year and genre
-    genre_yearly = filtered_df.groupby(['Year', 'Genre'])['Global_Sales'].sum().reset_index()
-    genre_yearly = genre_yearly.dropna()  # Remove rows with NaN years
-
-    # Get top 5 genres for better visualization
-    top_genres = filtered_df.groupby('Genre')['Global_Sales'].sum().sort_values(ascending=False).head(5).index.tolist()
-    genre_yearly_filtered = genre_yearly[genre_yearly['Genre'].isin(top_genres)]
-
-    # Create line chart
-    fig_genre_time = px.line(
-        genre_yearly_filtered,
-        x='Year',
-        y='Global_Sales',
-        color='Genre',
-        title='Top 5 Genres Sales Trend Over Time',
-        labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Genre': 'Genre'},
-        template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-    )
+    def build_genre_time():
+        # Group data by year and genre
+        genre_yearly = aggregates.result('genre_trend').reset_index()
+        genre_yearly = genre_yearly.dropna()  # Remove rows with NaN years
 
-    fig_genre_time.update_layout(xaxis=dict(tickmode='linear', dtick=5))
-    safe_plotly_chart(fig_genre_time, use_container_width=True)
+        # Get top 5 genres for better visualization
+        top_genres = aggregates.top('genre_sales', n=5)
+        genre_yearly_filtered = genre_yearly[genre_yearly['Genre'].isin(top_genres)]
 
+        # Create line chart
+        fig_genre_time = px.line(
+            to_plot_frame(genre_yearly_filtered),
+            x='Year',
+            y='Global_Sales',
+            color='Genre',
+            title='Top 5 Genres Sales Trend Over Time',
+            labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Genre': 'Genre'}
+        )
+
+        fig_genre_time.update_layout(xaxis=dict(tickmode='linear', dtick=5))
+        return fig_genre_time
 
+    cached_chart('genre_time', build_genre_time)
 
-# Tab 5: Data Storytelling
-with tab5:
+
+
+# Section 4: Data Storytelling
+def render_data_storytelling():
     st.header("📖 Data Storytelling")
 
     # Create an engaging storytelling layout
@@ -822,100 +949,106 @@ with tab5:
 
     # Let's create story sections using st.expander for each chapter
     with st.expander("Chapter 1: The Rise and Fall of Gaming Platforms 📈", expanded=True):
-        # Platform evolution analysis
-        platform_by_year = filtered_df.groupby(['Year', 'Platform'])['Global_Sales'].sum().reset_index()
-        platform_by_year = platform_by_year.dropna()  # Remove NaN years
-
-        # Get top platforms over time
-        top_platforms_overall = filtered_df.groupby('Platform')['Global_Sales'].sum().sort_values(ascending=False).head(6).index.tolist()
-        platform_evolution_df = platform_by_year[platform_by_year['Platform'].isin(top_platforms_overall)]
-
-        # Create the line chart for platform evolution
-        fig_platform_evolution = px.line(
-            platform_evolution_df,
-            x='Year',
-            y='Global_Sales',
-            color='Platform',
-            title='Evolution of Top Gaming Platforms',
-            labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Platform': 'Platform'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        fig_platform_evolution.update_layout(xaxis=dict(tickmode='linear', dtick=5))
-        safe_plotly_chart(fig_platform_evolution, use_container_width=True)
+        def build_platform_evolution():
+            # Platform evolution analysis
+            platform_by_year = aggregates.result('platform_evolution').reset_index()
+            platform_by_year = platform_by_year.dropna()  # Remove NaN years
+
+            # Get top platforms over time
+            top_platforms_overall = aggregates.top('platform_comparison', n=6)
+            platform_evolution_df = platform_by_year[platform_by_year['Platform'].isin(top_platforms_overall)]
+
+            # Create the line chart for platform evolution
+            fig_platform_evolution = px.line(
+                to_plot_frame(platform_evolution_df),
+                x='Year',
+                y='Global_Sales',
+                color='Platform',
+                title='Evolution of Top Gaming Platforms',
+                labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Platform': 'Platform'}
+            )
+
+            fig_platform_evolution.update_layout(xaxis=dict(tickmode='linear', dtick=5))
+            return fig_platform_evolution
+
+        cached_chart('platform_evolution', build_platform_evolution)
 
         st.markdown('<div class="story-text">The gaming industry has witnessed dramatic shifts in platform dominance over the decades. From the rise of home consoles like the <span class="highlight">NES and PlayStation</span> to the emergence of handheld gaming with the <span class="highlight">Game Boy and Nintendo DS</span>, each platform has had its moment in the spotlight.</div>', unsafe_allow_html=True)
 
         st.markdown('<div class="story-text">As technology advanced, we saw a transition from 8-bit and 16-bit consoles to more sophisticated systems capable of 3D rendering and online connectivity. Each generation brought new capabilities and expanded the potential market for video games.</div>', unsafe_allow_html=True)
 
     with st.expander("Chapter 2: Changing Genre Preferences 🎭", expanded=True):
-        # Genre evolution analysis
-        genre_by_year = filtered_df.groupby(['Year', 'Genre'])['Global_Sales'].sum().reset_index()
-        genre_by_year = genre_by_year.dropna()  # Remove NaN years
-
-        # Get top genres
-        top_genres_overall = filtered_df.groupby('Genre')['Global_Sales'].sum().sort_values(ascending=False).head(5).index.tolist()
-        genre_evolution_df = genre_by_year[genre_by_year['Genre'].isin(top_genres_overall)]
-
-        # Create the area chart for genre evolution
-        fig_genre_evolution = px.area(
-            genre_evolution_df,
-            x='Year',
-            y='Global_Sales',
-            color='Genre',
-            title='Evolution of Game Genres',
-            labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Genre': 'Genre'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        fig_genre_evolution.update_layout(xaxis=dict(tickmode='linear', dtick=5))
-        safe_plotly_chart(fig_genre_evolution, use_container_width=True)
+        def build_genre_evolution():
+            # Genre evolution analysis
+            genre_by_year = aggregates.result('genre_evolution').reset_index()
+            genre_by_year = genre_by_year.dropna()  # Remove NaN years
+
+            # Get top genres
+            top_genres_overall = aggregates.top('genre_sales', n=5)
+            genre_evolution_df = genre_by_year[genre_by_year['Genre'].isin(top_genres_overall)]
+
+            # Create the area chart for genre evolution
+            fig_genre_evolution = px.area(
+                to_plot_frame(genre_evolution_df),
+                x='Year',
+                y='Global_Sales',
+                color='Genre',
+                title='Evolution of Game Genres',
+                labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Genre': 'Genre'}
+            )
+
+            fig_genre_evolution.update_layout(xaxis=dict(tickmode='linear', dtick=5))
+            return fig_genre_evolution
+
+        cached_chart('genre_evolution', build_genre_evolution)
 
         st.markdown('<div class="story-text">Consumer preferences have evolved substantially over time. In the early days, <span class="highlight">platformers and puzzles</span> dominated the market. As gaming matured, we saw the rise of <span class="highlight">action, sports, and role-playing games</span>.</div>', unsafe_allow_html=True)
 
         st.markdown('<div class="story-text">Different regions also developed distinct preferences. While North America embraced sports and action titles, Japan showed a stronger affinity for role-playing games and unique gaming experiences.</div>', unsafe_allow_html=True)
 
     with st.expander("Chapter 3: The Publishers' Battle 🏢", expanded=True):
-        # Publishers evolution
-        top_publishers_overall = filtered_df.groupby('Publisher')['Global_Sales'].sum().sort_values(ascending=False).head(5).index.tolist()
-        publishers_by_year = filtered_df[filtered_df['Publisher'].isin(top_publishers_overall)].groupby(['Year', 'Publisher'])['Global_Sales'].sum().reset_index()
-        publishers_by_year = publishers_by_year.dropna()  # Remove NaN years
-
-        # Create stacked bar chart
-        fig_publisher_battle = px.bar(
-            publishers_by_year,
-            x='Year',
-            y='Global_Sales',
-            color='Publisher',
-            title='Battle of the Publishers Over Time',
-            labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Publisher': 'Publisher'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white'
-        )
-
-        safe_plotly_chart(fig_publisher_battle, use_container_width=True)
+        def build_publisher_battle():
+            # Publishers evolution
+            top_publishers_overall = aggregates.top('publisher_totals', n=5)
+            publishers_by_year = aggregates.result('publishers_battle').reset_index()
+            publishers_by_year = publishers_by_year[publishers_by_year['Publisher'].isin(top_publishers_overall)]
+            publishers_by_year = publishers_by_year.dropna()  # Remove NaN years
+
+            # Create stacked bar chart
+            fig_publisher_battle = px.bar(
+                to_plot_frame(publishers_by_year),
+                x='Year',
+                y='Global_Sales',
+                color='Publisher',
+                title='Battle of the Publishers Over Time',
+                labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year', 'Publisher': 'Publisher'}
+            )
+            return fig_publisher_battle
+
+        cached_chart('publisher_battle', build_publisher_battle)
 
         st.markdown('<div class="story-text">Behind every successful game is a publisher with the vision and resources to bring it to market. The industry has seen fierce competition between publishing giants like <span class="highlight">Nintendo, Electronic Arts, and Activision</span>.</div>', unsafe_allow_html=True)
 
         st.markdown('<div class="story-text">Nintendo has consistently dominated with its first-party titles and iconic franchises. Electronic Arts built its empire on sports titles and licensed games, while Activision found tremendous success with its Call of Duty franchise.</div>', unsafe_allow_html=True)
 
     with st.expander("Chapter 4: Blockbuster Franchises 🌟", expanded=True):
-        # Find game franchises (simplified by looking for common name patterns)
-        filtered_df['Franchise'] = filtered_df['Name'].str.split(':').str[0]
-        franchise_sales = filtered_df.groupby('Franchise')['Global_Sales'].sum().sort_values(ascending=False).head(10).reset_index()
-
-        # Create bar chart for franchises
-        fig_franchises = px.bar(
-            franchise_sales,
-            x='Franchise',
-            y='Global_Sales',
-            color='Global_Sales',
-            title='Top 10 Game Franchises by Global Sales',
-            labels={'Global_Sales': 'Global Sales (millions)', 'Franchise': 'Franchise'},
-            template='plotly_dark' if st.session_state['theme'] == 'dark' else 'plotly_white',
-            color_continuous_scale=px.colors.sequential.Viridis
-        )
-
-        safe_plotly_chart(fig_franchises, use_container_width=True)
+        def build_franchises():
+            # Find game franchises (simplified by looking for common name patterns)
+            franchise_sales = top_franchises(10)
+
+            # Create bar chart for franchises
+            fig_franchises = px.bar(
+                to_plot_frame(franchise_sales),
+                x='Franchise',
+                y='Global_Sales',
+                color='Global_Sales',
+                title='Top 10 Game Franchises by Global Sales',
+                labels={'Global_Sales': 'Global Sales (millions)', 'Franchise': 'Franchise'},
+                color_continuous_scale=px.colors.sequential.Viridis
+            )
+            return fig_franchises
+
+        cached_chart('franchises', build_franchises)
 
         st.markdown('<div class="story-text">Franchises have become the backbone of the gaming industry. Iconic series like <span class="highlight">Mario, Pokémon, and Call of Duty</span> have generated billions in revenue across multiple titles and platforms.</div>', unsafe_allow_html=True)
 
@@ -924,24 +1057,71 @@ with tab5:
     # Random Fun Fact Generator
     st.markdown("## 🎲 Random Fun Fact Generator")
 
-    # Define fun facts based on data analysis
-    fun_facts = [
-        f"The best-selling video game of all time is {filtered_df.sort_values('Global_Sales', ascending=False).iloc[0]['Name']} with {filtered_df.sort_values('Global_Sales', ascending=False).iloc[0]['Global_Sales']:.2f}M copies sold globally!",
-        f"Nintendo has published {len(filtered_df[filtered_df['Publisher'] == 'Nintendo'])} games in our dataset, more than any other publisher!",
-        f"The most productive year for gaming was {filtered_df.groupby('Year')['Name'].count().idxmax()}, with {filtered_df.groupby('Year')['Name'].count().max()} games released!",
-        f"Japan seems to prefer {filtered_df.groupby('Genre')['JP_Sales'].sum().idxmax()} games, while North America prefers {filtered_df.groupby('Genre')['NA_Sales'].sum().idxmax()} games!",
-        f"The platform with the highest average sales per game is {filtered_df.groupby('Platform')['Global_Sales'].mean().idxmax()}, with {filtered_df.groupby('Platform')['Global_Sales'].mean().max():.2f}M average sales!",
-
-        f"European gamers spend more on {filtered_df.groupby('Genre')['EU_Sales'].sum().idxmax()} games than any other genre!",
-        f"The average lifespan of a gaming platform in the dataset is approximately 7 years!",
-
-        f"Sports games made up {len(filtered_df[filtered_df['Genre'] == 'Sports']) / len(filtered_df) * 100:.1f}% of all video games in our dataset!"
-    ]
-
-    # Button to generate a random fact
+    # Only the fact picked for display is computed, from the cached aggregates
     if st.button("🎮 Generate Random Fun Fact"):
-        st.success(random.choice(fun_facts))
+        fact = random_fact(aggregates, selection_totals, top_games)
+        if fact:
+            st.success(fact)
+        else:
+            st.info("No fun facts for the current filters, try widening them.")
     # Conclusion
     st.markdown('<div class="story-header">The Future of Gaming 🚀</div>', unsafe_allow_html=True)
     st.markdown('<div class="story-text">As we look to the future, the video game industry continues to evolve at a rapid pace. New technologies like cloud gaming, virtual reality, and artificial intelligence are reshaping how games are developed and experienced.</div>', unsafe_allow_html=True)
     st.markdown('<div class="story-text">While this dataset only covers up to recent years, the trends and patterns we\'ve observed provide valuable insights into consumer preferences and market dynamics that will likely influence the industry for years to come.</div>', unsafe_allow_html=True)
+
+
+SECTIONS = {
+    "📊 Sales Analysis": render_sales_analysis,
+    "🌍 Geographic Sales": render_geographic_sales,
+    "🎲 Genre Insights": render_genre_insights,
+    "📖 Data Storytelling": render_data_storytelling,
+}
+
+startup_profile.mark('Overview')
+
+if LAZY_SECTIONS:
+    # Only the active section computes its aggregates and builds its charts
+    active_section = st.radio("Section", list(SECTIONS), horizontal=True,
+                              key='active_section', label_visibility='collapsed')
+    with span('section', section=active_section):
+        SECTIONS[active_section]()
+else:
+    # Create tabs for different sections
+    for section_tab, (section_name, render_section) in zip(st.tabs(list(SECTIONS)), SECTIONS.items()):
+        with section_tab, span('section', section=section_name):
+            render_section()
+
+# Chart payload sizes for this run, added to the sidebar once every chart is rendered
+with st.sidebar:
+    with st.expander("📦 Chart Payloads", expanded=False):
+        payload_report = pd.DataFrame({
+            'Chart': list(chart_payloads),
+            'KB': [round(size / 1024, 1) for size in chart_payloads.values()],
+        })
+        st.dataframe(payload_report, hide_index=True, use_container_width=True)
+        st.caption(f"{sum(chart_payloads.values()) / 1024:.1f} KB sent for {len(chart_payloads)} charts")
+
+# Cold start profile of this process, written to VGSALES_STARTUP_PROFILE when set
+startup_profile.mark('Sections')
+startup_profile.finish(budget=float(os.environ.get('VGSALES_STARTUP_BUDGET', '10')))
+with st.sidebar:
+    with st.expander("⏱️ Startup Profile", expanded=False):
+        st.dataframe(startup_profile.to_frame().round({'ms': 1}), hide_index=True, use_container_width=True)
+        st.caption(f"First run finished in {startup_profile.total:.2f} s")
+        st.download_button("Download startup profile", data=startup_profile.to_json(),
+                           file_name='startup_profile.json', mime='application/json')
+
+# Timing spans of this run, only shown while tracing is enabled. Finished runs
+# are appended to VGSALES_TRACE_LOG (JSON lines) and summed into the Prometheus
+# text file at VGSALES_METRICS_FILE when those are set.
+run_trace = end_run()
+if run_trace is not None:
+    publish_run(run_trace, os.environ.get('VGSALES_TRACE_LOG'), os.environ.get('VGSALES_METRICS_FILE'))
+    with st.sidebar:
+        with st.expander("⚡ Performance", expanded=False):
+            st.dataframe(run_trace.to_frame(), hide_index=True, use_container_width=True)
+            st.caption(f"Run took {run_trace.total_ms:.1f} ms")
+            st.download_button("Download spans (JSON lines)", data=run_trace.to_jsonl(),
+                               file_name='vgsales_spans.jsonl', mime='application/x-ndjson')
+            st.download_button("Download metrics (Prometheus)", data=span_metrics.to_prometheus(),
+                               file_name='vgsales_metrics.prom', mime='text/plain')
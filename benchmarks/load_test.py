@@ -0,0 +1,200 @@
+"""Concurrent-session load test for app.py
+
+Simulates N users on one Streamlit worker: every session is an AppTest
+instance driven from its own thread, sharing the process-wide caches like
+real sessions do, and makes randomized filter, preset, section and theme
+changes. Reports throughput, rerun latency percentiles and the memory each
+session adds.
+
+    python benchmarks/load_test.py --sessions 20 --interactions 30
+    python benchmarks/load_test.py --sessions 50 --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+from run_benchmarks import REPO_ROOT, RUN_TIMEOUT, dataset_path, peak_rss_mb, percentile
+
+
+def session_app_test_class():
+    """AppTest variant whose instances can run alongside each other
+
+    AppTest installs a mock Streamlit runtime for the length of every run and
+    removes it afterwards, which pulls the runtime from under any other
+    session running at the same time. The load test installs one runtime for
+    the whole process and its sessions leave it in place. Like on a server,
+    the sessions also share one compiled copy of the script.
+    """
+    from unittest.mock import MagicMock
+    from urllib import parse
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    if Runtime._instance is None:
+        runtime = MagicMock(spec=Runtime)
+        runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+        runtime.cache_storage_manager = MemoryCacheStorageManager()
+        Runtime._instance = runtime
+
+    script_cache = ScriptCache()
+
+    class SessionAppTest(AppTest):
+        def _run(self, widget_state=None, timeout=None):
+            script_runner = LocalScriptRunner(self._script_path, self.session_state)
+            script_runner._script_cache = script_cache
+            self._tree = script_runner.run(widget_state, self.query_params, timeout or self.default_timeout)
+            self._tree._runner = self
+            query_string = script_runner.event_data[-1]["client_state"].query_string
+            self.query_params = parse.parse_qs(query_string)
+            return self
+
+    return SessionAppTest
+
+
+def current_rss_mb():
+    """Resident set size of this process right now"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except OSError:
+        # Outside Linux only the peak is available
+        return peak_rss_mb()
+
+
+def _random_interaction(at, rng):
+    """Apply one random user action to a session and return its name"""
+    from filter_state import FILTER_KEYS, QUICK_PRESETS
+
+    action = rng.choice(['years', 'platforms', 'genres', 'publisher', 'preset', 'section', 'theme', 'clear'])
+    if action == 'years':
+        slider = at.slider(key=FILTER_KEYS['years'])
+        start = rng.randint(int(slider.min), int(slider.max))
+        slider.set_value((start, rng.randint(start, int(slider.max))))
+    elif action in ('platforms', 'genres'):
+        widget = at.multiselect(key=FILTER_KEYS[action])
+        widget.set_value(rng.sample(widget.options, rng.randint(1, min(6, len(widget.options)))))
+    elif action == 'publisher':
+        widget = at.selectbox(key=FILTER_KEYS['publisher'])
+        widget.set_value(rng.choice(widget.options))
+    elif action == 'section':
+        widget = at.radio(key='active_section')
+        widget.set_value(rng.choice(widget.options))
+    elif action == 'theme':
+        widget = at.radio(key='theme_option')
+        widget.set_value("Light Mode" if widget.value == "Dark Mode" else "Dark Mode")
+    else:
+        label = rng.choice(list(QUICK_PRESETS)) if action == 'preset' else "🔄 Clear All Filters"
+        next(button for button in at.button if button.label == label).click()
+    return action
+
+
+def run_session(app_test_class, number, interactions, seed, latencies, errors, start_barrier):
+    rng = random.Random(seed + number)
+    at = app_test_class(os.path.join(REPO_ROOT, 'app.py'), default_timeout=RUN_TIMEOUT)
+    try:
+        at.run()
+        start_barrier.wait()
+        for _ in range(interactions):
+            action = _random_interaction(at, rng)
+            started = time.perf_counter()
+            at.run()
+            latencies.append((action, (time.perf_counter() - started) * 1000))
+            if at.exception:
+                errors.append(f"session {number}, {action}: {at.exception[0].message}")
+                break
+    except Exception as exc:
+        errors.append(f"session {number}: {exc!r}")
+        start_barrier.abort()
+
+
+def run_load_test(sessions, interactions, seed=0):
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+
+    app_test_class = session_app_test_class()
+    latencies = []
+    errors = []
+    # Load the shared dataset, indexes and caches first, so the memory
+    # measured afterwards is what each additional session costs
+    app_test_class(os.path.join(REPO_ROOT, 'app.py'), default_timeout=RUN_TIMEOUT).run()
+    baseline_rss = current_rss_mb()
+    # Sessions open first, then every session starts interacting at the same time
+    start_barrier = threading.Barrier(sessions + 1)
+    threads = [
+        threading.Thread(target=run_session, name=f'session-{i}',
+                         args=(app_test_class, i, interactions, seed, latencies, errors, start_barrier))
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        start_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    opened_rss = current_rss_mb()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    values = [ms for _, ms in latencies]
+    return {
+        'sessions': sessions,
+        'reruns': len(values),
+        'seconds': elapsed,
+        'throughput': len(values) / elapsed if elapsed else float('nan'),
+        'p50_ms': percentile(values, 0.50),
+        'p95_ms': percentile(values, 0.95),
+        'p99_ms': percentile(values, 0.99),
+        'max_ms': max(values, default=float('nan')),
+        'rss_per_session_mb': (opened_rss - baseline_rss) / sessions,
+        'final_rss_per_session_mb': (current_rss_mb() - baseline_rss) / sessions,
+        'peak_rss_mb': peak_rss_mb(),
+        'by_action': {
+            action: percentile([ms for name, ms in latencies if name == action], 0.95)
+            for action in sorted({name for name, _ in latencies})
+        },
+        'errors': errors,
+    }
+
+
+def print_report(result):
+    print(f"{result['sessions']} sessions, {result['reruns']} reruns in {result['seconds']:.1f} s "
+          f"({result['throughput']:.1f} reruns/s)")
+    print(f"latency  p50 {result['p50_ms']:.1f} ms  p95 {result['p95_ms']:.1f} ms  "
+          f"p99 {result['p99_ms']:.1f} ms  max {result['max_ms']:.1f} ms")
+    print(f"memory   {result['rss_per_session_mb']:.1f} MB per session once opened, "
+          f"{result['final_rss_per_session_mb']:.1f} MB after the run, peak RSS {result['peak_rss_mb']:.0f} MB")
+    for action, p95 in result['by_action'].items():
+        print(f"  p95 {action:<10} {p95:8.1f} ms")
+    for error in result['errors']:
+        print(f"ERROR {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--interactions', type=int, default=30, help="reruns per session")
+    parser.add_argument('--rows', type=int, help="use a synthetic dataset of this size")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.rows:
+        os.environ['VGSALES_DATA_FILE'] = dataset_path(args.rows)
+    result = run_load_test(args.sessions, args.interactions, args.seed)
+    print_report(result)
+    sys.exit(1 if result['errors'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Headless rerun benchmarks for app.py
+
+Drives the dashboard with Streamlit's AppTest harness, no browser or
+server, through cold start, the default view, every quick preset, every
+section, year slider sweeps, platform and genre changes and theme toggles.
+Each dataset size runs in a fresh process so cold start and peak RSS are
+measured on their own. Synthetic datasets are generated on first use.
+
+    python benchmarks/run_benchmarks.py --rows 16000 1000000 10000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DATA_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'data')
+DEFAULT_ROWS = [16_000, 1_000_000, 10_000_000]
+
+# Seconds AppTest waits for a single run, the cold start at 10M rows is slow
+RUN_TIMEOUT = 1800
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return float('nan')
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Recorder:
+    """Rerun latencies per scenario, and the process's peak RSS once each one is done
+
+    The peak RSS is the high-water mark of the whole process, so a scenario's
+    figure includes the memory of every scenario run before it.
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.process_peak_rss = {}
+
+    def time(self, scenario, run):
+        started = time.perf_counter()
+        at = run()
+        elapsed = time.perf_counter() - started
+        if at.exception:
+            raise RuntimeError(f"{scenario}: {at.exception[0].message}")
+        self.latencies.setdefault(scenario, []).append(elapsed * 1000)
+        self.process_peak_rss[scenario] = peak_rss_mb()
+        return at
+
+    def summary(self):
+        return [{
+            'scenario': scenario,
+            'runs': len(values),
+            'p50_ms': percentile(values, 0.50),
+            'p95_ms': percentile(values, 0.95),
+            'process_peak_rss_mb': self.process_peak_rss[scenario],
+        } for scenario, values in self.latencies.items()]
+
+
+def _button(at, label):
+    return next(button for button in at.button if button.label == label)
+
+
+def run_scenarios(repeat):
+    """Drive app.py through every scenario in this process and return the summary"""
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    from filter_state import FILTER_KEYS, QUICK_PRESETS
+
+    recorder = Recorder()
+    at = AppTest.from_file(os.path.join(REPO_ROOT, 'app.py'), default_timeout=RUN_TIMEOUT)
+    at = recorder.time('cold_start', at.run)
+
+    for _ in range(repeat):
+        recorder.time('default_view', at.run)
+
+    sections = at.radio(key='active_section').options
+    for _ in range(repeat):
+        for section in sections[1:] + sections[:1]:
+            recorder.time(f'section:{section}', at.radio(key='active_section').set_value(section).run)
+
+    for _ in range(repeat):
+        for preset in QUICK_PRESETS:
+            recorder.time(f'preset:{preset}', _button(at, preset).click().run)
+            at = _button(at, "🔄 Clear All Filters").click().run()
+
+    year_slider = at.slider(key=FILTER_KEYS['years'])
+    year_min, year_max = int(year_slider.min), int(year_slider.max)
+    for _ in range(repeat):
+        for start in range(year_min, year_max, max(1, (year_max - year_min) // 8)):
+            recorder.time('year_slider', at.slider(key=FILTER_KEYS['years']).set_value((start, year_max)).run)
+    at = _button(at, "🔄 Clear All Filters").click().run()
+
+    for name in ('platforms', 'genres'):
+        widget = at.multiselect(key=FILTER_KEYS[name])
+        options = widget.options
+        for _ in range(repeat):
+            for size in (1, 3, len(options) // 2, len(options)):
+                recorder.time(f'{name}_multiselect',
+                              at.multiselect(key=FILTER_KEYS[name]).set_value(options[:size]).run)
+        at = _button(at, "🔄 Clear All Filters").click().run()
+
+    for _ in range(repeat):
+        for theme in ("Light Mode", "Dark Mode"):
+            recorder.time('theme_toggle', at.radio(key='theme_option').set_value(theme).run)
+
+    return recorder.summary()
+
+
+def dataset_path(rows):
+    path = os.path.join(DATA_DIR, f'vgsales_{rows}.csv')
+    if not os.path.exists(path):
+        from synthetic_data import write_sales_csv
+        print(f"Generating {rows:,} rows into {path}", file=sys.stderr)
+        write_sales_csv(rows, path)
+    return path
+
+
+def run_size(rows, repeat):
+    """Benchmark one dataset size in a fresh process"""
+    env = dict(os.environ, VGSALES_DATA_FILE=dataset_path(rows))
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', '--repeat', str(repeat)],
+        env=env, check=True, stdout=subprocess.PIPE, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def print_report(results):
+    print(f"{'rows':>10}  {'scenario':<32} {'runs':>4} {'p50 ms':>9} {'p95 ms':>9} {'process peak RSS MB':>20}")
+    for rows, summary in results.items():
+        for row in summary:
+            print(f"{rows:>10,}  {row['scenario']:<32} {row['runs']:>4} "
+                  f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['process_peak_rss_mb']:>20.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help="dataset sizes to benchmark (default: 16k, 1M and 10M rows)")
+    parser.add_argument('--repeat', type=int, default=3, help="repetitions of each scenario")
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scenarios(args.repeat)))
+        return
+
+    results = {}
+    for rows in args.rows:
+        results[rows] = run_size(rows, args.repeat)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({str(rows): summary for rows, summary in results.items()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Synthetic vgsales datasets of any size
+
+Rows are drawn from vgsales.csv so the platforms, years, genres and
+publishers keep their real joint distribution, including missing years
+and publishers. Regional sales are the sampled game's sales scaled by
+log-normal noise and rounded to hundredths, Global_Sales is their sum, and
+Rank follows Global_Sales like in the original file. Beyond the size of the
+original, repeated titles get a sequel number, so franchises grow with the
+data.
+
+    python benchmarks/synthetic_data.py 1000000 data/vgsales_1m.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data_loader import SALES_COLUMNS, clean_sales_data  # noqa: E402
+
+
+REGION_COLUMNS = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales']
+DIMENSION_COLUMNS = ['Platform', 'Year', 'Genre', 'Publisher']
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vgsales.csv')
+
+# Rows converted to text and written at a time
+CHUNK_ROWS = 1_000_000
+
+
+def _read_source(source):
+    df = pd.read_csv(source)
+    # Keep the missing publishers, the loader fills them in like for the real file
+    publisher = df['Publisher']
+    df = clean_sales_data(df)
+    df['Publisher'] = publisher
+    return df
+
+
+def sample_sales_data(n_rows, source=DEFAULT_SOURCE, seed=0, sales_noise=0.25):
+    """Sampled source row, regional sales and sequel number for each synthetic row
+
+    Returns the source frame, the source position of each row, the regional
+    sales as float32 and the sequel numbers (0 for none), ordered by rank.
+    """
+    rng = np.random.default_rng(seed)
+    src = _read_source(source)
+    rows = rng.integers(0, len(src), n_rows)
+
+    noise = rng.lognormal(0.0, sales_noise, (n_rows, len(REGION_COLUMNS)))
+    scaled = src[REGION_COLUMNS].to_numpy('float64')[rows] * noise
+    regions = np.round(scaled, 2)
+    # The smallest recorded sale is 0.01 million, given to the biggest region
+    # of the rows whose every region rounds to 0
+    unsold = regions.sum(axis=1) == 0
+    regions[unsold, scaled[unsold].argmax(axis=1)] = 0.01
+    regions = regions.astype('float32')
+
+    # One row in n_rows / len(src) keeps its title, the others become sequels
+    sequels = np.zeros(n_rows, dtype='int16')
+    if n_rows > len(src):
+        repeats = rng.random(n_rows) < 1 - len(src) / n_rows
+        sequels[repeats] = rng.integers(2, 10, int(repeats.sum()))
+
+    # Like the original file, rows are ordered by global sales
+    order = np.argsort(-regions.sum(axis=1, dtype='float64'), kind='stable')
+    return src, rows[order], regions[order], sequels[order]
+
+
+def _chunk_frame(src, rows, regions, sequels, first_rank):
+    names = pd.Series(src['Name'].to_numpy(object)[rows])
+    sequel = sequels > 0
+    names[sequel] = names[sequel] + ' ' + pd.Series(sequels[sequel]).astype(str).to_numpy()
+    chunk = pd.DataFrame({
+        'Rank': np.arange(first_rank, first_rank + len(rows)),
+        'Name': names,
+    })
+    for col in DIMENSION_COLUMNS:
+        chunk[col] = src[col].to_numpy()[rows]
+    for i, col in enumerate(REGION_COLUMNS):
+        chunk[col] = regions[:, i]
+    chunk['Global_Sales'] = np.round(regions.sum(axis=1, dtype='float64'), 2)
+    return chunk[['Rank', 'Name', 'Platform', 'Year', 'Genre', 'Publisher'] + SALES_COLUMNS]
+
+
+def generate_sales_data(n_rows, source=DEFAULT_SOURCE, seed=0):
+    """Synthetic dataset with the vgsales.csv columns as a DataFrame"""
+    src, rows, regions, sequels = sample_sales_data(n_rows, source, seed)
+    return _chunk_frame(src, rows, regions, sequels, 1)
+
+
+def write_sales_csv(n_rows, path, source=DEFAULT_SOURCE, seed=0, chunk_rows=CHUNK_ROWS):
+    """Write a synthetic dataset as CSV, converting it to text chunk by chunk"""
+    src, rows, regions, sequels = sample_sales_data(n_rows, source, seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', newline='') as f:
+        for start in range(0, n_rows, chunk_rows):
+            stop = start + chunk_rows
+            chunk = _chunk_frame(src, rows[start:stop], regions[start:stop], sequels[start:stop], start + 1)
+            chunk.to_csv(f, index=False, header=start == 0, float_format='%.2f')
+    os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--source', default=DEFAULT_SOURCE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_sales_csv(args.rows, args.path, args.source, args.seed)
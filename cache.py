@@ -0,0 +1,115 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def estimate_size(value):
+    """Approximate memory held by a cached value, in bytes"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.Series):
+        value = value.to_frame()
+    if isinstance(value, pd.DataFrame):
+        size = int(value.memory_usage(index=True, deep=False).sum())
+        # Deep inspection of object columns is slow on large frames, so sample it
+        for col in value.columns:
+            if value[col].dtype == object and len(value):
+                sample = value[col].iloc[:1000]
+                size += int(sample.map(sys.getsizeof).mean() * len(value))
+        return size
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    """Thread-safe LRU cache with a byte budget, an entry limit and a TTL
+
+    Keys are tuples whose first element names the kind of entry (for example
+    'filtered_rows' or 'export'). Hit, miss and eviction counters are kept per
+    kind so they can be shown in the debug panel.
+    """
+
+    def __init__(self, max_bytes, max_entries=None, ttl=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _count(self, kind, counter):
+        counters = self._counters.setdefault(kind, {'hits': 0, 'misses': 0, 'evictions': 0})
+        counters[counter] += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                self._count(key[0], 'evictions')
+                entry = None
+            if entry is None:
+                self._count(key[0], 'misses')
+                return default
+            self._entries.move_to_end(key)
+            self._count(key[0], 'hits')
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Never let a single oversized value flush the whole cache
+                return value
+            self._entries[key] = (value, size, time.monotonic())
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes or (
+                    self.max_entries is not None and len(self._entries) > self.max_entries):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._count(oldest[0], 'evictions')
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for a key, computing and storing it on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Per-kind entry counts, sizes and counters"""
+        with self._lock:
+            rows = {}
+            for kind, counters in self._counters.items():
+                rows[kind] = dict(counters, entries=0, bytes=0)
+            for key, (_, size, _) in self._entries.items():
+                row = rows.setdefault(key[0], {'hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0, 'bytes': 0})
+                row['entries'] += 1
+                row['bytes'] += size
+        return pd.DataFrame([
+            dict(kind=kind, **row) for kind, row in sorted(rows.items())
+        ], columns=['kind', 'entries', 'bytes', 'hits', 'misses', 'evictions'])
@@ -0,0 +1,165 @@
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+from tracing import span
+
+try:
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+except ImportError:  # pragma: no cover - only missing on very different streamlit versions
+    PlotlyChartProto = None
+
+
+# Decimal places kept for float arrays; sales are recorded in hundredths of millions
+FLOAT_DECIMALS = 4
+
+_CUSTOMDATA_REF = re.compile(r'customdata')
+
+# Dashboard theme -> Plotly template applied when a chart is presented
+THEME_TEMPLATES = {'dark': 'plotly_dark', 'light': 'plotly_white'}
+
+# Theme of a new session
+DEFAULT_THEME = 'dark'
+_template_cache = {}
+
+
+def _compact_trace(trace, decimals):
+    """Round float arrays and drop hover data that the hover template never uses"""
+    for key, value in list(trace.items()):
+        if isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+            trace[key] = np.round(value.astype('float64'), decimals)
+        elif isinstance(value, dict):
+            _compact_trace(value, decimals)
+
+    if 'customdata' in trace and not _CUSTOMDATA_REF.search(str(trace.get('hovertemplate', ''))):
+        del trace['customdata']
+    return trace
+
+
+def _prune_template(fig_dict):
+    """Keep template trace defaults only for the trace types the figure uses"""
+    layout = fig_dict.get('layout', {})
+    template = layout.get('template')
+    if not template or 'data' not in template:
+        return
+    used = {trace.get('type', 'scatter') for trace in fig_dict.get('data', [])}
+    # Replace rather than edit the template, it may be shared with other figures
+    layout['template'] = dict(template, data={
+        kind: value for kind, value in template['data'].items() if kind in used
+    })
+
+
+def compact_figure_dict(fig, decimals=FLOAT_DECIMALS):
+    """Figure as a plain dict with rounded numbers and unused data removed"""
+    fig_dict = fig.to_dict() if hasattr(fig, 'to_dict') else fig
+    for trace in fig_dict.get('data', []):
+        _compact_trace(trace, decimals)
+    for frame in fig_dict.get('frames', []):
+        for trace in frame.get('data', []):
+            _compact_trace(trace, decimals)
+    _prune_template(fig_dict)
+    return fig_dict
+
+
+def theme_figure_dict(fig_dict, theme, layout=None):
+    """Copy of a figure dict with a theme's template and layout overrides applied
+
+    Only the layout is copied, the trace data is shared with the original, so
+    switching themes never touches the chart data.
+    """
+    themed_layout = dict(fig_dict.get('layout', {}))
+    themed_layout['template'] = _theme_template(THEME_TEMPLATES[theme])
+    for key, value in (layout or {}).items():
+        if isinstance(value, dict):
+            themed_layout[key] = dict(themed_layout.get(key, {}), **value)
+        else:
+            themed_layout[key] = value
+    themed = dict(fig_dict, layout=themed_layout)
+    _prune_template(themed)
+    return themed
+
+
+def _theme_template(name):
+    if name not in _template_cache:
+        _template_cache[name] = pio.templates[name].to_plotly_json()
+    return _template_cache[name]
+
+
+def encode_figure(fig_dict):
+    """Encode a figure dict to JSON once, preferring the fast orjson engine"""
+    try:
+        return pio.to_json(fig_dict, validate=False, engine='orjson')
+    except (ImportError, ValueError, AttributeError):
+        # orjson is missing or incompatible with this plotly version
+        return pio.to_json(fig_dict, validate=False, engine='json')
+
+
+def figure_to_spec(fig, decimals=FLOAT_DECIMALS):
+    """Compact JSON spec for a figure, ready to send to the browser"""
+    return encode_figure(compact_figure_dict(fig, decimals))
+
+
+def render_spec(spec, use_container_width=True):
+    """Render a pre-encoded figure spec without re-validating the figure
+
+    st.plotly_chart rebuilds and validates a go.Figure before serializing it
+    again, so the spec is placed in the chart message directly. That relies
+    on Streamlit internals, st._main._enqueue and the PlotlyChart proto, as
+    in the streamlit versions pinned in requirements.txt. When they are
+    missing or the message has other fields, the figure goes through the
+    public st.plotly_chart as a plain dict, slower but the same chart.
+    """
+    enqueue = getattr(getattr(st, '_main', None), '_enqueue', None)
+    if PlotlyChartProto is not None and enqueue is not None:
+        try:
+            proto = PlotlyChartProto()
+            proto.use_container_width = use_container_width
+            proto.figure.spec = spec
+            proto.figure.config = json.dumps({'showLink': False, 'linkText': False})
+            proto.theme = 'streamlit'
+        except (AttributeError, TypeError, ValueError):
+            proto = None
+        if proto is not None:
+            enqueue('plotly_chart', proto)
+            return
+    st.plotly_chart(json.loads(spec), use_container_width=use_container_width)
+
+
+def to_plot_frame(data):
+    """Return chart data with categorical columns as plain values
+
+    Plotly Express groups categorical columns over every category, including
+    ones that are not present in the data, so charts get plain columns instead.
+    """
+    categorical = [col for col in data.columns if isinstance(data[col].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return data
+    return data.astype({col: object for col in categorical})
+
+
+def cached_spec(cache, chart_id, signature, theme, build_figure, theme_layout=None):
+    """Encoded spec of a chart for a filter state and theme, built at most once
+
+    The theme-neutral figure data is cached under ('figure_data', chart_id,
+    signature) and the themed spec under ('figure', chart_id, signature,
+    theme), so the dashboard and the warm-up share them.
+    """
+    key = ('figure', chart_id, signature, theme)
+    spec = cache.get(key)
+    if spec is None:
+        data_key = ('figure_data', chart_id, signature)
+        fig_dict = cache.get(data_key)
+        if fig_dict is None:
+            # Chart aggregates are computed on first use, inside the build span
+            with span('build', chart=chart_id):
+                fig = build_figure()
+            with span('compact', chart=chart_id):
+                fig_dict = cache.put(data_key, compact_figure_dict(fig))
+        with span('encode', chart=chart_id):
+            themed = theme_figure_dict(fig_dict, theme, (theme_layout or {}).get(theme))
+            spec = cache.put(key, encode_figure(themed))
+    return spec
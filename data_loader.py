@@ -0,0 +1,219 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+    pa = None
+    pq = None
+
+
+SALES_COLUMNS = ['NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales', 'Global_Sales']
+DIMENSION_COLUMNS = ['Platform', 'Genre', 'Publisher']
+
+# Compact schema mode is on by default, set VGSALES_COMPACT_SCHEMA=0 to disable it
+COMPACT_SCHEMA = os.environ.get('VGSALES_COMPACT_SCHEMA', '1') != '0'
+
+# Metadata keys stored in the snapshot schema to identify the source CSV
+_META_SIZE = b'vgsales.source_size'
+_META_MTIME = b'vgsales.source_mtime_ns'
+_META_HASH = b'vgsales.source_sha256'
+
+
+def source_version(csv_path):
+    """Cheap version string for the source file, based on its size and mtime"""
+    stat = os.stat(csv_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def source_digest(csv_path):
+    """SHA-256 of the CSV's content, read from its snapshot when that is current"""
+    path = snapshot_path(csv_path)
+    if pq is not None and os.path.exists(path) and _snapshot_is_fresh(path, os.stat(csv_path), csv_path):
+        digest = (pq.read_schema(path).metadata or {}).get(_META_HASH)
+        if digest:
+            return digest.decode()
+    return _file_sha256(csv_path)
+
+
+def snapshot_path(csv_path):
+    """Location of the columnar snapshot that sits next to the CSV"""
+    root, _ = os.path.splitext(csv_path)
+    return root + '.snapshot.parquet'
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def clean_sales_data(df):
+    """Apply the standard type coercion and missing value handling"""
+    df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
+    df['Publisher'] = df['Publisher'].fillna('Unknown')
+    return df
+
+
+def compact_sales_data(df):
+    """Convert the cleaned data to a compact in-memory schema
+
+    Dimension columns become categoricals with sorted (stable) categories, the
+    sales columns are downcast to float32 and Year becomes a nullable Int16.
+    Repeated game titles are interned so each distinct name is stored once.
+    """
+    df = df.copy()
+    for col in DIMENSION_COLUMNS:
+        categories = sorted(df[col].dropna().unique())
+        df[col] = pd.Categorical(df[col], categories=categories)
+    for col in SALES_COLUMNS:
+        df[col] = df[col].astype('float32')
+    df['Year'] = df['Year'].round().astype('Int16')
+    df['Rank'] = pd.to_numeric(df['Rank'], downcast='integer')
+
+    codes, uniques = pd.factorize(df['Name'])
+    names = uniques.to_numpy(dtype=object).take(codes)
+    names[codes == -1] = None
+    df['Name'] = names
+    return df
+
+
+def memory_report(df):
+    """Per-column memory use of a DataFrame, in bytes"""
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        'Column': usage.index,
+        'Type': [str(df[col].dtype) for col in usage.index],
+        'Bytes': usage.values,
+    })
+    return report
+
+
+def _backing_arrays(values):
+    """NumPy arrays holding the data of a column array"""
+    if isinstance(values, np.ndarray):
+        yield values
+    # Categorical codes, and the values and missing-value mask of nullable types.
+    # Arrow-backed arrays are immutable already.
+    attrs = ('_data', '_mask') if hasattr(values, '_mask') else ('_ndarray',)
+    for attr in attrs:
+        inner = getattr(values, attr, None)
+        if isinstance(inner, np.ndarray):
+            yield inner
+
+
+def freeze_frame(df):
+    """Make the arrays behind a DataFrame read-only and return it
+
+    Frames shared between sessions are frozen so that an in-place change
+    raises instead of silently changing the data every session sees. Filtering
+    or sorting still works and returns new, writable frames.
+    """
+    for values in df._mgr.arrays:
+        for array in _backing_arrays(values):
+            array.flags.writeable = False
+    return df
+
+
+def read_sales_csv(csv_path):
+    """Parse and clean the raw sales CSV"""
+    return clean_sales_data(pd.read_csv(csv_path))
+
+
+def _snapshot_is_fresh(path, stat, csv_path):
+    """Check the snapshot metadata against the current state of the CSV"""
+    try:
+        meta = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+
+    if meta.get(_META_SIZE) != str(stat.st_size).encode():
+        return False
+    if meta.get(_META_MTIME) == str(stat.st_mtime_ns).encode():
+        return True
+
+    # Same size but a different mtime (e.g. a fresh checkout), so compare content
+    if meta.get(_META_HASH) != _file_sha256(csv_path).encode():
+        return False
+    try:
+        _restamp_snapshot(path, stat)
+    except OSError:
+        # Read-only deployments keep hashing the CSV on each cold start
+        pass
+    return True
+
+
+def _restamp_snapshot(path, stat):
+    """Record the CSV's current mtime in a snapshot whose content still matches it
+
+    Later cold starts then match on size and mtime without hashing the CSV.
+    """
+    table = pq.read_table(path)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_META_MTIME] = str(stat.st_mtime_ns).encode()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(df, csv_path):
+    """Write a typed Parquet snapshot of the cleaned data, keyed by the CSV"""
+    stat = os.stat(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({
+        _META_SIZE: str(stat.st_size).encode(),
+        _META_MTIME: str(stat.st_mtime_ns).encode(),
+        _META_HASH: _file_sha256(csv_path).encode(),
+    })
+    table = table.replace_schema_metadata(metadata)
+
+    # Write to a temporary file first so readers never see a partial snapshot
+    path = snapshot_path(csv_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_or_build_snapshot(csv_path):
+    path = snapshot_path(csv_path)
+    stat = os.stat(csv_path)
+    if os.path.exists(path) and _snapshot_is_fresh(path, stat, csv_path):
+        return pq.read_table(path).to_pandas()
+
+    df = read_sales_csv(csv_path)
+    try:
+        write_snapshot(df, csv_path)
+    except OSError:
+        # Read-only deployments still work, they just parse the CSV every time
+        pass
+    return df
+
+
+def ensure_snapshot(csv_path):
+    """Path of the columnar snapshot of a CSV, writing it first if it is stale"""
+    path = snapshot_path(csv_path)
+    if not (os.path.exists(path) and _snapshot_is_fresh(path, os.stat(csv_path), csv_path)):
+        write_snapshot(read_sales_csv(csv_path), csv_path)
+    return path
+
+
+def load_sales_data(csv_path, use_snapshot=True, compact=None):
+    """Load the sales data, reading from the columnar snapshot when it is current"""
+    if use_snapshot and pq is not None:
+        df = _read_or_build_snapshot(csv_path)
+    else:
+        df = read_sales_csv(csv_path)
+
+    if compact is None:
+        compact = COMPACT_SCHEMA
+    if compact:
+        df = compact_sales_data(df)
+    return df
@@ -0,0 +1,219 @@
+"""Optional backend that filters and aggregates the sales data with DuckDB
+
+With VGSALES_BACKEND=duckdb the rows are never loaded into pandas: the
+filter block and every chart aggregate run as SQL against the Parquet
+snapshot of the CSV, in DuckDB's multi-threaded engine, and only the
+aggregated results come back as DataFrames. The distinct titles and their
+sales are the exception, read once for the franchise map and the title
+search index. Results have the same index, columns, order and numeric
+types as the in-memory pipeline, so the charts are the same on either
+backend and deployments can choose by data size.
+
+The backend needs the duckdb package, which is not installed by default:
+
+    pip install duckdb
+"""
+import os
+import threading
+
+from aggregates import CUBE_MEASURES
+from data_loader import COMPACT_SCHEMA, SALES_COLUMNS, ensure_snapshot
+from franchises import franchise_map
+from indexes import TitleIndex
+from startup import lazy_import
+
+# Only imported when a DuckDBSales is created, the pandas backend never needs it
+duckdb = lazy_import('duckdb')
+
+
+# The pandas backend is the default, set VGSALES_BACKEND=duckdb to query Parquet with DuckDB
+DUCKDB_BACKEND = os.environ.get('VGSALES_BACKEND', 'pandas') == 'duckdb'
+
+ROW_COLUMNS = ['Rank', 'Name', 'Platform', 'Year', 'Genre', 'Publisher'] + SALES_COLUMNS
+
+# Position of each row in the Parquet file, the row label in the pandas pipeline
+_ROW_NUMBER = 'file_row_number'
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _where(selection):
+    """SQL condition and parameters for a selection of {column: values}
+
+    Like FilterIndex.packed_mask, columns whose values are empty or None are
+    not filtered.
+    """
+    clauses = ['TRUE']
+    params = []
+    for column, values in selection.items():
+        if not values:
+            continue
+        if isinstance(values, range) and values.step == 1:
+            clauses.append(f'{_quote(column)} BETWEEN ? AND ?')
+            params += [values.start, values.stop - 1]
+        else:
+            clauses.append(f'list_contains(?, {_quote(column)})')
+            params.append(list(values))
+    return ' AND '.join(clauses), params
+
+
+def _measure(measure):
+    if measure == 'Count':
+        return 'COUNT(*) AS "Count"'
+    return f'SUM({_quote(measure)}) AS {_quote(measure)}'
+
+
+def _in_memory_types(frame, rows=False):
+    """Give query results the dtypes the pandas pipeline has for them"""
+    if not COMPACT_SCHEMA:
+        return frame
+    if 'Year' in frame:
+        frame['Year'] = frame['Year'].round().astype('Int16')
+    if rows:
+        # Aggregates are float64 on both backends, only row values are float32
+        for col in SALES_COLUMNS:
+            if col in frame:
+                frame[col] = frame[col].astype('float32')
+    return frame
+
+
+class DuckDBSales:
+    """Sales data queried in place from Parquet with DuckDB
+
+    One in-memory DuckDB database per process holds a view over the Parquet
+    files. Each thread queries through its own cursor, since Streamlit runs
+    every session on its own thread.
+    """
+
+    def __init__(self, parquet_paths):
+        try:
+            self.connection = duckdb.connect()
+        except ImportError as exc:
+            raise ImportError("VGSALES_BACKEND=duckdb needs the duckdb package: pip install duckdb") from exc
+        self.parquet_paths = list(parquet_paths)
+        files = ', '.join(_literal(path) for path in self.parquet_paths)
+        self.connection.execute(
+            f"CREATE VIEW sales AS SELECT * FROM read_parquet([{files}], file_row_number = true)")
+        self._local = threading.local()
+        self._options = None
+
+        # Franchise of every distinct title, grouped like FranchiseIndex does for the rows
+        titles = self.connection.execute('SELECT DISTINCT "Name" FROM sales WHERE "Name" IS NOT NULL').df()['Name']
+        mapping = franchise_map(titles)
+        franchise_titles = mapping.value_counts()
+        self.franchise_series = sorted(franchise_titles.index[franchise_titles > 1])
+        self.connection.register('franchise_map', mapping.rename_axis('Name').rename('Franchise').reset_index())
+        self.connection.execute('CREATE TABLE franchises AS SELECT * FROM franchise_map')
+        self.connection.unregister('franchise_map')
+
+        # Title search runs on an index of the distinct titles and their sales
+        title_sales = self.connection.execute(
+            'SELECT "Name", SUM("Global_Sales") AS "Global_Sales" FROM sales '
+            'WHERE "Name" IS NOT NULL GROUP BY "Name"').df()
+        self.title_index = TitleIndex(title_sales['Name'], title_sales['Global_Sales'])
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        """Backend over the Parquet snapshot of a CSV, written first if it is stale"""
+        return cls([ensure_snapshot(csv_path)])
+
+    def query(self, sql, params=()):
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self.connection.cursor()
+        return cursor.execute(sql, params).df()
+
+    def filter_options(self):
+        """Values each sidebar filter can take, like filter_state.filter_options"""
+        if self._options is None:
+            years = self.query('SELECT MIN("Year") AS low, MAX("Year") AS high FROM sales').iloc[0]
+            top_publishers = self.query(
+                'SELECT "Publisher" FROM sales GROUP BY "Publisher" ORDER BY COUNT(*) DESC, "Publisher" LIMIT 20')
+            self._options = {
+                'years': (int(years['low']), int(years['high'])),
+                'platforms': self._distinct('Platform'),
+                'genres': self._distinct('Genre'),
+                'publisher': ['All'] + sorted(top_publishers['Publisher']),
+                'franchises': self.franchise_series,
+                'titles': self.title_index.titles,
+            }
+        return self._options
+
+    def _distinct(self, column):
+        values = self.query(f'SELECT DISTINCT {_quote(column)} AS value FROM sales '
+                            f'WHERE {_quote(column)} IS NOT NULL')['value']
+        return sorted(values)
+
+    def slice(self, selection, franchises=None):
+        """Rows matching a selection, and any of some franchises if given, to
+        roll up like a slice of the sales cube
+        """
+        return DuckDBSlice(self, selection, franchises)
+
+
+class DuckDBSlice:
+    """A filtered view of the sales data, with the interface of a CubeSlice"""
+
+    def __init__(self, sales, selection, franchises=None):
+        self.sales = sales
+        self.where, self.params = _where(selection)
+        if franchises:
+            self.where += ' AND "Name" IN (SELECT "Name" FROM franchises WHERE list_contains(?, "Franchise"))'
+            self.params = self.params + [list(franchises)]
+
+    def rollup(self, by, measures=CUBE_MEASURES):
+        """Measures summed by the given dimensions, indexed by them
+
+        Missing years are dropped, like a groupby over the raw rows.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        keys = ', '.join(_quote(col) for col in by)
+        not_missing = ''.join(f' AND {_quote(col)} IS NOT NULL' for col in by)
+        result = self.sales.query(
+            f'SELECT {keys}, {", ".join(_measure(m) for m in measures)} FROM sales '
+            f'WHERE {self.where}{not_missing} GROUP BY {keys} ORDER BY {keys}', self.params)
+        return _in_memory_types(result).set_index(by)
+
+    def totals(self, measures=CUBE_MEASURES):
+        """Measures summed over every matching row"""
+        columns = ', '.join('COUNT(*) AS "Count"' if m == 'Count' else f'COALESCE(SUM({_quote(m)}), 0) AS {_quote(m)}'
+                            for m in measures)
+        return self.sales.query(f'SELECT {columns} FROM sales WHERE {self.where}', self.params).iloc[0].astype('float64')
+
+    def nunique(self, dimension):
+        """Number of distinct values of a dimension present in the slice"""
+        result = self.sales.query(
+            f'SELECT COUNT(DISTINCT {_quote(dimension)}) AS n FROM sales WHERE {self.where}', self.params)
+        return int(result['n'].iloc[0])
+
+    def top(self, dimension, measure='Global_Sales', n=5):
+        """Values of a dimension with the highest totals of a measure"""
+        totals = self.rollup(dimension, [measure])[measure]
+        return totals.sort_values(ascending=False).head(n).index.tolist()
+
+    def rows(self, columns=ROW_COLUMNS, order_by=None, limit=None):
+        """Matching rows, labelled by their position in the file
+
+        Rows come in file order, or highest first by the order_by column with
+        ties in file order.
+        """
+        order = f'{_quote(order_by)} DESC, {_ROW_NUMBER}' if order_by else _ROW_NUMBER
+        sql = (f'SELECT {_ROW_NUMBER}, {", ".join(_quote(col) for col in columns)} FROM sales '
+               f'WHERE {self.where} ORDER BY {order}')
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        result = self.sales.query(sql, self.params).set_index(_ROW_NUMBER).rename_axis(None)
+        return _in_memory_types(result, rows=True)
+
+    def franchise_sales(self, n=10, decimals=2):
+        """Global sales of the n best-selling franchises, like FranchiseIndex.top"""
+        return self.sales.query(
+            f'SELECT "Franchise", ROUND(SUM("Global_Sales"), {int(decimals)}) AS "Global_Sales" '
+            f'FROM sales JOIN franchises USING ("Name") WHERE {self.where} '
+            f'GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT {int(n)}', self.params)
@@ -0,0 +1,75 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Rows written per chunk, so large selections are never converted all at once
+EXPORT_CHUNK_ROWS = 100_000
+
+# Export format name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Arrow IPC': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+
+def iter_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the CSV encoding of a DataFrame as a sequence of byte chunks"""
+    yield df.head(0).to_csv(index=False).encode('utf-8')
+    for chunk in iter_chunks(df, chunk_rows):
+        yield chunk.to_csv(index=False, header=False).encode('utf-8')
+
+
+def _arrow_batches(df, chunk_rows):
+    """Arrow schema and record batches for a DataFrame, one batch per chunk"""
+    # Infer the types over every row, a column that is empty in the first chunk
+    # would otherwise be typed as null and fail on a later chunk
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    def batches():
+        for chunk in iter_chunks(df, chunk_rows):
+            yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+    return schema, batches()
+
+
+def write_csv(df, sink, chunk_rows=EXPORT_CHUNK_ROWS):
+    for chunk in iter_csv_chunks(df, chunk_rows):
+        sink.write(chunk)
+
+
+def write_parquet(df, sink, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write a DataFrame as Parquet, one row group per chunk"""
+    schema, batches = _arrow_batches(df, chunk_rows)
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def write_arrow(df, sink, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write a DataFrame as an Arrow IPC file, one record batch per chunk"""
+    schema, batches = _arrow_batches(df, chunk_rows)
+    with pa.ipc.new_file(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+_WRITERS = {
+    'CSV': write_csv,
+    'Parquet': write_parquet,
+    'Arrow IPC': write_arrow,
+}
+
+
+def export_bytes(df, export_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Encode a DataFrame in one of the EXPORT_FORMATS, chunk by chunk"""
+    sink = io.BytesIO()
+    _WRITERS[export_format](df, sink, chunk_rows)
+    return sink.getvalue()
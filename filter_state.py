@@ -0,0 +1,187 @@
+import pandas as pd
+import streamlit as st
+
+
+FILTER_NAMES = ['years', 'platforms', 'genres', 'publisher', 'franchises', 'titles']
+
+# Session state key of the widget that holds each filter
+FILTER_KEYS = {name: f'filter_{name}' for name in FILTER_NAMES}
+
+# URL value for a multiselect with nothing selected
+EMPTY_SELECTION = '-'
+
+# One-click presets: each one sets only the filters it names
+QUICK_PRESETS = {
+    'Nintendo Games': {'publisher': 'Nintendo'},
+    'PlayStation Games': {'platforms': ['PS3']},
+    '2010-2015 Games': {'years': (2010, 2015)},
+    'Action Games': {'genres': ['Action']},
+}
+
+
+def filter_options(df, franchises=(), titles=()):
+    """Values each sidebar filter can take in a dataset, its franchise series and titles"""
+    return {
+        'years': (int(df['Year'].min()), int(df['Year'].max())),
+        'platforms': sorted(df['Platform'].unique()),
+        'genres': sorted(df['Genre'].unique()),
+        'publisher': ['All'] + sorted(df['Publisher'].value_counts().head(20).index.tolist()),
+        'franchises': list(franchises),
+        # An Index, so checking a title from the URL is a hash lookup
+        'titles': pd.Index(titles, dtype=object),
+    }
+
+
+def default_filters(options):
+    """Filters of a new session: every year and the first five platforms and genres"""
+    return {
+        'years': options['years'],
+        'platforms': options['platforms'][:5],
+        'genres': options['genres'][:5],
+        'publisher': 'All',
+        'franchises': [],
+        'titles': [],
+    }
+
+
+def view_signature(dataset_version, values):
+    """Compact, hashable signature of a set of filter values
+
+    Everything derived from the filters is cached under this signature.
+    """
+    return (
+        dataset_version,
+        tuple(values['years']),
+        tuple(sorted(values['platforms'])),
+        tuple(sorted(values['genres'])),
+        values['publisher'],
+        tuple(sorted(values['franchises'])),
+        tuple(sorted(values['titles'])),
+    )
+
+
+def view_selection(values):
+    """Filter values as a {column: values} selection for the indexes and cube
+
+    The franchise and title filters are not part of it, they go through the
+    franchise and title indexes.
+    """
+    years = values['years']
+    publisher = values['publisher']
+    return {
+        'Year': range(years[0], years[1] + 1),
+        'Platform': values['platforms'],
+        'Genre': values['genres'],
+        'Publisher': [publisher] if publisher != 'All' else None,
+    }
+
+
+class FilterState:
+    """Sidebar filter state shared by the widgets, presets and the URL
+
+    The filter widgets read and write their values through session state
+    keys. Presets, "Clear All Filters" and "All Games" are widget callbacks
+    that update those keys before the next script run starts, so a click
+    costs one run instead of two. The current filters are mirrored into the
+    URL query parameters so a view can be shared.
+    """
+
+    def __init__(self, defaults, options):
+        self.defaults = defaults
+        self.options = options
+
+    def _sanitize(self, name, value):
+        """Clamp a filter value to what the current dataset offers"""
+        options = self.options[name]
+        if name == 'years':
+            low, high = options
+            start, end = sorted(int(year) for year in value)
+            return (max(low, min(start, high)), max(low, min(end, high)))
+        if name == 'publisher':
+            return value if value in options else self.defaults[name]
+        return [item for item in value if item in options]
+
+    def _from_query_params(self):
+        params = st.query_params
+        values = {}
+        try:
+            if 'years' in params:
+                start, end = params['years'].split('-')
+                values['years'] = (int(start), int(end))
+        except ValueError:
+            pass
+        for name in ('platforms', 'genres', 'franchises', 'titles'):
+            if name in params:
+                values[name] = params.get_all(name)
+        if 'publisher' in params:
+            values['publisher'] = params['publisher']
+        return values
+
+    def initialize(self):
+        """Seed the widget state from the URL on a new session, or the defaults"""
+        from_url = None
+        for name in FILTER_NAMES:
+            key = FILTER_KEYS[name]
+            if key not in st.session_state:
+                if from_url is None:
+                    from_url = self._from_query_params()
+                value = from_url.get(name, self.defaults[name])
+            else:
+                value = st.session_state[key]
+            st.session_state[key] = self._sanitize(name, value)
+
+    def update(self, values):
+        for name, value in values.items():
+            st.session_state[FILTER_KEYS[name]] = self._sanitize(name, value)
+
+    def preset_values(self, preset):
+        """Filter values a new session ends up with after clicking a preset"""
+        values = dict(self.defaults)
+        for name, value in QUICK_PRESETS[preset].items():
+            values[name] = self._sanitize(name, value)
+        return values
+
+    # Widget callbacks
+    def apply_preset(self, preset):
+        self.update(QUICK_PRESETS[preset])
+
+    def reset(self):
+        self.update(self.defaults)
+
+    def select_all(self):
+        self.update({
+            'years': self.options['years'],
+            'platforms': self.options['platforms'],
+            'genres': self.options['genres'],
+            'publisher': self.defaults['publisher'],
+            'franchises': self.defaults['franchises'],
+            'titles': self.defaults['titles'],
+        })
+
+    @property
+    def values(self):
+        return {name: st.session_state[FILTER_KEYS[name]] for name in FILTER_NAMES}
+
+    def sync_query_params(self):
+        """Mirror the filters that differ from the defaults into the URL"""
+        params = st.query_params
+        encoded = {}
+        for name, value in self.values.items():
+            if value == self.defaults[name]:
+                continue
+            if name == 'years':
+                encoded[name] = f"{value[0]}-{value[1]}"
+            elif isinstance(value, list):
+                # An empty selection still needs a parameter to tell it from the
+                # default; blank values are dropped from the URL, so use a marker
+                # that is not a valid option and sanitizes back to []
+                encoded[name] = value or [EMPTY_SELECTION]
+            else:
+                encoded[name] = value
+
+        for name in FILTER_NAMES:
+            if name not in encoded:
+                if name in params:
+                    del params[name]
+            elif (params.get_all(name) if isinstance(encoded[name], list) else params.get(name)) != encoded[name]:
+                params[name] = encoded[name]
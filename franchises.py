@@ -0,0 +1,121 @@
+"""Franchise of each game title
+
+A title's key is its text before the first colon, slash or " - " (the
+subtitle, or the second version of a "Red/Blue" release), without
+trailing sequel numbers (arabic numbers, years and roman numerals) and
+accents. Keys are then grouped over a word trie of all the distinct keys.
+A key joins the shortest prefix that is itself a key ("Halo Wars" joins
+"Halo"), or else the longest prefix, not ending on a stop word, that
+starts at least MIN_FRANCHISE_KEYS keys ("Tom Clancy's Splinter Cell
+Conviction" joins "Tom Clancy's Splinter Cell"). A prefix of one
+significant word only groups keys of a single title, and only when the
+word branches straight into MIN_FRANCHISE_KEYS words that do not start
+that many keys themselves ("Pokemon Red", "Pokemon Gold", ... join
+"Pokemon", but "Call of Duty" and "Silent Hill" are not split off into
+"Call" and "Silent").
+
+The string clean-up is vectorized over the distinct titles and only the
+trie pass loops in Python, over distinct keys, so the cost does not grow
+with the number of rows. A key's franchise only depends on the keys that
+share its first word, so new titles only regroup the keys under theirs.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Distinct keys that must share a prefix to make it a franchise
+MIN_FRANCHISE_KEYS = 3
+
+# Words that do not count towards the two significant words of a prefix
+_STOP_WORDS = frozenset(['the', 'of', 'a', 'an', 'and', '&', 'in', 'on', 'to', 'for', 'at', 'vs', 'vs.'])
+
+_SUBTITLE = r'\s*(?::|/|\s-\s).*$'
+_SEQUEL_NUMBERS = r"(?:\s+(?:\d+|'\d\d|[IVX]{2,}))+$"
+# A one-letter numeral is only a sequel number after two words ("Final Fantasy X", not "Star X")
+_SEQUEL_LETTER = r'^(\S+\s+\S.*?)\s+[IVX]$'
+_ACCENTS = r'[\u0300-\u036f]'
+
+
+def title_keys(titles):
+    """Series of franchise keys before grouping, for a Series of titles"""
+    keys = titles.str.replace(_SUBTITLE, '', regex=True)
+    stripped = keys.str.replace(_SEQUEL_NUMBERS, '', regex=True).str.replace(_SEQUEL_LETTER, r'\1', regex=True)
+    # A title that is only a number keeps it ("1942")
+    keys = stripped.where(stripped.str.len() > 0, keys)
+    # "Pokémon" and "Pokemon" are one series
+    keys = keys.str.normalize('NFKD').str.replace(_ACCENTS, '', regex=True)
+    return keys.str.split().str.join(' ')
+
+
+class _Node:
+    __slots__ = ('children', 'keys', 'titles')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = 0
+        # Titles with this node's words as their key, 0 when they are not a key
+        self.titles = 0
+
+
+def _build_trie(title_counts):
+    """Word trie of the distinct keys, given as a Series of title counts indexed by key"""
+    root = _Node()
+    for key, titles in title_counts.items():
+        node = root
+        for word in key.split(' '):
+            node = node.children.setdefault(word, _Node())
+            node.keys += 1
+        node.titles = titles
+    return root
+
+
+def _is_series_word(node):
+    """Whether a one-word prefix's keys are the entries of one series"""
+    return (len(node.children) >= MIN_FRANCHISE_KEYS
+            and all(child.keys < MIN_FRANCHISE_KEYS for child in node.children.values()))
+
+
+def _franchise(root, key, titles):
+    """Franchise of one key held by the given number of titles, found on its path through the trie"""
+    words = key.split(' ')
+    node = root
+    significant = 0
+    shared = None
+    for depth, word in enumerate(words, start=1):
+        node = node.children[word]
+        if node.titles and depth < len(words):
+            return ' '.join(words[:depth])
+        if word.lower() in _STOP_WORDS:
+            # A shared prefix does not end on a stop word ("Mario & Sonic at the")
+            continue
+        significant += 1
+        if node.keys >= MIN_FRANCHISE_KEYS and (significant >= 2 or titles == 1 and _is_series_word(node)):
+            shared = depth
+    return ' '.join(words[:shared]) if shared else key
+
+
+def group_titles(titles, keys):
+    """Franchise of each title, given the key of each, as an object array
+
+    The keys are grouped over one trie, so every title whose key shares a
+    first word with one of them must be given for the result to be complete. Titles
+    with no key at all (only punctuation) are their own franchise.
+    """
+    titles = np.asarray(titles, dtype=object)
+    keys = pd.Series(np.asarray(keys, dtype=object), dtype=object)
+    title_counts = keys[keys.str.len() > 0].value_counts(sort=False)
+    root = _build_trie(title_counts)
+    franchises = keys.map({key: _franchise(root, key, count) for key, count in title_counts.items()})
+    franchises = franchises.to_numpy(dtype=object)
+    return np.where(pd.isna(franchises), titles, franchises)
+
+
+def first_words(keys):
+    """First word of each franchise key, the part of the trie a key lives under"""
+    return np.array([key.split(' ', 1)[0] for key in keys], dtype=object)
+
+
+def franchise_map(titles):
+    """Franchise of every distinct title, as a Series indexed by title"""
+    titles = pd.Series(pd.unique(pd.Series(titles).dropna()), dtype=object)
+    return pd.Series(group_titles(titles, title_keys(titles)), index=titles.to_numpy())
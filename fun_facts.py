@@ -0,0 +1,101 @@
+"""Fun facts for the storytelling section, computed only when shown
+
+Each fact is a provider registered under a name with @fun_fact. A provider
+takes the chart aggregates of the current filter state, the selection
+totals and the dashboard's top_games function, and returns the fact's text,
+or None when the selection has no data for it. Only the provider picked for
+display runs, so registering more facts adds nothing to a rerun.
+"""
+import random
+
+
+FUN_FACTS = {}
+
+
+def fun_fact(name):
+    """Register a fact provider under a name"""
+    def register(provider):
+        FUN_FACTS[name] = provider
+        return provider
+    return register
+
+
+def random_fact(aggregates, totals, top_games, rng=random):
+    """Text of a randomly picked fact, trying the others if it has no data
+
+    Returns None when no fact applies to the selection.
+    """
+    names = list(FUN_FACTS)
+    rng.shuffle(names)
+    for name in names:
+        text = FUN_FACTS[name](aggregates, totals, top_games)
+        if text:
+            return text
+    return None
+
+
+@fun_fact('best_seller')
+def _best_seller(aggregates, totals, top_games):
+    best = top_games(1)
+    if best.empty:
+        return None
+    game = best.iloc[0]
+    return f"The best-selling video game of all time is {game['Name']} with {game['Global_Sales']:.2f}M copies sold globally!"
+
+
+@fun_fact('nintendo_titles')
+def _nintendo_titles(aggregates, totals, top_games):
+    publisher_counts = aggregates.result('fun_fact_publishers')['Count']
+    if publisher_counts.empty:
+        return None
+    return (f"Nintendo has published {publisher_counts.get('Nintendo', 0)} games in our dataset, "
+            "more than any other publisher!")
+
+
+@fun_fact('busiest_year')
+def _busiest_year(aggregates, totals, top_games):
+    yearly_counts = aggregates.result('fun_fact_years')['Count']
+    if yearly_counts.empty:
+        return None
+    return (f"The most productive year for gaming was {yearly_counts.idxmax()}, "
+            f"with {yearly_counts.max()} games released!")
+
+
+@fun_fact('regional_genres')
+def _regional_genres(aggregates, totals, top_games):
+    genre_facts = aggregates.result('fun_fact_genres')
+    if genre_facts.empty:
+        return None
+    return (f"Japan seems to prefer {genre_facts['JP_Sales'].idxmax()} games, "
+            f"while North America prefers {genre_facts['NA_Sales'].idxmax()} games!")
+
+
+@fun_fact('platform_average')
+def _platform_average(aggregates, totals, top_games):
+    platform_facts = aggregates.result('fun_fact_platforms')
+    if platform_facts.empty:
+        return None
+    platform_averages = platform_facts['Global_Sales'] / platform_facts['Count']
+    return (f"The platform with the highest average sales per game is {platform_averages.idxmax()}, "
+            f"with {platform_averages.max():.2f}M average sales!")
+
+
+@fun_fact('european_genre')
+def _european_genre(aggregates, totals, top_games):
+    genre_facts = aggregates.result('fun_fact_genres')
+    if genre_facts.empty:
+        return None
+    return f"European gamers spend more on {genre_facts['EU_Sales'].idxmax()} games than any other genre!"
+
+
+@fun_fact('platform_lifespan')
+def _platform_lifespan(aggregates, totals, top_games):
+    return "The average lifespan of a gaming platform in the dataset is approximately 7 years!"
+
+
+@fun_fact('sports_share')
+def _sports_share(aggregates, totals, top_games):
+    if not totals['Count']:
+        return None
+    sports = aggregates.result('fun_fact_genres')['Count'].get('Sports', 0)
+    return f"Sports games made up {sports / totals['Count'] * 100:.1f}% of all video games in our dataset!"
@@ -0,0 +1,538 @@
+import bisect
+import re
+
+import numpy as np
+import pandas as pd
+
+from franchises import first_words, group_titles, title_keys
+
+
+FILTER_COLUMNS = ['Year', 'Platform', 'Genre', 'Publisher']
+
+# Bit masks for setting individual bits in a big-endian packed bitmap
+_BIT_VALUES = np.array([128, 64, 32, 16, 8, 4, 2, 1], dtype=np.uint8)
+
+# Characters in a title search n-gram; shorter queries match title prefixes
+NGRAM_SIZE = 3
+
+
+def _group_positions(values):
+    """Yield (value, sorted row positions) for every distinct non-missing value"""
+    codes, uniques = pd.factorize(values, sort=True)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    for i, value in enumerate(uniques):
+        yield value, order[bounds[i]:bounds[i + 1]].astype(np.int64)
+
+
+def unpack_mask(packed, n_rows):
+    """Boolean row mask from a packed bitmap"""
+    return np.unpackbits(packed, count=n_rows).view(bool)
+
+
+def _plain(value):
+    """Python scalar for a NumPy scalar, so index values can be written as JSON"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class FilterIndex:
+    """Packed bitmap index over the sidebar filter columns
+
+    Each distinct value of a filter column maps to the rows holding it. Values
+    that cover a reasonable share of the rows are stored as packed bitmaps
+    (one bit per row), rare values as a sorted list of row positions, so a
+    high-cardinality column such as Publisher stays small. A selection is
+    resolved by OR-ing the values of each column and AND-ing the columns
+    together, all on packed bitmaps, and unpacking only the final result.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self.n_bytes = (self.n_rows + 7) // 8
+        self.bitmaps = {}
+        self.positions = {}
+        self.complete = {}
+
+        for col in columns:
+            bitmaps = {}
+            positions = {}
+            for value, rows in _group_positions(df[col]):
+                # A position list costs 8 bytes per row, a bitmap n_rows / 8 bytes
+                if len(rows) * 64 < self.n_rows:
+                    positions[value] = rows
+                else:
+                    bits = np.zeros(self.n_rows, dtype=bool)
+                    bits[rows] = True
+                    bitmaps[value] = np.packbits(bits)
+            self.bitmaps[col] = bitmaps
+            self.positions[col] = positions
+            # A column without missing values is a no-op when every value is selected
+            self.complete[col] = not df[col].isna().any()
+
+    def extended(self, df_new):
+        """New index over this index's rows followed by the rows of df_new
+
+        Existing bitmaps are widened and position lists appended to, so only
+        the new rows are grouped. The index itself is left unchanged for
+        readers that still use it.
+        """
+        index = FilterIndex.__new__(FilterIndex)
+        index.n_rows = self.n_rows + len(df_new)
+        index.n_bytes = (index.n_rows + 7) // 8
+        index.bitmaps = {}
+        index.positions = {}
+        index.complete = {}
+
+        for col in self.bitmaps:
+            bitmaps = {}
+            for value, packed in self.bitmaps[col].items():
+                widened = np.zeros(index.n_bytes, dtype=np.uint8)
+                widened[:len(packed)] = packed
+                bitmaps[value] = widened
+            positions = dict(self.positions[col])
+
+            for value, rows in _group_positions(df_new[col]):
+                rows = rows + self.n_rows
+                if value in positions:
+                    rows = np.concatenate([positions.pop(value), rows])
+                if value not in bitmaps and len(rows) * 64 < index.n_rows:
+                    positions[value] = rows
+                    continue
+                packed = bitmaps.setdefault(value, np.zeros(index.n_bytes, dtype=np.uint8))
+                np.bitwise_or.at(packed, rows >> 3, _BIT_VALUES[rows & 7])
+            index.bitmaps[col] = bitmaps
+            index.positions[col] = positions
+            index.complete[col] = self.complete[col] and not df_new[col].isna().any()
+        return index
+
+    def to_arrays(self):
+        """The index as a JSON-serializable manifest and two flat arrays
+
+        Bitmaps are stacked into one (n_bitmaps, n_bytes) array and position
+        lists are concatenated into another, so the index can be saved to disk
+        and memory-mapped back with from_arrays().
+        """
+        manifest = {'n_rows': self.n_rows, 'complete': self.complete, 'bitmaps': [], 'positions': []}
+        bitmaps = []
+        positions = []
+        offset = 0
+        for col in self.bitmaps:
+            for value, packed in self.bitmaps[col].items():
+                manifest['bitmaps'].append([col, _plain(value), len(bitmaps)])
+                bitmaps.append(packed)
+            for value, rows in self.positions[col].items():
+                manifest['positions'].append([col, _plain(value), offset, offset + len(rows)])
+                positions.append(rows)
+                offset += len(rows)
+        bitmap_array = np.stack(bitmaps) if bitmaps else np.zeros((0, self.n_bytes), dtype=np.uint8)
+        position_array = np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64)
+        return manifest, bitmap_array, position_array
+
+    @classmethod
+    def from_arrays(cls, manifest, bitmaps, positions):
+        """Rebuild an index from to_arrays() output without copying the arrays"""
+        index = cls.__new__(cls)
+        index.n_rows = manifest['n_rows']
+        index.n_bytes = (index.n_rows + 7) // 8
+        index.complete = dict(manifest['complete'])
+        index.bitmaps = {col: {} for col in index.complete}
+        index.positions = {col: {} for col in index.complete}
+        for col, value, i in manifest['bitmaps']:
+            index.bitmaps[col][value] = bitmaps[i]
+        for col, value, start, stop in manifest['positions']:
+            index.positions[col][value] = positions[start:stop]
+        return index
+
+    def values(self, column):
+        return set(self.bitmaps[column]) | set(self.positions[column])
+
+    def _union(self, column, values):
+        """Packed bitmap of the rows matching any of the given values"""
+        packed = np.zeros(self.n_bytes, dtype=np.uint8)
+        bitmaps = self.bitmaps[column]
+        positions = self.positions[column]
+        sparse = []
+        for value in values:
+            if value in bitmaps:
+                np.bitwise_or(packed, bitmaps[value], out=packed)
+            elif value in positions:
+                sparse.append(positions[value])
+        if sparse:
+            rows = np.concatenate(sparse)
+            np.bitwise_or.at(packed, rows >> 3, _BIT_VALUES[rows & 7])
+        return packed
+
+    def packed_mask(self, selection):
+        """Packed bitmap for a selection of {column: values}
+
+        Columns that are missing from the selection or whose values are empty
+        or None are not filtered, matching the sidebar behaviour.
+        """
+        result = None
+        for column, values in selection.items():
+            if not values:
+                continue
+            values = set(values)
+            if self.complete[column] and values >= self.values(column):
+                continue
+            packed = self._union(column, values)
+            if result is None:
+                result = packed
+            else:
+                np.bitwise_and(result, packed, out=result)
+        return result
+
+    def mask(self, selection):
+        """Boolean row mask for a selection of {column: values}"""
+        packed = self.packed_mask(selection)
+        if packed is None:
+            return np.ones(self.n_rows, dtype=bool)
+        return unpack_mask(packed, self.n_rows)
+
+    def rows(self, selection):
+        """Sorted row positions matching a selection"""
+        return np.flatnonzero(self.mask(selection))
+
+
+class RankIndex:
+    """Row order by each sales column, highest first
+
+    The order of a column is computed once, the first time it is ranked by.
+    The top rows of any selection are then found by walking that order and
+    keeping the rows whose bit is set in the selection's packed mask, which
+    stops as soon as enough rows are found instead of sorting the selection.
+    Ties keep the row order of the dataset, like a stable sort.
+    """
+
+    def __init__(self, df, columns, order=None):
+        self.n_rows = len(df)
+        self.values = {col: df[col].to_numpy() for col in columns}
+        # Orders computed elsewhere, e.g. memory-mapped from the shared store
+        self.order = {} if order is None else dict(order)
+
+    def _dtype(self):
+        return np.int32 if self.n_rows < 2 ** 31 else np.int64
+
+    def ranked(self, column):
+        """Row positions ordered by a column, highest first"""
+        order = self.order.get(column)
+        if order is None:
+            # Negating keeps the stable sort's row order for ties, missing values go last
+            order = np.argsort(-self.values[column], kind='stable').astype(self._dtype())
+            self.order[column] = order
+        return order
+
+    def extended(self, rows):
+        """New index over this index's rows followed by the given rows
+
+        The orders already computed are merged with the order of the new
+        rows, so only the new rows are sorted. Existing rows come first among
+        ties, as in a stable sort of all the rows.
+        """
+        index = RankIndex.__new__(RankIndex)
+        index.n_rows = self.n_rows + len(rows)
+        index.values = {col: np.concatenate([values, rows[col].to_numpy()]) for col, values in self.values.items()}
+        index.order = {}
+        for col, order in self.order.items():
+            new_order = np.argsort(-index.values[col][self.n_rows:], kind='stable')
+            at = np.searchsorted(-self.values[col][order], -index.values[col][self.n_rows + new_order], side='right')
+            index.order[col] = np.insert(order, at, new_order + self.n_rows).astype(index._dtype())
+        return index
+
+    def top(self, column, n, packed=None):
+        """Positions of the n rows with the highest values of a column
+
+        packed is a FilterIndex packed mask, None meaning every row.
+        """
+        order = self.ranked(column)
+        if packed is None:
+            return order[:n]
+        found = []
+        count = 0
+        start = 0
+        step = max(1024, 8 * n)
+        while count < n and start < len(order):
+            block = order[start:start + step]
+            block = block[(packed[block >> 3] & _BIT_VALUES[block & 7]) != 0]
+            found.append(block)
+            count += len(block)
+            start += step
+            # Sparse selections need more of the order, so look further each time
+            step *= 2
+        return np.concatenate(found)[:n] if found else order[:0]
+
+
+class FranchiseIndex:
+    """Franchise of every row, for the sales per franchise of any selection
+
+    The franchise of every row is computed once, as a code into the sorted
+    franchise names, and a selection's totals are a weighted bincount over
+    the codes of its rows, with no grouping of strings. New rows only
+    regroup the franchise keys they can change, see franchises.py.
+    """
+
+    def __init__(self, names, sales):
+        title_codes, titles = pd.factorize(names)
+        titles = pd.Series(titles, dtype=object)
+        keys = title_keys(titles).to_numpy(dtype=object)
+        self._set_titles(title_codes.astype(np.int32), pd.Index(titles, dtype=object), keys,
+                         group_titles(titles, keys), sales)
+
+    def _set_titles(self, title_codes, titles, keys, title_franchises, sales):
+        """Set the row codes from the title of each row and the franchise of each title"""
+        self.title_codes = title_codes
+        self.titles = titles
+        # Franchise key of each title, kept to regroup the titles new ones can change
+        self.keys = keys
+        self.categories = pd.Index(sorted(pd.unique(title_franchises)), dtype=object)
+        self.title_franchises = self.categories.get_indexer(title_franchises).astype(np.int32)
+        codes = np.where(title_codes >= 0, self.title_franchises[title_codes], -1).astype(np.int32)
+        self.codes = codes
+        self.sales = np.asarray(sales)
+        self._set_series()
+
+    def _set_series(self):
+        self.n_rows = len(self.codes)
+        # Franchises with more than one title are offered as a filter
+        titles = np.bincount(self.title_franchises, minlength=len(self.categories))
+        self.series = self.categories[titles > 1].tolist()
+
+    def extended(self, rows):
+        """New index over this index's rows followed by the given rows
+
+        Only the keys sharing a first word with the key of a new title are
+        grouped again, which gives the same franchises as a full rebuild.
+        """
+        names = rows['Name']
+        known = self.titles.get_indexer(names)
+        new = pd.unique(pd.Series(np.asarray(names, dtype=object)[known < 0], dtype=object).dropna())
+        titles = self.titles.append(pd.Index(new, dtype=object)) if len(new) else self.titles
+        new_keys = title_keys(pd.Series(new, dtype=object)).to_numpy(dtype=object)
+        keys = np.concatenate([np.asarray(self.keys, dtype=object), new_keys])
+        is_new = np.arange(len(titles)) >= len(self.titles)
+        words = pd.Series(first_words(keys), dtype=object)
+        regrouped = is_new | words.isin(set(first_words(new_keys[new_keys != '']))).to_numpy()
+        title_franchises = np.concatenate([self.categories.to_numpy(dtype=object)[self.title_franchises],
+                                           np.asarray(new, dtype=object)])
+        title_franchises[regrouped] = group_titles(titles[regrouped], keys[regrouped])
+
+        index = FranchiseIndex.__new__(FranchiseIndex)
+        index._set_titles(np.concatenate([self.title_codes, titles.get_indexer(names).astype(np.int32)]),
+                          titles, keys, title_franchises,
+                          np.concatenate([self.sales, rows['Global_Sales'].to_numpy()]))
+        return index
+
+    def to_arrays(self):
+        """The index as numeric arrays and string arrays, for from_arrays()"""
+        arrays = {'title_codes': self.title_codes, 'codes': self.codes, 'title_franchises': self.title_franchises}
+        strings = {'titles': self.titles, 'keys': self.keys, 'categories': self.categories}
+        return arrays, strings
+
+    @classmethod
+    def from_arrays(cls, arrays, strings, sales):
+        """Rebuild an index from to_arrays() output without copying the arrays"""
+        index = cls.__new__(cls)
+        index.title_codes = arrays['title_codes']
+        index.codes = arrays['codes']
+        index.title_franchises = arrays['title_franchises']
+        index.titles = pd.Index(strings['titles'])
+        index.keys = strings['keys']
+        # Small, and the franchise names go into every table of totals, so held as objects
+        index.categories = pd.Index(np.asarray(strings['categories'], dtype=object))
+        index.sales = np.asarray(sales)
+        index._set_series()
+        return index
+
+    def _rows(self, packed):
+        if packed is None:
+            return self.codes, self.sales
+        rows = np.flatnonzero(unpack_mask(packed, self.n_rows))
+        return self.codes[rows], self.sales[rows]
+
+    def top(self, n, packed=None, decimals=2):
+        """Franchise and Global_Sales of the n best-selling franchises in a selection
+
+        packed is a FilterIndex packed mask, None meaning every row. Ties
+        are in franchise name order.
+        """
+        codes, sales = self._rows(packed)
+        known = codes >= 0
+        codes = codes[known]
+        totals = np.bincount(codes, weights=sales[known].astype(np.float64), minlength=len(self.categories))
+        present = np.bincount(codes, minlength=len(self.categories)) > 0
+        totals = pd.Series(totals[present].round(decimals), index=self.categories[present], name='Global_Sales')
+        totals = totals.sort_values(ascending=False, kind='stable').head(n)
+        return totals.rename_axis('Franchise').reset_index()
+
+    def packed_mask(self, franchises):
+        """Packed bitmap of the rows of any of the given franchises"""
+        wanted = self.categories.get_indexer(list(franchises))
+        return np.packbits(np.isin(self.codes, wanted[wanted >= 0]))
+
+
+def _normalize_titles(titles):
+    """Lower-cased titles with runs of whitespace collapsed, as searched"""
+    return titles.str.lower().str.split().str.join(' ')
+
+
+def _ngram_keys(chars):
+    """Integer key of every n-gram in an array of code points (21 bits each)"""
+    keys = np.zeros(len(chars) - NGRAM_SIZE + 1, dtype=np.uint64)
+    for offset in range(NGRAM_SIZE):
+        keys = (keys << np.uint64(21)) | chars[offset:len(chars) - NGRAM_SIZE + 1 + offset]
+    return keys
+
+
+def _code_points(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+
+def _title_ngrams(searched, first_id):
+    """Sorted distinct (n-gram key, title id) pairs of titles numbered from first_id"""
+    # n-grams of every title, concatenated with a separator no title contains
+    chars = _code_points('\x00'.join(searched) + '\x00')
+    title_ids = np.repeat(np.arange(first_id, first_id + len(searched), dtype=np.int32),
+                          np.fromiter((len(title) + 1 for title in searched), dtype=np.int64,
+                                      count=len(searched)))
+    keys = _ngram_keys(chars) if len(chars) >= NGRAM_SIZE else np.zeros(0, dtype=np.uint64)
+    within = np.ones(len(keys), dtype=bool)
+    for offset in range(NGRAM_SIZE):
+        within &= chars[offset:len(keys) + offset] != 0
+    keys, title_ids = keys[within], title_ids[:len(within)][within]
+    order = np.lexsort((title_ids, keys))
+    keys, title_ids = keys[order], title_ids[order]
+    distinct = np.ones(len(keys), dtype=bool)
+    distinct[1:] = (keys[1:] != keys[:-1]) | (title_ids[1:] != title_ids[:-1])
+    return keys[distinct], title_ids[distinct]
+
+
+class TitleIndex:
+    """Trigram index over the distinct game titles, for search as you type
+
+    Every distinct title is split into its overlapping NGRAM_SIZE-character
+    n-grams once, when the index is built, and each n-gram keeps the sorted
+    ids of the titles containing it. A query intersects the lists of its own
+    n-grams, so only titles holding all of them are compared with it;
+    queries shorter than an n-gram match title prefixes by a binary search.
+    Matches are ranked exact first, then title prefixes, word prefixes and
+    other substrings, with ties by global sales.
+    """
+
+    def __init__(self, names, sales, decimals=2):
+        codes, titles = pd.factorize(names)
+        self.codes = codes.astype(np.int32)
+        self.titles = pd.Index(titles, dtype=object)
+        self.decimals = decimals
+        known = codes >= 0
+        # Unrounded, so new rows can be added without compounding the rounding
+        self.totals = np.bincount(codes[known], weights=np.asarray(sales, dtype=np.float64)[known],
+                                  minlength=len(titles))
+        self.sales = self.totals.round(decimals)
+
+        self.searched = _normalize_titles(pd.Series(self.titles, dtype=object)).to_numpy(dtype=object)
+        self.prefix_order = np.argsort(self.searched)
+        self._set_postings(*_title_ngrams(self.searched, 0))
+
+    def _set_postings(self, keys, title_ids):
+        """Posting lists from (n-gram, title id) pairs sorted by n-gram, then id"""
+        self.postings = title_ids
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+        self.ngrams = keys[starts]
+        self.offsets = np.append(starts, len(keys))
+
+    def extended(self, rows):
+        """New index over this index's rows followed by the given rows
+
+        New titles get the next ids, as a rebuild would give them, so their
+        n-grams are merged into the posting lists and their prefixes into the
+        prefix order without touching the existing titles.
+        """
+        names = rows['Name']
+        known = self.titles.get_indexer(names)
+        new = pd.unique(pd.Series(np.asarray(names, dtype=object)[known < 0], dtype=object).dropna())
+        index = TitleIndex.__new__(TitleIndex)
+        index.titles = self.titles.append(pd.Index(new, dtype=object)) if len(new) else self.titles
+        codes = index.titles.get_indexer(names)
+        index.codes = np.concatenate([self.codes, codes.astype(np.int32)])
+        index.decimals = self.decimals
+        index.totals = np.append(self.totals, np.zeros(len(new)))
+        index.totals += np.bincount(codes[codes >= 0], weights=np.asarray(rows['Global_Sales'], dtype=np.float64)[codes >= 0],
+                                    minlength=len(index.titles))
+        index.sales = index.totals.round(self.decimals)
+
+        searched = _normalize_titles(pd.Series(new, dtype=object)).to_numpy(dtype=object)
+        index.searched = np.concatenate([np.asarray(self.searched, dtype=object), searched])
+        order = np.argsort(searched)
+        at = np.searchsorted(index.searched[self.prefix_order], searched[order])
+        index.prefix_order = np.insert(self.prefix_order, at, order + len(self.titles))
+
+        keys, title_ids = _title_ngrams(searched, len(self.titles))
+        old_keys = np.repeat(self.ngrams, np.diff(self.offsets))
+        # New ids are higher than every existing one, so they go after them within an n-gram
+        at = np.searchsorted(old_keys, keys, side='right')
+        index._set_postings(np.insert(old_keys, at, keys), np.insert(self.postings, at, title_ids))
+        return index
+
+    def to_arrays(self):
+        """The index as numeric arrays and string arrays, for from_arrays()"""
+        arrays = {'codes': self.codes, 'totals': self.totals, 'prefix_order': self.prefix_order,
+                  'ngrams': self.ngrams, 'offsets': self.offsets, 'postings': self.postings}
+        strings = {'titles': self.titles, 'searched': self.searched}
+        return arrays, strings
+
+    @classmethod
+    def from_arrays(cls, arrays, strings, decimals=2):
+        """Rebuild an index from to_arrays() output without copying the arrays"""
+        index = cls.__new__(cls)
+        for name, array in arrays.items():
+            setattr(index, name, array)
+        index.titles = pd.Index(strings['titles'])
+        index.searched = strings['searched']
+        index.decimals = decimals
+        index.sales = index.totals.round(decimals)
+        return index
+
+    def _candidates(self, query):
+        """Ids of the titles containing every n-gram of a normalized query"""
+        if len(query) < NGRAM_SIZE:
+            # Binary search of the prefix order, comparing the titles it points to
+            title = self.searched.__getitem__
+            low = bisect.bisect_left(self.prefix_order, query, key=title)
+            high = bisect.bisect_left(self.prefix_order, query + '\U0010ffff', key=title)
+            return np.sort(self.prefix_order[low:high])
+        lists = []
+        for key in np.unique(_ngram_keys(_code_points(query))):
+            at = np.searchsorted(self.ngrams, key)
+            if at == len(self.ngrams) or self.ngrams[at] != key:
+                return np.zeros(0, dtype=np.int32)
+            lists.append(self.postings[self.offsets[at]:self.offsets[at + 1]])
+        lists.sort(key=len)
+        found = lists[0]
+        for postings in lists[1:]:
+            found = np.intersect1d(found, postings, assume_unique=True)
+        return found
+
+    def search(self, query, limit=20):
+        """Name and Global_Sales of the best matches of a query, best first"""
+        query = ' '.join(query.lower().split())
+        ids = self._candidates(query) if query else np.zeros(0, dtype=np.int32)
+        # n-grams may appear in a title out of order, so check the whole query
+        searched = pd.Series(self.searched[ids], dtype=object)
+        ids = ids[searched.str.contains(query, regex=False).to_numpy(dtype=bool)]
+        searched = pd.Series(self.searched[ids], dtype=object)
+        tier = np.full(len(ids), 3)
+        tier[searched.str.contains(r'(?:^|\W)' + re.escape(query), regex=True).to_numpy(dtype=bool)] = 2
+        tier[searched.str.startswith(query).to_numpy(dtype=bool)] = 1
+        tier[(searched == query).to_numpy(dtype=bool)] = 0
+        ranked = ids[np.lexsort((self.titles[ids], self.searched[ids], -self.sales[ids], tier))][:limit]
+        return pd.DataFrame({'Name': self.titles[ranked].to_numpy(), 'Global_Sales': self.sales[ranked]})
+
+    def rows(self, title):
+        """Row positions of every version of a title, in dataset order"""
+        at = self.titles.get_indexer([title])[0]
+        return np.flatnonzero(self.codes == at) if at >= 0 else np.zeros(0, dtype=np.int64)
+
+    def packed_mask(self, titles):
+        """Packed bitmap of the rows of any of the given titles"""
+        wanted = self.titles.get_indexer(list(titles))
+        return np.packbits(np.isin(self.codes, wanted[wanted >= 0]))
@@ -0,0 +1,199 @@
+"""Incremental ingestion of delta files dropped next to the sales CSV
+
+Daily deltas are CSV or Parquet files with the vgsales.csv columns, placed
+in the drop directory (vgsales.deltas/ next to vgsales.csv by default, or
+VGSALES_DELTA_DIR). Each new file is parsed on its own and appended to the
+loaded dataset; the sales cube and the indexes are extended with just the
+new rows instead of being rebuilt. Every batch of new files gives the
+dataset a new version, so the caches keyed on it are invalidated once.
+
+Files are applied in name order, so date-stamped names apply oldest first.
+Write a delta under a dot-prefixed or .tmp name and rename it when it is
+complete, so a half-written file is never picked up.
+
+Applied files are recorded in .applied.json in the drop directory, with
+the content hash of the CSV they were applied to. When the CSV is
+replaced, the files applied to the old one are taken to be part of the
+new one and are not applied again; delete .applied.json to apply every
+file again.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_loader import DIMENSION_COLUMNS, clean_sales_data, compact_sales_data, freeze_frame
+
+logger = logging.getLogger(__name__)
+
+DELTA_EXTENSIONS = ('.csv', '.parquet')
+# Name of each applied file and the digest of the CSV it was applied to
+APPLIED_MANIFEST = '.applied.json'
+DELTA_COLUMNS = ['Rank', 'Name', 'Platform', 'Year', 'Genre', 'Publisher',
+                 'NA_Sales', 'EU_Sales', 'JP_Sales', 'Other_Sales', 'Global_Sales']
+
+
+def delta_dir(csv_path):
+    """Drop directory for the deltas of a CSV, VGSALES_DELTA_DIR overrides it"""
+    root, _ = os.path.splitext(csv_path)
+    return os.environ.get('VGSALES_DELTA_DIR', root + '.deltas')
+
+
+def scan_deltas(directory):
+    """(name, size, mtime_ns) of every delta file in the drop directory, in name order"""
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return []
+    files = []
+    for entry in entries:
+        name = entry.name
+        if name.startswith('.') or not name.lower().endswith(DELTA_EXTENSIONS) or not entry.is_file():
+            continue
+        stat = entry.stat()
+        files.append((name, stat.st_size, stat.st_mtime_ns))
+    return sorted(files)
+
+
+def read_delta(path):
+    """Parse and clean one delta file"""
+    if path.lower().endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    missing = [col for col in DELTA_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"missing columns {', '.join(missing)}")
+    return clean_sales_data(df[DELTA_COLUMNS].copy())
+
+
+def _align_categories(df, delta):
+    """Give the dimension columns of both frames the same sorted categories
+
+    The existing rows are only recoded when the delta brings a new value.
+    """
+    for col in DIMENSION_COLUMNS:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        categories = union_categoricals([df[col].array, delta[col].array], sort_categories=True).categories
+        if not categories.equals(df[col].cat.categories):
+            df = df.assign(**{col: df[col].cat.set_categories(categories)})
+        delta[col] = delta[col].cat.set_categories(categories)
+    return df, delta
+
+
+def append_rows(df, delta):
+    """Delta in the schema of df, and df with the delta rows appended"""
+    if isinstance(df['Platform'].dtype, pd.CategoricalDtype):
+        delta = compact_sales_data(delta)
+        df, delta = _align_categories(df, delta)
+    return delta, pd.concat([df, delta[df.columns]], ignore_index=True)
+
+
+class DeltaIngester:
+    """Applies new delta files on top of one loaded base dataset
+
+    indexes is a tuple of the indexes over the rows of df (the filter index,
+    the sales cube, ...), each extended with its extended(rows) method.
+    refresh() is cheap when nothing changed: it lists the drop directory
+    and returns the current dataset. The frames and indexes it returns are
+    never changed afterwards, so sessions still rendering an older version
+    are not affected by a newer one.
+
+    base_digest is the content hash of the CSV the dataset was loaded from.
+    When it is given, applied files are recorded against it, and files
+    recorded against another digest are skipped. publish(df, indexes,
+    version), when given, is called with every new dataset and returns the
+    (df, indexes) to keep in its place, for instance the same data
+    memory-mapped from a shared store.
+    """
+
+    def __init__(self, directory, df, indexes, base_version, base_digest=None, publish=None):
+        self.directory = directory
+        self.base_version = base_version
+        self.base_digest = base_digest
+        self.publish = publish
+        self.applied = []
+        self.failed = set()
+        # Files applied to an earlier CSV, whose rows the current one holds
+        self.folded = set()
+        if base_digest is not None:
+            self.folded = {name for name, digest in self._read_manifest().items() if digest != base_digest}
+        self.current = (df, tuple(indexes), base_version)
+        self._lock = threading.Lock()
+
+    def _version(self, applied):
+        if not applied:
+            return self.base_version
+        digest = hashlib.sha1(repr(applied).encode()).hexdigest()[:12]
+        return f'{self.base_version}+{len(applied)}-{digest}'
+
+    def _pending(self, files):
+        # A file is applied once by name, rows cannot be taken back out if it is rewritten later
+        applied = {name for name, _, _ in self.applied} | self.folded
+        return [file for file in files if file[0] not in applied and file not in self.failed]
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, APPLIED_MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, files):
+        """Add applied files to the manifest, written whole so readers never see part of it"""
+        manifest = self._read_manifest()
+        manifest.update({name: self.base_digest for name, _, _ in files})
+        path = os.path.join(self.directory, APPLIED_MANIFEST)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Could not record applied delta files: %s", exc)
+
+    def refresh(self):
+        """Apply any new delta files and return (df, indexes, version)"""
+        files = scan_deltas(self.directory)
+        if not self._pending(files):
+            return self.current
+
+        with self._lock:
+            pending = self._pending(files)
+            df, indexes, version = self.current
+            applied = []
+            for file in pending:
+                name = file[0]
+                try:
+                    delta = read_delta(os.path.join(self.directory, name))
+                    delta, extended_df = append_rows(df, delta)
+                    extended_indexes = tuple(index.extended(delta) for index in indexes)
+                except Exception as exc:
+                    # A bad file must not break every session. It is skipped until
+                    # it changes, which gives it a new size or mtime
+                    logger.warning("Skipping delta file %s: %s", name, exc)
+                    self.failed.add(file)
+                    continue
+                df, indexes = extended_df, extended_indexes
+                applied.append(file)
+                logger.info("Ingested %d rows from %s", len(delta), name)
+
+            if applied:
+                freeze_frame(df)
+                version = self._version(self.applied + applied)
+                if self.publish is not None:
+                    try:
+                        df, indexes = self.publish(df, indexes, version)
+                    except OSError as exc:
+                        logger.warning("Keeping delta rows in process memory, publishing failed: %s", exc)
+                # Files only count as applied together with the dataset that holds their rows
+                self.applied.extend(applied)
+                self.current = (df, indexes, version)
+                if self.base_digest is not None:
+                    self._record(applied)
+            return self.current
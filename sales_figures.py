@@ -0,0 +1,145 @@
+"""Figures of the Sales Analysis section, the section every session opens on
+
+The builders take the chart aggregates and top games of a filter state and
+return theme-neutral figures, so the dashboard and the background warm-up
+build the same figures and cache them under the same keys.
+"""
+from plotly.colors import make_colorscale
+
+from charts import to_plot_frame
+from startup import lazy_import
+
+px = lazy_import('plotly.express')
+
+# Regions the Top 10 chart can rank games by -> sales column
+TOP_N_REGIONS = {
+    'Global': 'Global_Sales',
+    'North America': 'NA_Sales',
+    'Europe': 'EU_Sales',
+    'Japan': 'JP_Sales',
+    'Rest of World': 'Other_Sales',
+}
+
+# Region the Top 10 chart opens on
+DEFAULT_TOP_REGION = 'Global'
+
+
+def top10_chart_id(column):
+    return f'top10_{column}'
+
+
+def trend_figure(aggregates):
+    # Group by Year and calculate sales
+    yearly_sales = aggregates.result('sales_trend').reset_index()
+    yearly_sales = yearly_sales.dropna()  # Remove rows with NaN years
+
+    # Create interactive line chart with Plotly
+    fig_trend = px.line(
+        to_plot_frame(yearly_sales),
+        x='Year',
+        y='Global_Sales',
+        title='Global Game Sales Trend Over Time (in millions)',
+        labels={'Global_Sales': 'Global Sales (millions)', 'Year': 'Year'}
+    )
+
+    fig_trend.update_layout(
+        xaxis=dict(tickmode='linear', dtick=5),
+        hovermode='x unified',
+        height=350,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+
+    fig_trend.update_traces(
+        line=dict(width=3),
+        mode='lines+markers'
+    )
+    return fig_trend
+
+
+def top10_figure(top10_games, top_region):
+    top_column = TOP_N_REGIONS[top_region]
+    fig_top10 = px.bar(
+        to_plot_frame(top10_games),
+        x=top_column,
+        y='Name',
+        orientation='h',
+        color='Publisher',
+        hover_data=['Platform', 'Year', 'Genre'],
+        title=f'Top 10 Best-Selling Games ({top_region} Sales in millions)',
+        labels={top_column: f'{top_region} Sales (millions)', 'Name': 'Game Title', 'Publisher': 'Publisher'}
+    )
+
+    fig_top10.update_layout(
+        yaxis={'categoryorder': 'total ascending'},
+        height=500,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig_top10
+
+
+def platform_figure(aggregates):
+    # Group by Platform
+    platform_sales = aggregates.result('platform_comparison')['Global_Sales'].sort_values(ascending=False).head(10).reset_index()
+
+    fig_platform = px.bar(
+        to_plot_frame(platform_sales),
+        x='Global_Sales',
+        y='Platform',
+        orientation='h',
+        color='Global_Sales',
+        color_continuous_scale='Plasma',
+        title='Top 10 Platforms by Global Sales',
+        labels={'Global_Sales': 'Global Sales (millions)', 'Platform': 'Platform'}
+    )
+
+    fig_platform.update_layout(
+        yaxis={'categoryorder': 'total ascending'},
+        height=500,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig_platform
+
+
+def platform_theme_layout():
+    """Per-theme layout of the platform chart"""
+    return {'light': {'coloraxis': {'colorscale': make_colorscale(px.colors.sequential.Blues)}}}
+
+
+def pub_animated_figure(aggregates):
+    # Get top 5 publishers by global sales
+    top_publishers = aggregates.top('publisher_totals', n=5)
+
+    # Roll the cube up by Year and Publisher and keep the top publishers
+    pub_yearly = aggregates.result('publisher_performance').reset_index()
+    pub_yearly = pub_yearly[pub_yearly['Publisher'].isin(top_publishers)]
+    pub_yearly = pub_yearly.dropna()  # Remove rows with NaN years
+
+    # Create an animated bar chart
+    fig_pub_animated = px.bar(
+        to_plot_frame(pub_yearly),
+        x='Publisher',
+        y='Global_Sales',
+        color='Publisher',
+        animation_frame='Year',
+        range_y=[0, pub_yearly['Global_Sales'].max() * 1.1],
+        title='Sales by Top Publishers Over Time',
+        labels={'Global_Sales': 'Global Sales (millions)', 'Publisher': 'Publisher', 'Year': 'Year'}
+    )
+
+    fig_pub_animated.update_layout(
+        xaxis={'categoryorder': 'total descending'},
+        height=450,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig_pub_animated
+
+
+def default_section_figures(aggregates, top_games):
+    """chart id -> (figure builder, theme layout) of the charts a new session renders first"""
+    top_column = TOP_N_REGIONS[DEFAULT_TOP_REGION]
+    return {
+        'trend': (lambda: trend_figure(aggregates), None),
+        top10_chart_id(top_column): (lambda: top10_figure(top_games(10, by=top_column), DEFAULT_TOP_REGION), None),
+        'platform': (lambda: platform_figure(aggregates), platform_theme_layout()),
+        'pub_animated': (lambda: pub_animated_figure(aggregates), None),
+    }
@@ -0,0 +1,228 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from aggregates import SalesCube
+from data_loader import SALES_COLUMNS, freeze_frame, load_sales_data
+from indexes import FilterIndex, FranchiseIndex, RankIndex, TitleIndex
+
+
+# Shared store mode is off by default, set VGSALES_SHARED_STORE=1 to enable it
+SHARED_STORE = os.environ.get('VGSALES_SHARED_STORE', '0') == '1'
+
+# Layout of a store directory, part of its name so a new layout is built alongside.
+# Also bumped when the indexes it holds are computed differently (3: franchise grouping)
+STORE_FORMAT = 3
+
+# Schema metadata key holding how each column maps back to pandas
+_META_COLUMNS = b'vgsales.columns'
+
+# Suffix of the companion column holding the missing-value mask of a nullable column
+_MASK_SUFFIX = '.mask'
+
+
+def store_root(csv_path):
+    """Directory next to the CSV that holds one subdirectory per dataset version"""
+    root, _ = os.path.splitext(csv_path)
+    return root + '.shared'
+
+
+def _frame_to_table(df):
+    """Arrow table for a frame whose every column can be mapped back without a copy
+
+    Categoricals become dictionary arrays, nullable integers become their
+    values plus a byte mask column, and strings become string arrays that
+    pandas can wrap directly. No column has Arrow nulls, so every
+    buffer can be viewed as a NumPy array.
+    """
+    arrays = {}
+    kinds = {}
+    for col in df.columns:
+        values = df[col]
+        dtype = values.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            arrays[col] = pa.DictionaryArray.from_arrays(codes, pa.array(dtype.categories.to_numpy(object)))
+            kinds[col] = 'category'
+        elif isinstance(dtype, pd.api.extensions.ExtensionDtype) and hasattr(values.array, '_mask'):
+            arrays[col] = pa.array(values.array._data)
+            arrays[col + _MASK_SUFFIX] = pa.array(values.array._mask.view(np.uint8))
+            kinds[col] = str(dtype)
+        elif dtype == object or pd.api.types.is_string_dtype(dtype):
+            arrays[col] = pa.array(values.astype(object).to_numpy(), type=pa.string())
+            kinds[col] = 'string'
+        else:
+            arrays[col] = pa.array(values.to_numpy())
+            kinds[col] = 'numpy'
+    table = pa.table(arrays)
+    return table.replace_schema_metadata({_META_COLUMNS: json.dumps(kinds).encode()})
+
+
+def _table_to_frame(table):
+    """Frame whose columns are views over the (memory-mapped) table buffers"""
+    kinds = json.loads(table.schema.metadata[_META_COLUMNS])
+    columns = {}
+    for col, kind in kinds.items():
+        if kind == 'string':
+            columns[col] = pd.arrays.ArrowStringArray(table.column(col))
+            continue
+        array = _single_chunk(table.column(col))
+        if kind == 'category':
+            codes = array.indices.to_numpy(zero_copy_only=True)
+            categories = array.dictionary.to_pandas()
+            columns[col] = pd.Categorical.from_codes(codes, categories=categories, validate=False)
+        elif kind == 'numpy':
+            columns[col] = array.to_numpy(zero_copy_only=True)
+        else:
+            values = array.to_numpy(zero_copy_only=True)
+            mask = _single_chunk(table.column(col + _MASK_SUFFIX)).to_numpy(zero_copy_only=True).view(bool)
+            array_type = pd.api.types.pandas_dtype(kind).construct_array_type()
+            columns[col] = array_type(values, mask, copy=False)
+    # copy=False keeps each column as its own block instead of consolidating
+    return pd.DataFrame(columns, copy=False)
+
+
+def _single_chunk(column):
+    # Tables written by write_store hold one record batch, so this never copies
+    return column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+
+
+def _write_table(table, path):
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_table(path):
+    # The memory map stays open as long as any array refers to its buffers
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def _write_index(index, directory, name):
+    manifest, bitmaps, positions = index.to_arrays()
+    np.save(os.path.join(directory, f'{name}.bitmaps.npy'), bitmaps)
+    np.save(os.path.join(directory, f'{name}.positions.npy'), positions)
+    with open(os.path.join(directory, f'{name}.json'), 'w') as f:
+        json.dump(manifest, f)
+
+
+def _read_index(directory, name):
+    with open(os.path.join(directory, f'{name}.json')) as f:
+        manifest = json.load(f)
+    bitmaps = np.load(os.path.join(directory, f'{name}.bitmaps.npy'), mmap_mode='r')
+    positions = np.load(os.path.join(directory, f'{name}.positions.npy'), mmap_mode='r')
+    return FilterIndex.from_arrays(manifest, bitmaps, positions)
+
+
+def _write_arrays(arrays, strings, directory, name):
+    # One file per array: .npy for numbers, a one-column Arrow table for strings
+    for key, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.{key}.npy'), array)
+    for key, values in strings.items():
+        table = pa.table({key: pa.array(np.asarray(values, dtype=object), type=pa.string())})
+        _write_table(table, os.path.join(directory, f'{name}.{key}.arrow'))
+
+
+def _read_arrays(directory, name):
+    arrays = {}
+    strings = {}
+    for file in os.listdir(directory):
+        prefix, key, extension = file.rsplit('.', 2) if file.count('.') >= 2 else (None, None, None)
+        if prefix != name:
+            continue
+        path = os.path.join(directory, file)
+        if extension == 'npy':
+            arrays[key] = np.load(path, mmap_mode='r')
+        elif extension == 'arrow':
+            strings[key] = pd.arrays.ArrowStringArray(_read_table(path).column(key))
+    return arrays, strings
+
+
+def write_store(df, directory, indexes=None):
+    """Write the dataset, its indexes and the sales cube to a directory
+
+    indexes is (filter_index, sales_cube, rank_index, franchise_index,
+    title_index) over the rows of df when they are already built, for
+    instance extended with delta rows. They are built from df otherwise.
+    """
+    if indexes is None:
+        indexes = (FilterIndex(df), SalesCube.from_rows(df), RankIndex(df, SALES_COLUMNS),
+                   FranchiseIndex(df['Name'], df['Global_Sales']), TitleIndex(df['Name'], df['Global_Sales']))
+    filter_index, cube, rank_index, franchise_index, title_index = indexes
+    os.makedirs(directory)
+    _write_table(_frame_to_table(df), os.path.join(directory, 'data.arrow'))
+    _write_index(filter_index, directory, 'data_index')
+    _write_table(_frame_to_table(cube.cells), os.path.join(directory, 'cube.arrow'))
+    _write_index(cube.index, directory, 'cube_index')
+    _write_arrays({col: rank_index.ranked(col) for col in SALES_COLUMNS}, {}, directory, 'rank_index')
+    _write_arrays(*franchise_index.to_arrays(), directory, 'franchise_index')
+    _write_arrays(*title_index.to_arrays(), directory, 'title_index')
+
+
+def open_store(directory):
+    """Dataset, indexes and sales cube memory-mapped from a store directory
+
+    Returns (df, filter_index, sales_cube, rank_index, franchise_index,
+    title_index). The arrays and title strings are read-only views over the
+    mapped files, so every process that opens the same store shares one copy
+    of them in the page cache.
+    """
+    df = freeze_frame(_table_to_frame(_read_table(os.path.join(directory, 'data.arrow'))))
+    filter_index = _read_index(directory, 'data_index')
+    cells = freeze_frame(_table_to_frame(_read_table(os.path.join(directory, 'cube.arrow'))))
+    sales_cube = SalesCube(cells, index=_read_index(directory, 'cube_index'))
+    orders, _ = _read_arrays(directory, 'rank_index')
+    rank_index = RankIndex(df, SALES_COLUMNS, order=orders)
+    franchise_index = FranchiseIndex.from_arrays(*_read_arrays(directory, 'franchise_index'), df['Global_Sales'])
+    title_index = TitleIndex.from_arrays(*_read_arrays(directory, 'title_index'))
+    return df, filter_index, sales_cube, rank_index, franchise_index, title_index
+
+
+def _publish(csv_path, version, write):
+    """Directory of the store for a dataset version, written with write(directory) if missing
+
+    The first process to need a version writes it in a private temporary
+    directory and renames it into place, which is atomic, so other workers
+    either see the finished store or write their own and discard it.
+    Stores for older versions are removed once a new one is published,
+    except the store of the base version under a delta version
+    ("<base>+<n>-<digest>"), which workers starting up open first.
+    """
+    root = store_root(csv_path)
+    store_name = f'{version}.v{STORE_FORMAT}'
+    directory = os.path.join(root, store_name)
+    if not os.path.isdir(directory):
+        tmp_directory = f'{directory}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        write(tmp_directory)
+        try:
+            os.rename(tmp_directory, directory)
+        except OSError:
+            # Another worker published the same version first
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+        kept = {store_name, f"{version.split('+', 1)[0]}.v{STORE_FORMAT}"}
+        for name in os.listdir(root):
+            if name not in kept and not name.endswith('.tmp'):
+                # Mapped files stay readable by workers still using them
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return directory
+
+
+def load_shared_dataset(csv_path, version):
+    """Open the shared store for a dataset version, building it from the CSV if needed"""
+    return open_store(_publish(csv_path, version, lambda directory: write_store(load_sales_data(csv_path), directory)))
+
+
+def publish_dataset(csv_path, df, indexes, version):
+    """Publish a dataset extended with delta rows as the shared store of its version
+
+    indexes are in the order write_store takes them. Returns (df, indexes)
+    memory-mapped from the store, to use in place of the given ones, so the
+    delta rows are held once per host like the rest of the dataset.
+    """
+    df, *indexes = open_store(_publish(csv_path, version, lambda directory: write_store(df, directory, indexes)))
+    return df, tuple(indexes)
@@ -0,0 +1,137 @@
+import builtins
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Import and phase timings of the first script run in a server process
+
+    Streamlit runs the whole script on every interaction, but only the first
+    run pays for imports, data loading and index building. The profile records
+    that run: each top-level import made while imports are tracked, each
+    module loaded later through lazy_import(), and the time between phase
+    marks. Once the first run has finished, every call is a no-op.
+    """
+
+    def __init__(self):
+        self.imports = {}
+        self.phases = {}
+        self.total = None
+        self.finished = False
+        self._started = None
+        self._last_mark = None
+        self._original_import = None
+        self._thread = None
+        self._depth = 0
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Only new, absolute imports made directly by the profiled thread are
+        # timed, nested imports count towards the module that triggered them
+        if (level or self._depth or name in sys.modules
+                or threading.get_ident() != self._thread):
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.imports.setdefault(name, time.perf_counter() - started)
+
+    def track_imports(self):
+        """Start the profile and time imports until imports_done() is called"""
+        if self.finished or self._original_import is not None:
+            return
+        self._started = self._last_mark = time.perf_counter()
+        self._thread = threading.get_ident()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def imports_done(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+        self.mark('Imports')
+
+    def mark(self, phase):
+        """Record the time since the previous mark as a phase of the first run"""
+        if self.finished or self._last_mark is None:
+            return
+        now = time.perf_counter()
+        self.phases.setdefault(phase, now - self._last_mark)
+        self._last_mark = now
+
+    def finish(self, budget=None):
+        """Close the profile at the end of the first run
+
+        A warning is logged when the run took longer than the budget, in
+        seconds, and the profile is written to the path in
+        VGSALES_STARTUP_PROFILE when it is set.
+        """
+        if self.finished or self._started is None:
+            return
+        self.finished = True
+        self.total = time.perf_counter() - self._started
+        if budget is not None and self.total > budget:
+            logger.warning("Cold start took %.2fs, over the %.2fs budget", self.total, budget)
+        path = os.environ.get('VGSALES_STARTUP_PROFILE')
+        if path:
+            with open(path, 'w') as f:
+                f.write(self.to_json())
+
+    def to_dict(self):
+        return {
+            'total_seconds': self.total,
+            'phases': self.phases,
+            'imports': dict(sorted(self.imports.items(), key=lambda item: -item[1])),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_frame(self):
+        """Phases and imports as one table, slowest imports first"""
+        rows = [{'kind': 'phase', 'name': name, 'ms': seconds * 1000}
+                for name, seconds in self.phases.items()]
+        rows += [{'kind': 'import', 'name': name, 'ms': seconds * 1000}
+                 for name, seconds in self.to_dict()['imports'].items()]
+        return pd.DataFrame(rows, columns=['kind', 'name', 'ms'])
+
+
+# One profile per process, modules outlive the script reruns
+startup_profile = StartupProfile()
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported when first used"""
+
+    def __init__(self, name, profile=startup_profile):
+        self._name = name
+        self._profile = profile
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            self._profile.imports.setdefault(f'{self._name} (lazy)', time.perf_counter() - started)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name):
+    """Defer importing an optional or heavy module until an attribute is used"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
@@ -0,0 +1,52 @@
+import os
+import random
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_loader import load_sales_data  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def sales():
+    """The bundled dataset, in the compact schema the dashboard loads"""
+    return load_sales_data(os.path.join(ROOT, 'vgsales.csv'), use_snapshot=False)
+
+
+@pytest.fixture(scope='session')
+def selections(sales):
+    """Random sidebar selections of {column: values}, including empty and unknown values"""
+    rng = random.Random(0)
+    platforms = sorted(sales['Platform'].dropna().unique())
+    genres = sorted(sales['Genre'].dropna().unique())
+    publishers = sorted(sales['Publisher'].dropna().unique())
+    found = []
+    for _ in range(100):
+        low = rng.randint(1975, 2022)
+        found.append({
+            'Year': range(low, rng.randint(low, 2025) + 1),
+            'Platform': rng.choice([[], None, rng.sample(platforms, 3), ['PS2', 'No Such Platform']]),
+            'Genre': rng.choice([[], rng.sample(genres, rng.randint(1, len(genres)))]),
+            'Publisher': rng.choice([None, None, [rng.choice(publishers)], ['Nintendo']]),
+        })
+    return found
+
+
+@pytest.fixture
+def csv_copy(tmp_path):
+    """Copy of the bundled dataset in a scratch directory, so snapshots land there"""
+    path = tmp_path / 'vgsales.csv'
+    shutil.copyfile(os.path.join(ROOT, 'vgsales.csv'), path)
+    return str(path)
+
+
+def split_rows(df, parts, seed=0):
+    """Shuffled rows of df cut into a base frame and delta frames"""
+    shuffled = df.sample(frac=1, random_state=seed).reset_index(drop=True)
+    cuts = sorted(random.Random(seed).sample(range(1, len(df)), parts - 1))
+    bounds = [0] + cuts + [len(df)]
+    return [shuffled.iloc[start:stop].reset_index(drop=True) for start, stop in zip(bounds, bounds[1:])]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import CUBE_MEASURES, CubeSlice, SalesCube, YearRangeSlice
+from conftest import split_rows
+from data_loader import SALES_COLUMNS
+from indexes import FilterIndex
+from ingest import append_rows
+
+# The rollups the charts ask for, plus some they do not
+ROLLUPS = [('Year',), ('Platform',), ('Genre',), ('Publisher',), ('Year', 'Platform'), ('Year', 'Genre'),
+           ('Year', 'Publisher'), ('Year', 'Platform', 'Genre'), ('Genre', 'Platform')]
+
+
+def grouped_rows(df, by):
+    """Measures summed over the raw rows"""
+    sales = df[SALES_COLUMNS].astype('float64').assign(Count=1)
+    keys = [df[column] for column in by]
+    return sales.groupby(keys, observed=True, sort=True)[CUBE_MEASURES].sum()
+
+
+def assert_same_rollup(got, expected):
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False, check_categorical=False,
+                                  check_index_type=False, check_exact=False, rtol=1e-5, atol=1e-4)
+
+
+@pytest.mark.parametrize('by', ROLLUPS, ids='-'.join)
+def test_cube_rollups_match_groupby(sales, selections, by):
+    cube = SalesCube.from_rows(sales)
+    filter_index = FilterIndex(sales)
+    for selection in selections[:30]:
+        rows = sales[filter_index.mask(selection)]
+        assert_same_rollup(cube.slice(selection).rollup(list(by)), grouped_rows(rows, list(by)))
+
+
+def test_cube_totals_match_rows(sales, selections):
+    cube = SalesCube.from_rows(sales)
+    filter_index = FilterIndex(sales)
+    for selection in selections:
+        rows = sales[filter_index.mask(selection)]
+        cube_slice = cube.slice(selection)
+        expected = rows[SALES_COLUMNS].astype('float64').sum()
+        pd.testing.assert_series_equal(cube_slice.totals(SALES_COLUMNS), expected, check_exact=False,
+                                       rtol=1e-5, atol=1e-4)
+        assert cube_slice.totals(['Count'])['Count'] == len(rows)
+        assert cube_slice.nunique('Platform') == rows['Platform'].nunique()
+
+
+def test_year_range_slices_match_cube_cells(sales, selections):
+    cube = SalesCube.from_rows(sales)
+    from_sums = 0
+    for selection in selections:
+        fast = cube.slice(selection)
+        cells = CubeSlice(cube.cells[cube.index.mask(selection)])
+        from_sums += isinstance(fast, YearRangeSlice)
+        pd.testing.assert_series_equal(fast.totals(), cells.totals(), check_exact=False, rtol=1e-9)
+        for dimension in ['Year', 'Platform', 'Genre', 'Publisher']:
+            assert fast.nunique(dimension) == cells.nunique(dimension)
+        for by in ROLLUPS:
+            pd.testing.assert_frame_equal(fast.rollup(list(by)), cells.rollup(list(by)), check_dtype=False,
+                                          check_categorical=False, check_index_type=False, check_exact=False,
+                                          rtol=0, atol=1e-6)
+    # The selections must exercise the running totals, not only the cells
+    assert from_sums > 0
+
+
+def test_extended_cube_matches_rebuild(sales):
+    base, *deltas = split_rows(sales, 3)
+    cube = SalesCube.from_rows(base)
+    for delta in deltas:
+        delta, base = append_rows(base, delta)
+        cube = cube.extended(delta)
+    rebuilt = SalesCube.from_rows(base)
+    for by in ROLLUPS:
+        assert_same_rollup(cube.slice({}).rollup(list(by)), rebuilt.slice({}).rollup(list(by)))
+    np.testing.assert_allclose(cube.slice({}).totals(), rebuilt.slice({}).totals())
@@ -0,0 +1,54 @@
+import cache as cache_module
+from cache import BoundedCache
+
+
+def test_entry_limit_evicts_least_recently_used():
+    cache = BoundedCache(max_bytes=1000, max_entries=2)
+    cache.put(('rows', 1), 'a', size=1)
+    cache.put(('rows', 2), 'b', size=1)
+    assert cache.get(('rows', 1)) == 'a'
+    cache.put(('rows', 3), 'c', size=1)
+    assert cache.get(('rows', 2)) is None
+    assert cache.get(('rows', 1)) == 'a'
+    assert cache.get(('rows', 3)) == 'c'
+    assert cache.stats().set_index('kind').loc['rows', 'evictions'] == 1
+
+
+def test_byte_budget_evicts_until_it_fits():
+    cache = BoundedCache(max_bytes=100)
+    for i in range(4):
+        cache.put(('export', i), i, size=30)
+    assert cache.total_bytes == 90
+    cache.put(('export', 4), 4, size=60)
+    assert cache.total_bytes == 90
+    assert [cache.get(('export', i)) for i in range(5)] == [None, None, None, 3, 4]
+
+
+def test_oversized_value_is_returned_but_not_stored():
+    cache = BoundedCache(max_bytes=100)
+    cache.put(('rows', 1), 'kept', size=50)
+    assert cache.put(('rows', 2), 'too big', size=101) == 'too big'
+    assert cache.get(('rows', 2)) is None
+    assert cache.get(('rows', 1)) == 'kept'
+    assert cache.total_bytes == 50
+
+
+def test_expired_entries_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = BoundedCache(max_bytes=100, ttl=60)
+    cache.put(('rows', 1), 'a', size=1)
+    now[0] += 59
+    assert cache.get(('rows', 1)) == 'a'
+    now[0] += 2
+    assert cache.get(('rows', 1)) is None
+    assert cache.total_bytes == 0
+    assert cache.stats().set_index('kind').loc['rows', 'evictions'] == 1
+
+
+def test_get_or_compute_computes_once():
+    cache = BoundedCache(max_bytes=1000)
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute(('rows', 1), lambda: calls.append(1) or 'value') == 'value'
+    assert len(calls) == 1
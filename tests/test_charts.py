@@ -0,0 +1,39 @@
+import json
+from types import SimpleNamespace
+
+import plotly.graph_objects as go
+
+import charts
+from charts import figure_to_spec, render_spec
+
+
+def fake_streamlit(main):
+    """Stand-in for the streamlit module that records the charts it is given"""
+    sent = []
+    return SimpleNamespace(_main=main, plotly_chart=lambda figure, **kwargs: sent.append(figure)), sent
+
+
+def test_spec_goes_into_the_chart_message(monkeypatch):
+    spec = figure_to_spec(go.Figure(go.Bar(x=['a', 'b'], y=[1, 2])))
+    enqueued = []
+    st, sent = fake_streamlit(SimpleNamespace(_enqueue=lambda name, proto: enqueued.append((name, proto))))
+    monkeypatch.setattr(charts, 'st', st)
+    render_spec(spec)
+    assert not sent
+    [(name, proto)] = enqueued
+    assert name == 'plotly_chart'
+    assert proto.figure.spec == spec
+
+
+def test_spec_falls_back_to_plotly_chart_without_streamlit_internals(monkeypatch):
+    spec = figure_to_spec(go.Figure(go.Bar(x=['a', 'b'], y=[1, 2])))
+    st, sent = fake_streamlit(None)
+    monkeypatch.setattr(charts, 'st', st)
+    render_spec(spec)
+    assert sent == [json.loads(spec)]
+
+    monkeypatch.setattr(charts, 'PlotlyChartProto', None)
+    st, sent = fake_streamlit(SimpleNamespace(_enqueue=lambda name, proto: None))
+    monkeypatch.setattr(charts, 'st', st)
+    render_spec(spec)
+    assert sent == [json.loads(spec)]
@@ -0,0 +1,61 @@
+import hashlib
+import os
+
+import pandas as pd
+
+import data_loader
+from data_loader import _snapshot_is_fresh, load_sales_data, snapshot_path, source_digest
+
+
+def test_snapshot_is_written_and_reused(csv_copy):
+    first = load_sales_data(csv_copy)
+    assert os.path.exists(snapshot_path(csv_copy))
+    pd.testing.assert_frame_equal(load_sales_data(csv_copy), first)
+    pd.testing.assert_frame_equal(first, load_sales_data(csv_copy, use_snapshot=False))
+
+
+def test_same_content_with_a_new_mtime_is_fresh(csv_copy):
+    load_sales_data(csv_copy)
+    stat = os.stat(csv_copy)
+    os.utime(csv_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert _snapshot_is_fresh(snapshot_path(csv_copy), os.stat(csv_copy), csv_copy)
+
+
+def test_confirmed_snapshot_is_restamped(csv_copy, monkeypatch):
+    load_sales_data(csv_copy)
+    stat = os.stat(csv_copy)
+    os.utime(csv_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert _snapshot_is_fresh(snapshot_path(csv_copy), os.stat(csv_copy), csv_copy)
+
+    # The new mtime is recorded, so the next check does not hash the CSV
+    def no_hashing(path):
+        raise AssertionError(f'{path} was hashed again')
+
+    monkeypatch.setattr(data_loader, '_file_sha256', no_hashing)
+    assert _snapshot_is_fresh(snapshot_path(csv_copy), os.stat(csv_copy), csv_copy)
+    pd.testing.assert_frame_equal(load_sales_data(csv_copy), load_sales_data(csv_copy, use_snapshot=False))
+
+
+def test_same_size_with_new_content_is_stale(csv_copy):
+    load_sales_data(csv_copy)
+    stat = os.stat(csv_copy)
+    with open(csv_copy, 'r+b') as f:
+        content = f.read()
+        f.seek(0)
+        # Same length, different title in the first data row
+        f.write(content.replace(b'Wii Sports', b'Wii Sp0rts', 1))
+    os.utime(csv_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert os.stat(csv_copy).st_size == stat.st_size
+    assert not _snapshot_is_fresh(snapshot_path(csv_copy), os.stat(csv_copy), csv_copy)
+    assert load_sales_data(csv_copy)['Name'].iloc[0] == 'Wii Sp0rts'
+
+
+def test_source_digest_is_the_content_hash(csv_copy, monkeypatch):
+    with open(csv_copy, 'rb') as f:
+        expected = hashlib.sha256(f.read()).hexdigest()
+    assert source_digest(csv_copy) == expected
+
+    # Once there is a snapshot, the digest is read from it
+    load_sales_data(csv_copy)
+    monkeypatch.setattr(data_loader, '_file_sha256', lambda path: 'hashed')
+    assert source_digest(csv_copy) == expected
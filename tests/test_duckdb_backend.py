@@ -0,0 +1,69 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import SalesCube
+from conftest import ROOT
+from filter_state import filter_options
+from indexes import FilterIndex, FranchiseIndex, TitleIndex
+
+pytest.importorskip('duckdb')
+
+from duckdb_backend import DuckDBSales  # noqa: E402
+
+ROLLUPS = [('Year',), ('Platform',), ('Genre',), ('Publisher',), ('Year', 'Genre'), ('Year', 'Publisher')]
+
+
+@pytest.fixture(scope='module')
+def duckdb_sales(tmp_path_factory):
+    path = tmp_path_factory.mktemp('duckdb') / 'vgsales.csv'
+    shutil.copyfile(os.path.join(ROOT, 'vgsales.csv'), path)
+    return DuckDBSales.from_csv(str(path))
+
+
+def test_rollups_and_totals_match_the_cube(sales, selections, duckdb_sales):
+    cube = SalesCube.from_rows(sales)
+    for selection in selections[:25]:
+        expected = cube.slice(selection)
+        got = duckdb_sales.slice(selection)
+        for by in ROLLUPS:
+            pd.testing.assert_frame_equal(got.rollup(list(by)), expected.rollup(list(by)), check_categorical=False,
+                                          check_index_type=False, check_exact=False, rtol=0, atol=1e-6)
+        pd.testing.assert_series_equal(got.totals(), expected.totals().astype('float64'), check_names=False,
+                                       check_exact=False, rtol=0, atol=1e-6)
+        for dimension in ['Platform', 'Genre', 'Publisher']:
+            assert got.nunique(dimension) == expected.nunique(dimension)
+            assert got.top(dimension) == expected.top(dimension)
+
+
+def test_top_rows_match_a_stable_sort(sales, selections, duckdb_sales):
+    filter_index = FilterIndex(sales)
+    for selection in selections[:25]:
+        rows = sales[filter_index.mask(selection)]
+        expected = rows.sort_values('Global_Sales', ascending=False, kind='stable').head(10)
+        got = duckdb_sales.slice(selection).rows(order_by='Global_Sales', limit=10)
+        pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False, check_categorical=False,
+                                      check_index_type=False)
+
+
+def test_franchise_filter_matches_the_franchise_index(sales, selections, duckdb_sales):
+    filter_index = FilterIndex(sales)
+    franchise_index = FranchiseIndex(sales['Name'], sales['Global_Sales'])
+    wanted = ['Halo', 'Super Mario', 'Final Fantasy']
+    rows = franchise_index.packed_mask(wanted)
+    for selection in selections[:10]:
+        mask = filter_index.mask(selection) & np.unpackbits(rows, count=len(sales)).view(bool)
+        got = duckdb_sales.slice(selection, wanted).rows(columns=['Name'])
+        np.testing.assert_array_equal(got.index, np.flatnonzero(mask))
+
+
+def test_filter_options_match(sales, duckdb_sales):
+    series = FranchiseIndex(sales['Name'], sales['Global_Sales']).series
+    titles = TitleIndex(sales['Name'], sales['Global_Sales']).titles
+    got = duckdb_sales.filter_options()
+    expected = filter_options(sales, series, titles)
+    assert set(got.pop('titles')) == set(expected.pop('titles'))
+    assert got == expected
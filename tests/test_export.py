@@ -0,0 +1,49 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from export import EXPORT_FORMATS, export_bytes
+
+
+def read_back(data, export_format, like):
+    if export_format == 'CSV':
+        return pd.read_csv(io.BytesIO(data)).astype(like.dtypes.to_dict())
+    if export_format == 'Parquet':
+        return pq.read_table(io.BytesIO(data)).to_pandas()
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all().to_pandas()
+
+
+def assert_same_rows(got, expected):
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False, check_index_type=False)
+
+
+@pytest.mark.parametrize('export_format', EXPORT_FORMATS)
+def test_export_round_trips_in_chunks(sales, export_format):
+    rows = sales[sales['Genre'] == 'Puzzle']
+    got = read_back(export_bytes(rows, export_format, chunk_rows=100), export_format, rows)
+    assert_same_rows(got, rows)
+
+
+def test_csv_export_matches_to_csv(sales):
+    rows = sales.head(1234)
+    assert export_bytes(rows, 'CSV', chunk_rows=500) == rows.to_csv(index=False).encode('utf-8')
+
+
+@pytest.mark.parametrize('export_format', EXPORT_FORMATS)
+def test_empty_selection_exports_the_header_only(sales, export_format):
+    got = read_back(export_bytes(sales.head(0), export_format), export_format, sales)
+    assert list(got.columns) == list(sales.columns)
+    assert len(got) == 0
+
+
+@pytest.mark.parametrize('export_format', ['Parquet', 'Arrow IPC'])
+def test_schema_comes_from_every_chunk(sales, export_format):
+    rows = sales.head(10).copy()
+    # The first chunk has no titles at all, the second one does
+    rows['Name'] = rows['Name'].astype(object).where(rows.index >= 5, None)
+    got = read_back(export_bytes(rows, export_format, chunk_rows=5), export_format, rows)
+    assert_same_rows(got, rows)
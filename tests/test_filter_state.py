@@ -0,0 +1,123 @@
+import types
+
+import pandas as pd
+import pytest
+
+import filter_state
+from filter_state import EMPTY_SELECTION, FILTER_KEYS, QUICK_PRESETS, FilterState
+
+
+class QueryParams:
+    """In-memory stand-in for st.query_params, holding a list of values per key"""
+
+    def __init__(self, **params):
+        self.params = {key: value if isinstance(value, list) else [value] for key, value in params.items()}
+
+    def __contains__(self, key):
+        return key in self.params
+
+    def __getitem__(self, key):
+        return self.params[key][-1]
+
+    def __setitem__(self, key, value):
+        self.params[key] = list(value) if isinstance(value, list) else [str(value)]
+
+    def __delitem__(self, key):
+        del self.params[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def get_all(self, key):
+        return list(self.params.get(key, []))
+
+
+DEFAULTS = {'years': (1980, 2020), 'platforms': ['PS2', 'Wii'], 'genres': ['Action'], 'publisher': 'All',
+            'franchises': [], 'titles': []}
+OPTIONS = {'years': (1980, 2020), 'platforms': ['PS2', 'PS3', 'Wii'], 'genres': ['Action', 'Puzzle'],
+           'publisher': ['All', 'Nintendo', 'Sega'], 'franchises': ['Halo', 'Mario'],
+           'titles': pd.Index(['Halo 3', 'Tetris'], dtype=object)}
+
+
+@pytest.fixture
+def fake_st(monkeypatch):
+    fake = types.SimpleNamespace(query_params=QueryParams(), session_state={})
+    monkeypatch.setattr(filter_state, 'st', fake)
+    return fake
+
+
+def new_session(fake_st, params):
+    """A new browser session opened on a URL with the given query parameters"""
+    fake_st.session_state.clear()
+    fake_st.query_params = params
+    state = FilterState(DEFAULTS, OPTIONS)
+    state.initialize()
+    return state
+
+
+def test_new_session_uses_the_defaults(fake_st):
+    state = new_session(fake_st, QueryParams())
+    assert state.values == DEFAULTS
+    state.sync_query_params()
+    assert fake_st.query_params.params == {}
+
+
+def test_values_are_sanitized_to_the_options(fake_st):
+    state = new_session(fake_st, QueryParams())
+    state.update({'years': (2030, 1970), 'platforms': ['PS3', 'Dreamcast'], 'publisher': 'Konami'})
+    assert state.values['years'] == (1980, 2020)
+    assert state.values['platforms'] == ['PS3']
+    assert state.values['publisher'] == 'All'
+
+
+def test_url_from_another_session_is_sanitized(fake_st):
+    state = new_session(fake_st, QueryParams(years='1975-2010', platforms=['PS3', 'N64'], publisher='Konami'))
+    assert state.values == dict(DEFAULTS, years=(1980, 2010), platforms=['PS3'])
+    state = new_session(fake_st, QueryParams(years='not-a-range'))
+    assert state.values['years'] == DEFAULTS['years']
+
+
+@pytest.mark.parametrize('values', [
+    {'years': (1995, 2005)},
+    {'platforms': ['PS3', 'Wii'], 'publisher': 'Sega'},
+    {'platforms': [], 'genres': []},
+    {'genres': ['Puzzle'], 'publisher': 'Nintendo'},
+    {'franchises': ['Mario', 'Halo']},
+    {'titles': ['Tetris']},
+    QUICK_PRESETS['Nintendo Games'],
+])
+def test_filters_round_trip_through_the_url(fake_st, values):
+    state = new_session(fake_st, QueryParams())
+    state.update(values)
+    state.sync_query_params()
+    params = fake_st.query_params
+    shared = new_session(fake_st, QueryParams(**params.params))
+    assert shared.values == state.values
+
+
+def test_empty_selection_is_encoded_with_a_marker(fake_st):
+    state = new_session(fake_st, QueryParams())
+    state.update({'platforms': []})
+    state.sync_query_params()
+    assert fake_st.query_params.get_all('platforms') == [EMPTY_SELECTION]
+    state.update({'platforms': DEFAULTS['platforms']})
+    state.sync_query_params()
+    assert 'platforms' not in fake_st.query_params
+
+
+def test_existing_widget_state_wins_over_the_url(fake_st):
+    fake_st.session_state[FILTER_KEYS['genres']] = ['Puzzle']
+    fake_st.query_params = QueryParams(genres='Action')
+    state = FilterState(DEFAULTS, OPTIONS)
+    state.initialize()
+    assert state.values['genres'] == ['Puzzle']
+
+
+def test_reset_and_select_all(fake_st):
+    state = new_session(fake_st, QueryParams())
+    state.apply_preset('Action Games')
+    state.select_all()
+    assert state.values == {'years': (1980, 2020), 'platforms': OPTIONS['platforms'],
+                            'genres': OPTIONS['genres'], 'publisher': 'All', 'franchises': [], 'titles': []}
+    state.reset()
+    assert state.values == DEFAULTS
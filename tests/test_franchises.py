@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from franchises import franchise_map
+
+
+@pytest.mark.parametrize('title, franchise', [
+    ('Halo Wars', 'Halo'),
+    ("Tom Clancy's Splinter Cell: Conviction", "Tom Clancy's Splinter Cell"),
+    ('Final Fantasy X', 'Final Fantasy'),
+    ('Grand Theft Auto V', 'Grand Theft Auto'),
+    ('Star Wars: Battlefront', 'Star Wars'),
+    ('Mario & Sonic at the Olympic Games', 'Mario & Sonic'),
+    ('Pokemon Red/Pokemon Blue', 'Pokemon'),
+    ('Pokémon Yellow: Special Pikachu Edition', 'Pokemon'),
+    ('Call of Duty: Black Ops', 'Call of Duty'),
+    ('Silent Hill 2', 'Silent Hill'),
+    ('1942', '1942'),
+])
+def test_franchise_of_bundled_titles(sales, title, franchise):
+    assert franchise_map(sales['Name'])[title] == franchise
+
+
+def test_franchise_map_has_every_distinct_title():
+    titles = pd.Series(['Halo 2', 'Halo 3', None, 'Halo 2', '!!!'])
+    assert franchise_map(titles).to_dict() == {'Halo 2': 'Halo', 'Halo 3': 'Halo', '!!!': '!!!'}
+
+
+def test_one_word_series_is_one_franchise():
+    titles = pd.Series(['Pokemon Red/Pokemon Blue', 'Pokemon Gold/Pokemon Silver', 'Pokemon Black/Pokemon White',
+                        'Pokémon Yellow: Special Pikachu Edition', 'Super Mario Bros.', 'Super Mario Land',
+                        'Super Mario World', 'Super Monkey Ball', 'Super Monkey Ball 2', 'Super Metroid'])
+    franchises = franchise_map(titles)
+    assert set(franchises[titles[:4]]) == {'Pokemon'}
+    # "Super" leads into a series of its own, so the other Super titles are not grouped under it
+    assert franchises[titles[4:7]].tolist() == ['Super Mario'] * 3
+    assert franchises[titles[7:]].tolist() == ['Super Monkey Ball', 'Super Monkey Ball', 'Super Metroid']
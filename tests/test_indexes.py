@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import split_rows
+from data_loader import SALES_COLUMNS
+from franchises import franchise_map
+from indexes import FilterIndex, FranchiseIndex, RankIndex, TitleIndex
+from ingest import append_rows
+
+
+def boolean_mask(df, selection):
+    """Row mask of a selection built with plain pandas comparisons"""
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in selection.items():
+        if values:
+            mask &= df[column].isin(list(values)).fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+def extend(df, parts, build):
+    """Index built on the first part of df and extended with the others, and the full frame"""
+    base, *deltas = split_rows(df, parts)
+    index = build(base)
+    for delta in deltas:
+        delta, base = append_rows(base, delta)
+        index = index.extended(delta)
+    return index, base
+
+
+def test_filter_index_matches_boolean_filters(sales, selections):
+    index = FilterIndex(sales)
+    for selection in selections:
+        np.testing.assert_array_equal(index.mask(selection), boolean_mask(sales, selection))
+        np.testing.assert_array_equal(index.rows(selection), np.flatnonzero(boolean_mask(sales, selection)))
+
+
+def test_filter_index_without_filters_selects_every_row(sales):
+    index = FilterIndex(sales)
+    assert index.packed_mask({'Platform': [], 'Genre': None}) is None
+    assert index.packed_mask({'Genre': sorted(sales['Genre'].unique())}) is None
+
+
+def test_extended_filter_index_matches_rebuild(sales, selections):
+    index, df = extend(sales, 3, FilterIndex)
+    rebuilt = FilterIndex(df)
+    for selection in selections:
+        np.testing.assert_array_equal(index.mask(selection), rebuilt.mask(selection))
+
+
+@pytest.mark.parametrize('column', SALES_COLUMNS)
+def test_rank_index_top_matches_stable_sort(sales, selections, column):
+    filter_index = FilterIndex(sales)
+    rank_index = RankIndex(sales, SALES_COLUMNS)
+    for selection, n in zip(selections, [1, 10, 50] * len(selections)):
+        expected = sales[filter_index.mask(selection)].sort_values(column, ascending=False, kind='stable').head(n)
+        got = sales.iloc[rank_index.top(column, n, filter_index.packed_mask(selection))]
+        assert got.index.equals(expected.index)
+
+
+def test_extended_rank_index_matches_rebuild(sales):
+    def build(df):
+        index = RankIndex(df, SALES_COLUMNS)
+        index.ranked('Global_Sales')
+        return index
+
+    index, df = extend(sales, 4, build)
+    rebuilt = RankIndex(df, SALES_COLUMNS)
+    for column in SALES_COLUMNS:
+        np.testing.assert_array_equal(index.ranked(column), rebuilt.ranked(column))
+
+
+def test_franchise_top_matches_groupby(sales, selections):
+    index = FranchiseIndex(sales['Name'], sales['Global_Sales'])
+    filter_index = FilterIndex(sales)
+    franchises = sales['Name'].map(franchise_map(sales['Name']))
+    for selection in selections[:20]:
+        mask = filter_index.mask(selection)
+        totals = (sales['Global_Sales'][mask].astype('float64').groupby(franchises[mask]).sum().round(2)
+                  .sort_index().sort_values(ascending=False, kind='stable').head(10))
+        got = index.top(10, filter_index.packed_mask(selection))
+        assert got['Franchise'].tolist() == totals.index.tolist()
+        np.testing.assert_allclose(got['Global_Sales'], totals.to_numpy())
+
+
+def test_extended_franchise_index_matches_rebuild(sales):
+    index, df = extend(sales, 3, lambda df: FranchiseIndex(df['Name'], df['Global_Sales']))
+    rebuilt = FranchiseIndex(df['Name'], df['Global_Sales'])
+    assert index.categories.equals(rebuilt.categories)
+    np.testing.assert_array_equal(index.codes, rebuilt.codes)
+    assert index.series == rebuilt.series
+
+
+@pytest.mark.parametrize('query', ['mario', 'Ma', 'zelda', 'grand  theft', 'call of duty', 'of', 'pokémon',
+                                   'a', 'ii ', ': t', '3', 'no such game'])
+def test_title_search_matches_substring_scan(sales, query):
+    index = TitleIndex(sales['Name'], sales['Global_Sales'])
+    names = pd.Series(sales['Name'].dropna().unique())
+    searched = names.str.lower().str.split().str.join(' ')
+    normalized = ' '.join(query.lower().split())
+    # Queries shorter than an n-gram only match title prefixes
+    if len(normalized) < 3:
+        expected = searched.str.startswith(normalized)
+    else:
+        expected = searched.str.contains(normalized, regex=False)
+    assert set(index.search(query, limit=len(names))['Name']) == set(names[expected.to_numpy()])
+
+
+def test_title_search_ranks_exact_matches_first(sales):
+    index = TitleIndex(sales['Name'], sales['Global_Sales'])
+    matches = index.search('tetris')
+    assert matches['Name'].iloc[0] == 'Tetris'
+    assert matches['Name'].str.lower().str.startswith('tetris').is_monotonic_decreasing
+
+
+def test_title_rows_match_name_filter(sales):
+    index = TitleIndex(sales['Name'], sales['Global_Sales'])
+    for title in ['Tetris', 'FIFA 14', 'No Such Game']:
+        np.testing.assert_array_equal(index.rows(title), np.flatnonzero(sales['Name'] == title))
+
+
+def test_extended_title_index_matches_rebuild(sales):
+    index, df = extend(sales, 3, lambda df: TitleIndex(df['Name'], df['Global_Sales']))
+    rebuilt = TitleIndex(df['Name'], df['Global_Sales'])
+    assert index.titles.equals(rebuilt.titles)
+    np.testing.assert_array_equal(index.codes, rebuilt.codes)
+    np.testing.assert_array_equal(index.postings, rebuilt.postings)
+    np.testing.assert_allclose(index.sales, rebuilt.sales)
+    for query in ['ma', 'mario', 'final fantasy', 'x']:
+        pd.testing.assert_frame_equal(index.search(query), rebuilt.search(query))
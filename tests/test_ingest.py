@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import SalesCube
+from conftest import ROOT, split_rows
+from data_loader import load_sales_data
+from indexes import FilterIndex
+from ingest import DELTA_COLUMNS, DeltaIngester
+
+
+@pytest.fixture(scope='module')
+def raw_parts():
+    """Rows of vgsales.csv as parsed from the file, cut into a base and two deltas"""
+    return split_rows(pd.read_csv(os.path.join(ROOT, 'vgsales.csv')), 3)
+
+
+def load_rows(rows, tmp_path, name):
+    path = str(tmp_path / name)
+    rows.to_csv(path, index=False)
+    return load_sales_data(path, use_snapshot=False)
+
+
+def make_ingester(rows, tmp_path, **kwargs):
+    df = load_rows(rows, tmp_path, 'vgsales.csv')
+    directory = tmp_path / 'vgsales.deltas'
+    directory.mkdir()
+    return DeltaIngester(str(directory), df, (FilterIndex(df), SalesCube.from_rows(df)), 'base', **kwargs), directory
+
+
+def test_deltas_match_a_full_load(raw_parts, tmp_path):
+    base, first, second = raw_parts
+    ingester, directory = make_ingester(base, tmp_path)
+    first.to_csv(directory / '2024-01-01.csv', index=False)
+    second.to_parquet(directory / '2024-01-02.parquet')
+
+    df, (filter_index, sales_cube), version = ingester.refresh()
+    expected = load_rows(pd.concat([base, first, second]), tmp_path, 'full.csv')
+    pd.testing.assert_frame_equal(df, expected)
+    assert version.startswith('base+2-')
+    assert ingester.refresh()[2] == version
+
+    rebuilt = FilterIndex(expected)
+    for selection in [{'Genre': ['Puzzle']}, {'Platform': ['PS2', 'Wii'], 'Year': range(2000, 2010)}]:
+        np.testing.assert_array_equal(filter_index.mask(selection), rebuilt.mask(selection))
+    np.testing.assert_allclose(sales_cube.slice({}).totals(), SalesCube.from_rows(expected).slice({}).totals())
+
+
+def test_file_missing_columns_is_skipped_until_it_changes(raw_parts, tmp_path):
+    base, first, second = raw_parts
+    ingester, directory = make_ingester(base, tmp_path)
+    first.drop(columns='Global_Sales').to_csv(directory / 'a.csv', index=False)
+    second.to_csv(directory / 'b.csv', index=False)
+
+    df, _, version = ingester.refresh()
+    assert len(df) == len(base) + len(second)
+    assert ingester.refresh()[2] == version
+
+    first[DELTA_COLUMNS].to_csv(directory / 'a.csv', index=False)
+    df, _, fixed_version = ingester.refresh()
+    assert len(df) == len(base) + len(first) + len(second)
+    assert fixed_version != version
+
+
+def test_file_with_bad_values_is_skipped(raw_parts, tmp_path):
+    base, first, second = raw_parts
+    ingester, directory = make_ingester(base, tmp_path)
+    first.to_csv(directory / 'a.csv', index=False)
+    second.astype({'NA_Sales': object}).assign(NA_Sales='unknown').to_csv(directory / 'b.csv', index=False)
+
+    df, _, version = ingester.refresh()
+    assert len(df) == len(base) + len(first)
+    assert version.startswith('base+1-')
+    assert ingester.refresh()[2] == version
+
+
+def test_deltas_applied_to_a_replaced_csv_are_not_applied_again(raw_parts, tmp_path):
+    base, first, second = raw_parts
+    ingester, directory = make_ingester(base, tmp_path, base_digest='old')
+    first.to_csv(directory / 'a.csv', index=False)
+    df, indexes, _ = ingester.refresh()
+    assert len(df) == len(base) + len(first)
+
+    # The new CSV holds the rows of a.csv, only b.csv is new to it
+    second.to_csv(directory / 'b.csv', index=False)
+    replaced = DeltaIngester(str(directory), df, indexes, 'new', base_digest='new')
+    df, _, version = replaced.refresh()
+    assert len(df) == len(base) + len(first) + len(second)
+    assert version.startswith('new+1-')
+
+    # A restart on the same CSV applies its own deltas again
+    restarted = DeltaIngester(str(directory), df.iloc[:len(base) + len(first)], indexes, 'new', base_digest='new')
+    assert restarted.refresh()[2] == version
@@ -0,0 +1,97 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregates import SalesCube
+from conftest import split_rows
+from data_loader import SALES_COLUMNS
+from indexes import FilterIndex, FranchiseIndex, RankIndex, TitleIndex
+from ingest import DeltaIngester, append_rows
+from shared_store import STORE_FORMAT, load_shared_dataset, open_store, publish_dataset, store_root, write_store
+
+
+def test_store_round_trip(sales, selections, tmp_path):
+    directory = str(tmp_path / 'store')
+    write_store(sales, directory)
+    df, filter_index, sales_cube, rank_index, franchise_index, title_index = open_store(directory)
+
+    # Names come back as Arrow strings, every other column keeps its dtype
+    pd.testing.assert_frame_equal(df.astype({'Name': object}), sales.astype({'Name': object}))
+    assert isinstance(df['Name'].array, pd.arrays.ArrowStringArray)
+    for col in df.columns.drop('Name'):
+        assert df[col].dtype == sales[col].dtype
+
+    # Columns are read-only views over the mapped file
+    assert not df['Global_Sales'].to_numpy().flags.writeable
+    assert not df['Global_Sales'].to_numpy().flags.owndata
+
+    rebuilt_index = FilterIndex(sales)
+    rebuilt_cube = SalesCube.from_rows(sales)
+    for selection in selections[:20]:
+        np.testing.assert_array_equal(filter_index.mask(selection), rebuilt_index.mask(selection))
+        pd.testing.assert_frame_equal(sales_cube.slice(selection).rollup(['Year', 'Genre']),
+                                      rebuilt_cube.slice(selection).rollup(['Year', 'Genre']))
+
+    rebuilt_rank = RankIndex(sales, SALES_COLUMNS)
+    for column in SALES_COLUMNS:
+        np.testing.assert_array_equal(rank_index.ranked(column), rebuilt_rank.ranked(column))
+
+    rebuilt_franchise = FranchiseIndex(sales['Name'], sales['Global_Sales'])
+    assert franchise_index.series == rebuilt_franchise.series
+    for selection in selections[:20]:
+        packed = rebuilt_index.packed_mask(selection)
+        pd.testing.assert_frame_equal(franchise_index.top(10, packed), rebuilt_franchise.top(10, packed))
+
+    rebuilt_title = TitleIndex(sales['Name'], sales['Global_Sales'])
+    for query in ['ma', 'mario', 'final fantasy', 'no such game']:
+        pd.testing.assert_frame_equal(title_index.search(query), rebuilt_title.search(query))
+    np.testing.assert_array_equal(title_index.rows('Tetris'), rebuilt_title.rows('Tetris'))
+
+
+def test_shared_dataset_keeps_only_the_current_version(csv_copy):
+    df = load_shared_dataset(csv_copy, 'first')[0]
+    assert os.listdir(store_root(csv_copy)) == [f'first.v{STORE_FORMAT}']
+    load_shared_dataset(csv_copy, 'first')
+    assert os.listdir(store_root(csv_copy)) == [f'first.v{STORE_FORMAT}']
+    again = load_shared_dataset(csv_copy, 'second')[0]
+    assert os.listdir(store_root(csv_copy)) == [f'second.v{STORE_FORMAT}']
+    pd.testing.assert_frame_equal(again, df)
+
+
+def test_indexes_opened_from_a_store_can_be_extended(sales, tmp_path):
+    base, delta = split_rows(sales, 2)
+    directory = str(tmp_path / 'store')
+    write_store(base, directory)
+    df, _, _, rank_index, franchise_index, title_index = open_store(directory)
+    delta, full = append_rows(df, delta)
+
+    rank_index = rank_index.extended(delta)
+    rebuilt_rank = RankIndex(full, SALES_COLUMNS)
+    np.testing.assert_array_equal(rank_index.ranked('Global_Sales'), rebuilt_rank.ranked('Global_Sales'))
+    franchise_index = franchise_index.extended(delta)
+    np.testing.assert_array_equal(franchise_index.codes, FranchiseIndex(full['Name'], full['Global_Sales']).codes)
+    title_index = title_index.extended(delta)
+    rebuilt_title = TitleIndex(full['Name'], full['Global_Sales'])
+    for query in ['ma', 'mario']:
+        pd.testing.assert_frame_equal(title_index.search(query), rebuilt_title.search(query))
+
+
+def test_ingested_deltas_are_published_to_the_store(csv_copy, tmp_path):
+    df, *indexes = load_shared_dataset(csv_copy, 'base')
+    directory = tmp_path / 'vgsales.deltas'
+    directory.mkdir()
+    pd.read_csv(csv_copy).head(100).to_csv(directory / 'a.csv', index=False)
+    ingester = DeltaIngester(str(directory), df, indexes, 'base', publish=functools.partial(publish_dataset, csv_copy))
+    published, (filter_index, sales_cube, *_), version = ingester.refresh()
+    in_memory, (memory_filter_index, memory_cube, *_), _ = DeltaIngester(str(directory), df, indexes, 'base').refresh()
+
+    # The extended rows are mapped from a store of their own, next to the base store
+    assert sorted(os.listdir(store_root(csv_copy))) == sorted([f'base.v{STORE_FORMAT}', f'{version}.v{STORE_FORMAT}'])
+    assert isinstance(published['Name'].array, pd.arrays.ArrowStringArray)
+    assert not published['Global_Sales'].to_numpy().flags.owndata
+    pd.testing.assert_frame_equal(published.astype({'Name': object}), in_memory.astype({'Name': object}))
+    for selection in [{'Genre': ['Puzzle']}, {'Platform': ['PS2', 'Wii'], 'Year': range(2000, 2010)}]:
+        np.testing.assert_array_equal(filter_index.mask(selection), memory_filter_index.mask(selection))
+    np.testing.assert_allclose(sales_cube.slice({}).totals(), memory_cube.slice({}).totals())
@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+
+# Returned by span() when tracing is off, entering it does nothing
+_NO_SPAN = nullcontext()
+
+# Trace of the script run executing on each thread, Streamlit runs every
+# session's script on its own thread
+_current = threading.local()
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'labels', 'started', 'depth')
+
+    def __init__(self, trace, name, labels):
+        self.trace = trace
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.depth = self.trace.depth
+        self.trace.depth += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ended = time.perf_counter()
+        self.trace.depth -= 1
+        self.trace.spans.append({
+            'span': self.name,
+            'labels': self.labels,
+            'depth': self.depth,
+            'start_ms': (self.started - self.trace.started) * 1000,
+            'ms': (ended - self.started) * 1000,
+        })
+        return False
+
+
+class RunTrace:
+    """Timing spans recorded during one script run"""
+
+    def __init__(self, session=None):
+        self.session = session
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        self.depth = 0
+        self.spans = []
+        self.total_ms = None
+
+    def span(self, name, labels):
+        return _Span(self, name, labels)
+
+    def to_frame(self):
+        """Spans in the order they started, indented by nesting depth"""
+        rows = sorted(self.spans, key=lambda span: span['start_ms'])
+        return pd.DataFrame([{
+            'span': '· ' * span['depth'] + span['span'],
+            'labels': ', '.join(f'{k}={v}' for k, v in span['labels'].items()),
+            'ms': round(span['ms'], 2),
+        } for span in rows], columns=['span', 'labels', 'ms'])
+
+    def to_jsonl(self):
+        lines = []
+        for span in self.spans:
+            record = {'ts': self.timestamp, 'session': self.session, 'span': span['span'],
+                      'ms': round(span['ms'], 3), 'start_ms': round(span['start_ms'], 3)}
+            record.update(span['labels'])
+            lines.append(json.dumps(record))
+        return ''.join(line + '\n' for line in lines)
+
+
+def span(name, **labels):
+    """Time a block as a span of the current run, a no-op when tracing is off"""
+    trace = getattr(_current, 'trace', None)
+    if trace is None:
+        return _NO_SPAN
+    return trace.span(name, labels)
+
+
+def start_run(enabled, session=None):
+    """Begin tracing the script run on this thread, if enabled"""
+    _current.trace = RunTrace(session) if enabled else None
+    return _current.trace
+
+
+def end_run():
+    """Stop tracing on this thread and return the finished trace"""
+    trace = getattr(_current, 'trace', None)
+    _current.trace = None
+    if trace is not None:
+        trace.total_ms = (time.perf_counter() - trace.started) * 1000
+    return trace
+
+
+class SpanMetrics:
+    """Span counts and total durations accumulated over every traced run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self._totals = {}
+
+    def record(self, trace):
+        with self._lock:
+            self.runs += 1
+            for span in trace.spans:
+                key = (span['span'], tuple(sorted(span['labels'].items())))
+                count, total = self._totals.get(key, (0, 0.0))
+                self._totals[key] = (count + 1, total + span['ms'] / 1000)
+
+    def to_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP vgsales_traced_runs_total Script runs recorded with tracing enabled',
+            '# TYPE vgsales_traced_runs_total counter',
+            f'vgsales_traced_runs_total {self.runs}',
+            '# HELP vgsales_span_seconds Time spent in instrumented dashboard spans',
+            '# TYPE vgsales_span_seconds summary',
+        ]
+        with self._lock:
+            items = sorted(self._totals.items())
+        for (name, labels), (count, total) in items:
+            label_text = ','.join(
+                f'{key}="{_escape_label(value)}"' for key, value in (('span', name),) + labels)
+            lines.append(f'vgsales_span_seconds_count{{{label_text}}} {count}')
+            lines.append(f'vgsales_span_seconds_sum{{{label_text}}} {total:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Shared by every session in the process
+span_metrics = SpanMetrics()
+_file_lock = threading.Lock()
+
+
+def publish_run(trace, log_path=None, metrics_path=None):
+    """Add a finished run to the metrics and write the configured files
+
+    Spans are appended to the JSON lines log. The Prometheus text file is
+    rewritten through a temporary file so a scraper never reads half of it.
+    """
+    span_metrics.record(trace)
+    with _file_lock:
+        if log_path:
+            with open(log_path, 'a') as f:
+                f.write(trace.to_jsonl())
+        if metrics_path:
+            tmp_path = f'{metrics_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(span_metrics.to_prometheus())
+            os.replace(tmp_path, metrics_path)
@@ -0,0 +1,89 @@
+"""Warm-up of the dataset and of the views most sessions open first
+
+The dashboard calls warm_views() once per server process, in a background
+thread, so the default view and the first click on every quick preset are
+served from the shared cache, charts of the opening section included.
+Running this module from the command line (for example as a deploy step)
+builds the Parquet snapshot before the server starts and reports how long
+each stage takes:
+
+    python warmup.py [path/to/vgsales.csv]
+"""
+import sys
+import time
+
+from aggregates import SalesCube, chart_aggregates
+from cache import BoundedCache
+from charts import DEFAULT_THEME, cached_spec
+from data_loader import SALES_COLUMNS, freeze_frame, load_sales_data, source_version
+from filter_state import QUICK_PRESETS, FilterState, default_filters, filter_options, view_selection, view_signature
+from indexes import FilterIndex, RankIndex
+from sales_figures import default_section_figures
+
+
+def warm_view(df, filter_index, sales_cube, rank_index, cache, dataset_version, values):
+    """Cache the matching rows, every chart aggregate and the opening section's
+    chart specs in the default theme for one set of filters
+    """
+    signature = view_signature(dataset_version, values)
+    selection = view_selection(values)
+    cache.get_or_compute(('filtered_rows', signature), lambda: freeze_frame(df[filter_index.mask(selection)]))
+    aggregates = chart_aggregates(sales_cube.slice(selection), cache, signature)
+    aggregates.compute()
+
+    def top_games(n, by='Global_Sales'):
+        return df.iloc[rank_index.top(by, n, filter_index.packed_mask(selection))]
+
+    for chart_id, (build_figure, theme_layout) in default_section_figures(aggregates, top_games).items():
+        cached_spec(cache, chart_id, signature, DEFAULT_THEME, build_figure, theme_layout)
+
+
+def startup_views(df):
+    """Filter values of a new session and of a first click on each quick preset"""
+    options = filter_options(df)
+    filter_state = FilterState(defaults=default_filters(options), options=options)
+    views = {'Default view': filter_state.defaults}
+    for preset in QUICK_PRESETS:
+        views[preset] = filter_state.preset_values(preset)
+    return views
+
+
+def warm_views(df, filter_index, sales_cube, rank_index, cache, dataset_version):
+    """Warm the default view and every quick preset, returning seconds per view"""
+    timings = {}
+    for name, values in startup_views(df).items():
+        started = time.perf_counter()
+        warm_view(df, filter_index, sales_cube, rank_index, cache, dataset_version, values)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def main(csv_path='vgsales.csv'):
+    stages = {}
+    started = time.perf_counter()
+    df = load_sales_data(csv_path)
+    stages['Dataset'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    filter_index = FilterIndex(df)
+    stages['Filter index'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sales_cube = SalesCube.from_rows(df)
+    stages['Sales cube'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rank_index = RankIndex(df, SALES_COLUMNS)
+    stages['Rank index'] = time.perf_counter() - started
+
+    cache = BoundedCache(max_bytes=256 * 1024 ** 2)
+    for name, seconds in warm_views(df, filter_index, sales_cube, rank_index, cache, source_version(csv_path)).items():
+        stages[name] = seconds
+
+    for name, seconds in stages.items():
+        print(f"{name:<20} {seconds * 1000:8.1f} ms")
+    print(f"{len(df):,} rows, {cache.total_bytes / 1024 ** 2:.2f} MB of warm results")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])